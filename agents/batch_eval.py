@@ -0,0 +1,258 @@
+"""
+Replay shopper prompts through the chat agent with bounded concurrency.
+
+Each item is either a single message or a thread (messages replayed in order
+on one thread). Results are produced as NDJSON records in completion order,
+with per-turn latency and estimated token counts (~4 chars per token).
+
+    python -m agents.batch_eval prompts.jsonl --concurrency 16 --deadline 20
+    python -m agents.batch_eval prompts.txt --offline > results.ndjson
+
+Input lines are JSON objects ({"message": ...} or {"messages": [...]}, with
+optional "id" and "thread_id") or plain text (one message per line).
+``--offline`` swaps in the fake LLM, embeddings and catalog plus an in-memory
+checkpointer, so the run measures pure orchestration throughput.
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+from typing import AsyncIterator, Optional
+
+import orjson
+from pydantic import BaseModel, model_validator
+
+from libs.admission import AdmissionController, AdmissionRejected
+from libs.database import settings
+from libs.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class BatchItem(BaseModel):
+    id: Optional[str] = None
+    thread_id: Optional[str] = None
+    message: Optional[str] = None
+    messages: list[str] = []
+
+    @model_validator(mode="after")
+    def check_messages(self) -> "BatchItem":
+        if not self.message and not self.messages:
+            raise ValueError("Each item needs `message` or `messages`")
+        return self
+
+    def turns(self) -> list[str]:
+        return [self.message] if self.message else self.messages
+
+
+async def run_item(
+    index: int,
+    item: BatchItem,
+    deadline_seconds: Optional[float],
+    include_products: bool,
+) -> dict:
+    """Replay one item's turns on its thread and report latency and usage."""
+    from agents.chat_agent import chat_agent, llm_usage
+
+    thread_id = item.thread_id or str(uuid.uuid4())
+    record: dict = {
+        "index": index,
+        "id": item.id,
+        "thread_id": thread_id,
+        "status": "ok",
+        "turns": [],
+    }
+    started = time.perf_counter()
+    for message in item.turns():
+        usage: dict[str, int] = {}
+        token = llm_usage.set(usage)
+        turn_started = time.perf_counter()
+        try:
+            result = await chat_agent(
+                thread_id=thread_id,
+                message=message,
+                include_products=include_products,
+                deadline_seconds=deadline_seconds,
+            )
+        except Exception as e:
+            record["status"] = "error"
+            record["error"] = f"{type(e).__name__}: {e}"
+            break
+        finally:
+            llm_usage.reset(token)
+        turn = {
+            "message": message,
+            "reply": result["AI"],
+            "latency_ms": round((time.perf_counter() - turn_started) * 1000, 2),
+            "llm_calls": usage.get("llm_calls", 0),
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+        }
+        if include_products:
+            turn["products"] = result.get("products", [])
+        record["turns"].append(turn)
+    record["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return record
+
+
+async def admitted_item(
+    admission: AdmissionController,
+    index: int,
+    item: BatchItem,
+    deadline_seconds: Optional[float],
+    include_products: bool,
+) -> dict:
+    """run_item under ``admission``; a shed item is reported, not retried."""
+    try:
+        async with admission.admit():
+            return await run_item(index, item, deadline_seconds, include_products)
+    except AdmissionRejected as e:
+        return {
+            "index": index,
+            "id": item.id,
+            "thread_id": item.thread_id,
+            "status": "rejected",
+            "error": str(e),
+            "retry_after": e.retry_after,
+            "turns": [],
+        }
+
+
+async def run_batch(
+    items: list[BatchItem],
+    concurrency: int = 8,
+    deadline_seconds: Optional[float] = None,
+    include_products: bool = False,
+    admission: Optional[AdmissionController] = None,
+) -> AsyncIterator[dict]:
+    """
+    Run ``items`` with at most ``concurrency`` in flight, yielding each
+    result as soon as it finishes. With ``admission``, every item must be
+    admitted like an interactive chat request and is reported as
+    ``rejected`` when shed.
+    """
+    pending: asyncio.Queue = asyncio.Queue()
+    for index, item in enumerate(items):
+        pending.put_nowait((index, item))
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def worker() -> None:
+        try:
+            while not pending.empty():
+                index, item = pending.get_nowait()
+                if admission is None:
+                    record = await run_item(
+                        index, item, deadline_seconds, include_products
+                    )
+                else:
+                    record = await admitted_item(
+                        admission, index, item, deadline_seconds, include_products
+                    )
+                await results.put(record)
+        except BaseException as e:
+            # Wake the consumer; otherwise it would wait for this item forever.
+            results.put_nowait(e)
+            raise
+
+    workers = [
+        asyncio.create_task(worker())
+        for _ in range(max(1, min(concurrency, len(items))))
+    ]
+    try:
+        for _ in items:
+            record = await results.get()
+            if isinstance(record, BaseException):
+                raise RuntimeError("Batch worker stopped") from record
+            yield record
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+def summarize(records: list[dict], elapsed: float) -> dict:
+    latencies = sorted(
+        turn["latency_ms"] for record in records for turn in record["turns"]
+    )
+    percentiles = (
+        statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    )
+    return {
+        "items": len(records),
+        "errors": sum(record["status"] != "ok" for record in records),
+        "turns": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "turns_per_s": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "p50_ms": round(percentiles[49], 2) if latencies else None,
+        "p95_ms": round(percentiles[94], 2) if latencies else None,
+        "prompt_tokens": sum(
+            turn["prompt_tokens"] for record in records for turn in record["turns"]
+        ),
+        "completion_tokens": sum(
+            turn["completion_tokens"] for record in records for turn in record["turns"]
+        ),
+    }
+
+
+def read_items(path: str) -> list[BatchItem]:
+    items = []
+    with open(path, encoding="utf-8") if path != "-" else sys.stdin as source:
+        for line in source:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                items.append(BatchItem.model_validate(orjson.loads(line)))
+            else:
+                items.append(BatchItem(message=line))
+    return items
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("input", help="JSONL or text file of prompts ('-' for stdin)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--deadline", type=float, default=None, help="seconds per turn")
+    parser.add_argument("--products", action="store_true", help="include products")
+    parser.add_argument("--offline", action="store_true")
+    parser.add_argument("--llm-latency-ms", type=float, default=None)
+    parser.add_argument("--output", default="-", help="NDJSON output path")
+    args = parser.parse_args()
+
+    if args.offline:
+        # Must happen before agents.chat_agent is imported: it builds the LLM.
+        settings.llm_provider = "fake"
+        settings.embedding_provider = "fake"
+        settings.catalog_provider = "fake"
+        settings.chat_checkpointer = "memory"
+        settings.history_summary_enabled = False
+    if args.llm_latency_ms is not None:
+        settings.fake_llm_latency_ms = args.llm_latency_ms
+
+    import agents.chat_agent  # noqa: F401  (build the graph before timing)
+
+    items = read_items(args.input)
+    records = []
+    started = time.perf_counter()
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        async for record in run_batch(
+            items, args.concurrency, args.deadline, args.products
+        ):
+            records.append(record)
+            output.write(orjson.dumps(record) + b"\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+    summary = summarize(records, time.perf_counter() - started)
+    print(orjson.dumps(summary).decode(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
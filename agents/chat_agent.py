@@ -1,35 +1,103 @@
 import re
+import time
+import asyncio
+from contextvars import ContextVar
 from langgraph.graph import StateGraph, START, END, message
-from typing import TypedDict, Literal, Sequence, Annotated, Optional, Any, cast
+from langgraph.graph.state import CompiledStateGraph
+from typing import (
+    TypedDict,
+    Literal,
+    Sequence,
+    Annotated,
+    Optional,
+    Any,
+    NotRequired,
+    cast,
+)
 from langchain_core.messages import (
     BaseMessage,
     HumanMessage,
     AIMessage,
     SystemMessage,
     ToolMessage,
+    RemoveMessage,
+    get_buffer_string,
 )
-from langchain_mongodb import MongoDBAtlasVectorSearch
 from libs.database import Database, settings
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, GoogleGenerativeAI
+from libs.catalog_snapshot import SnapshotStore
 from dotenv import load_dotenv
-from pydantic import SecretStr
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from datetime import datetime
 from langchain_core.documents import Document
 from libs.logger import get_logger
 from langgraph.checkpoint.mongodb.aio import AsyncMongoDBSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from functools import lru_cache
 from agents.instructions import GENZ_AGENT_INSTRUCTIONS
-import os
-
+from agents.product_cards import (
+    render_product_cards,
+    build_product_payload,
+    estimate_tokens,
+)
+from libs.checkpoint_serde import get_checkpoint_serde
+from libs.checkpoint_retention import (
+    CHECKPOINT_COLLECTION,
+    WRITES_COLLECTION,
+    CheckpointCompactor,
+)
+from agents.intents import classify_intent, intent_reply
+from libs.metrics import MetricsRegistry
+from libs.tracing import span, traced
+from libs.concurrency import llm_limiter, thread_locks, QueueFullError
+from libs.admission import chat_admission
+from libs.deadline import Deadline, DeadlineExceeded, current_deadline, with_timeout
+from agents.llm import (
+    get_llm,
+    get_embeddings,
+    get_cached_content_llm,
+    GeminiInstructionCache,
+)
+from agents.fake_catalog import fake_products
+from agents.history import select_history, evicted_messages, summarize_messages
 
 load_dotenv()
-GEMINI_API_KEY = SecretStr(str(os.getenv("GOOGLE_API_KEY")))
 logger = get_logger(__name__)
-embeddings = GoogleGenerativeAIEmbeddings(
-    model="text-embedding-004", google_api_key=GEMINI_API_KEY
+TOOL_CALL_PREFIX = "TOOL_CALL"
+TOOL_CALL_PATTERN = re.compile(r"TOOL_CALL: product_lookup\(query=\"(.*?)\"\)")
+intent_fast_path = MetricsRegistry.counter(
+    "chat_intent_fast_path_total", "Turns answered from canned intent templates"
+)
+prompt_tokens_total = MetricsRegistry.counter(
+    "llm_prompt_tokens_total", "Prompt tokens sent to the chat LLM"
+)
+completion_tokens_total = MetricsRegistry.counter(
+    "llm_completion_tokens_total", "Completion tokens returned by the chat LLM"
 )
-llm = GoogleGenerativeAI(
-    model="gemini-2.5-flash", temperature=0.7, google_api_key=GEMINI_API_KEY
+llm = get_llm()
+# Set by streaming callers (WebSocket sessions): call_llm forwards reply tokens here.
+token_sink: ContextVar[Optional[asyncio.Queue]] = ContextVar("token_sink", default=None)
+# Set by callers that account LLM usage (batch evaluation): call_llm adds
+# llm_calls and estimated prompt/completion token counts to this dict.
+llm_usage: ContextVar[Optional[dict[str, int]]] = ContextVar("llm_usage", default=None)
+
+# Compiled once: the static instructions form a byte-identical prompt prefix
+# across turns and threads so provider-side prompt caching can apply. Volatile
+# values (current time) go in the `context` slot after the history.
+PROMPT = ChatPromptTemplate(
+    [
+        SystemMessage(content=GENZ_AGENT_INSTRUCTIONS),
+        MessagesPlaceholder("messages"),
+        MessagesPlaceholder("context"),
+        MessagesPlaceholder("agent_scratchpad"),
+    ]
+)
+# Used when the instructions live in a Gemini CachedContent instead.
+CACHED_INSTRUCTIONS_PROMPT = ChatPromptTemplate(
+    [
+        MessagesPlaceholder("messages"),
+        MessagesPlaceholder("context"),
+        MessagesPlaceholder("agent_scratchpad"),
+    ]
 )
 
 
@@ -37,137 +105,302 @@ class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], message.add_messages]
     query: str | None
     llm_response: Optional[str]
-    product_info: Optional[list[tuple[Document, float]] | dict | str]
+    # Compact product list (see build_product_payload) returned to the client.
+    product_info: Optional[list[dict]]
+    queries: NotRequired[list[str]]
+    summary: NotRequired[Optional[str]]
+    intent: NotRequired[Optional[str]]
 
 
-def product_lookup(state: AgentState):
-    logger.info("product_lookup: Looking up products")
-    """Search products in MongoDB by vector or regex."""
-    try:
-        query = state.get("query")
-        logger.info(f"product_lookup: Query: {query}")
-        if query is None:
-            state["product_info"] = "No Product found"
-            return {
-                "messages": [
-                    ToolMessage(
-                        content="No Product found", tool_call_id="product_lookup_call"
-                    )
-                ],
-                "product_info": "No Product found",
+async def vector_search(collection, query: str, k: int = 4) -> list[dict]:
+    """Atlas $vectorSearch over `vector_index`; documents carry a `score`."""
+    with span("embedding.query"):
+        query_vector = await get_embeddings().aembed_query(query)
+    pipeline = [
+        {
+            "$vectorSearch": {
+                "index": "vector_index",
+                "path": "embedding",
+                "queryVector": query_vector,
+                "numCandidates": k * 10,
+                "limit": k,
             }
-        collection = Database.get_sync_collection("products")
-        vector_store = MongoDBAtlasVectorSearch(
-            collection=collection,
-            embedding=GoogleGenerativeAIEmbeddings(
-                model="text-embedding-004", google_api_key=GEMINI_API_KEY
+        },
+        {"$set": {"score": {"$meta": "vectorSearchScore"}}},
+        {"$project": {"embedding": 0}},
+    ]
+    with span("mongo.vector_search", k=k) as search:
+        documents = await collection.aggregate(pipeline).to_list(length=k)
+        search.set(results=len(documents))
+    return documents
+
+
+async def lookup_products(
+    query: str,
+) -> tuple[str, list[tuple[Document, float]] | list[dict] | str]:
+    """
+    Search products in MongoDB by vector, falling back to regex.
+    Returns the tool message content and the full product records.
+    """
+    if settings.catalog_provider == "fake":
+        if settings.fake_lookup_latency_ms:
+            await asyncio.sleep(settings.fake_lookup_latency_ms / 1000)
+        products = fake_products(query)
+        return (
+            render_product_cards(
+                products,
+                token_budget=settings.product_card_token_budget,
+                review_chars=settings.product_card_review_chars,
             ),
-            index_name="vector_index",
-            relevance_score_fn="cosine",
+            products,
         )
 
-        result = vector_store.similarity_search_with_score(query=query)
-
-        # Process vector search results: reconstruct Document objects without embeddings
-        processed_vector_results = []
-        for doc, score in result:
-            doc_metadata = (
-                doc.metadata.copy()
-            )  # Create a copy to avoid modifying original metadata
-            if "embedding" in doc_metadata:
-                del doc_metadata["embedding"]
-            new_doc = Document(page_content=doc.page_content, metadata=doc_metadata)
-            processed_vector_results.append((new_doc, score))
-
-        if len(processed_vector_results) > 0:
-            state["product_info"] = processed_vector_results
-            return {
-                "messages": [
-                    ToolMessage(
-                        content=str(processed_vector_results),
-                        tool_call_id="product_lookup_call",
-                    )
-                ],
-                "product_info": processed_vector_results,
-            }
+    if settings.catalog_provider == "snapshot":
+        snapshot = SnapshotStore.current()
+        if snapshot is not None and snapshot.dims:
+            with span("embedding.query"):
+                query_vector = await get_embeddings().aembed_query(query)
+            with span("snapshot.search", rows=snapshot.rows):
+                result = [
+                    (Document(page_content="", metadata=snapshot.record(row)), score)
+                    for row, score in snapshot.search(query_vector)
+                ]
+            if result:
+                return (
+                    render_product_cards(
+                        result,
+                        token_budget=settings.product_card_token_budget,
+                        review_chars=settings.product_card_review_chars,
+                    ),
+                    result,
+                )
+        # No snapshot mapped yet (or no match): use the live collection.
+
+    collection = await Database.get_catalog_collection("products")
+    try:
+        result = await vector_search(collection, query)
+    except Exception as e:
+        logger.warning("lookup_products: Vector search failed, using regex: %s", e)
+        result = []
+
+    # Process vector search results into (Document, score) pairs
+    processed_vector_results = []
+    for doc in result:
+        score = doc.pop("score")
+        page_content = doc.pop("text", "")
+        if "_id" in doc:
+            doc["_id"] = str(doc["_id"])
+        processed_vector_results.append(
+            (Document(page_content=page_content, metadata=doc), score)
+        )
+
+    if len(processed_vector_results) > 0:
+        return (
+            render_product_cards(
+                processed_vector_results,
+                token_budget=settings.product_card_token_budget,
+                review_chars=settings.product_card_review_chars,
+            ),
+            processed_vector_results,
+        )
 
-        result = collection.find(
+    pattern = re.escape(query)
+    with span("mongo.regex_search") as search:
+        result = await collection.find(
             {
                 "$or": [
-                    {"name": {"$regex": query, "$options": "i"}},
-                    {"description": {"$regex": query, "$options": "i"}},
+                    {"name": {"$regex": pattern, "$options": "i"}},
+                    {"description": {"$regex": pattern, "$options": "i"}},
                 ]
-            }
-        ).to_list()
-
-        # Process regex search results: remove embeddings and convert ObjectId to string
-        processed_regex_results = []
-        for doc_dict in result:
-            doc_dict_copy = doc_dict.copy()
-            if "embedding" in doc_dict_copy:
-                del doc_dict_copy["embedding"]
-            if "_id" in doc_dict_copy:
-                doc_dict_copy["_id"] = str(doc_dict_copy["_id"])
-            processed_regex_results.append(doc_dict_copy)
-
-        if len(processed_regex_results) > 0:
-            state["product_info"] = processed_regex_results
-            return {
-                "messages": [
-                    ToolMessage(
-                        content=str(processed_regex_results),
-                        tool_call_id="product_lookup_call",
-                    )
-                ],
-                "product_info": processed_regex_results,
-            }
+            },
+            {"embedding": 0},
+        ).to_list(length=None)
+        search.set(results=len(result))
 
-        state["product_info"] = (
-            "No products found. Please try again with a different query."
+    # Process regex search results: remove embeddings and convert ObjectId to string
+    processed_regex_results = []
+    for doc_dict in result:
+        doc_dict_copy = doc_dict.copy()
+        if "embedding" in doc_dict_copy:
+            del doc_dict_copy["embedding"]
+        doc_dict_copy.pop("text", None)
+        if "_id" in doc_dict_copy:
+            doc_dict_copy["_id"] = str(doc_dict_copy["_id"])
+        processed_regex_results.append(doc_dict_copy)
+
+    if len(processed_regex_results) > 0:
+        return (
+            render_product_cards(
+                processed_regex_results,
+                token_budget=settings.product_card_token_budget,
+                review_chars=settings.product_card_review_chars,
+            ),
+            processed_regex_results,
         )
+
+    no_products = "No products found. Please try again with a different query."
+    return no_products, no_products
+
+
+async def _lookup_tool_message(
+    query: str, index: int, labelled: bool
+) -> tuple[ToolMessage, list | str]:
+    tool_call_id = (
+        "product_lookup_call" if index == 0 else f"product_lookup_call_{index}"
+    )
+    deadline = current_deadline.get()
+    timeout = (
+        deadline.budget(
+            settings.lookup_deadline_seconds,
+            reserve=settings.llm_deadline_reserve_seconds,
+        )
+        if deadline
+        else None
+    )
+    try:
+        with span("tool.product_lookup", query=query) as lookup:
+            content, product_info = await with_timeout(lookup_products(query), timeout)
+            lookup.set(
+                results=len(product_info) if isinstance(product_info, list) else 0
+            )
+    except DeadlineExceeded:
+        # Degrade instead of failing the turn: the LLM answers without products.
+        logger.warning("product_lookup: Lookup for %r ran out of time", query)
+        content = product_info = (
+            "Product search is unavailable right now. Answer without product details."
+        )
+    except Exception as e:
+        logger.error("product_lookup: An error occurred during product lookup: %s", e)
+        content = product_info = f"Error: {e}"
+    if labelled:
+        content = f'Results for "{query}":\n{content}'
+    return ToolMessage(content=content, tool_call_id=tool_call_id), product_info
+
+
+async def product_lookup(state: AgentState):
+    """Run every requested product lookup concurrently and return all results."""
+    queries = state.get("queries") or ([state["query"]] if state.get("query") else [])
+    logger.info("product_lookup: Looking up products for queries: %s", queries)
+    if not queries:
         return {
             "messages": [
                 ToolMessage(
-                    content=state["product_info"], tool_call_id="product_lookup_call"
+                    content="No Product found", tool_call_id="product_lookup_call"
                 )
             ],
-            "product_info": state["product_info"],
+            "product_info": [],
         }
 
-    except Exception as e:
-        logger.error(f"product_lookup: An error occurred during product lookup: {e}")
-        error_message = f"Error: {e}"
-        return {
-            "messages": [
-                ToolMessage(content=error_message, tool_call_id="product_lookup_call")
-            ],
-            "product_info": error_message,
-        }
+    results = await asyncio.gather(
+        *(
+            _lookup_tool_message(query, index, labelled=len(queries) > 1)
+            for index, query in enumerate(queries)
+        )
+    )
+
+    # Merge every lookup into one deduplicated product list for the API response.
+    product_info = build_product_payload(
+        record for _, info in results if isinstance(info, list) for record in info
+    )
+    return {
+        "messages": [tool_message for tool_message, _ in results],
+        "product_info": product_info,
+    }
+
 
+async def stream_reply(
+    model: Any, prompt: list[BaseMessage], sink: asyncio.Queue
+) -> str:
+    """
+    Stream the LLM reply, forwarding text chunks to ``sink`` as they arrive.
+    Tool-call replies are internal to the agent loop and never forwarded.
+    """
+    text = ""
+    forwarding = False
+    async for chunk in model.astream(prompt):
+        piece = str(getattr(chunk, "content", chunk))
+        text += piece
+        if forwarding:
+            sink.put_nowait(piece)
+            continue
+        head = text.lstrip()
+        if TOOL_CALL_PREFIX.startswith(head) or head.startswith(TOOL_CALL_PREFIX):
+            continue  # still undecided, or a tool call
+        forwarding = True
+        sink.put_nowait(text)
+    return text
 
-def call_llm(state: AgentState) -> AgentState:
+
+def token_counts(
+    result: Any, prompt: list[BaseMessage], llm_response: str
+) -> tuple[int, int]:
+    """Provider-reported (prompt, completion) tokens, else estimated from text."""
+    usage = getattr(result, "usage_metadata", None)
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    return estimate_tokens(get_buffer_string(prompt)), estimate_tokens(llm_response)
+
+
+async def call_llm(state: AgentState) -> AgentState:
     logger.info("call_llm: Calling LLM")
     """Call LLM to generate response based on the current state"""
     try:
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        prompt = ChatPromptTemplate(
-            [
-                SystemMessage(content=GENZ_AGENT_INSTRUCTIONS),
-                MessagesPlaceholder("messages"),
-                MessagesPlaceholder("agent_scratchpad"),
-            ]
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M")
+        history = select_history(
+            state.get("messages") or [],
+            summary=state.get("summary"),
+            max_turns=settings.history_max_turns,
+            tool_message_chars=settings.history_tool_message_chars,
         )
+        prompt_values = {
+            "messages": history,
+            "context": [SystemMessage(content=f"Current time: {current_time}")],
+            "agent_scratchpad": (
+                state.get("messages")[-1:] if state.get("messages") else []
+            ),
+        }
 
-        llm_response: str = llm.invoke(
-            prompt.format_messages(
-                messages=state.get("messages"),
-                time=current_time,
-                agent_scratchpad=(
-                    state.get("messages")[-1:] if state.get("messages") else []
-                ),
+        deadline = current_deadline.get()
+        cache_name = await GeminiInstructionCache.get_name()
+        async with llm_limiter.acquire():
+            started = time.perf_counter()
+            if cache_name:
+                # Flatten like the text LLM does; the system prefix is server-side.
+                prompt_text = get_buffer_string(
+                    CACHED_INSTRUCTIONS_PROMPT.format_messages(**prompt_values)
+                )
+                model = get_cached_content_llm(cache_name)
+                prompt: list[BaseMessage] = [HumanMessage(content=prompt_text)]
+            else:
+                model = llm
+                prompt = PROMPT.format_messages(**prompt_values)
+            sink = token_sink.get()
+            invocation = (
+                stream_reply(model, prompt, sink) if sink else model.ainvoke(prompt)
             )
-        )
-        print(f"checking llm response: {llm_response}")
+            with span(
+                "llm.invoke", streaming=sink is not None, cached=bool(cache_name)
+            ) as invoke:
+                result = await with_timeout(
+                    invocation, deadline.remaining() if deadline else None
+                )
+                llm_response = str(getattr(result, "content", result))
+                prompt_tokens, completion_tokens = token_counts(
+                    result, prompt, llm_response
+                )
+                invoke.set(
+                    prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+                )
+            chat_admission.record_latency(time.perf_counter() - started)
+        prompt_tokens_total.inc(prompt_tokens)
+        completion_tokens_total.inc(completion_tokens)
+        if (usage := llm_usage.get()) is not None:
+            usage["llm_calls"] = usage.get("llm_calls", 0) + 1
+            usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + prompt_tokens
+            usage["completion_tokens"] = (
+                usage.get("completion_tokens", 0) + completion_tokens
+            )
+
         return {
             "messages": [
                 AIMessage(content=llm_response)
@@ -176,8 +409,10 @@ def call_llm(state: AgentState) -> AgentState:
             "query": state.get("query"),
             "product_info": state.get("product_info"),
         }
+    except (QueueFullError, DeadlineExceeded):
+        raise
     except Exception as e:
-        logger.error(f"call_llm: An error occurred during LLM invocation: {e}")
+        logger.error("call_llm: An error occurred during LLM invocation: %s", e)
         return state
 
 
@@ -187,11 +422,10 @@ def should_continue(
     logger.info("should_continue: Checking if LLM wants to call a tool")
     messages = state["messages"]
     last_message = messages[-1]
-    logger.debug(f"should_continue: Last message: {last_message}")
+    logger.debug("should_continue: Last message: %s", last_message)
     if isinstance(last_message, AIMessage):
         llm_response_content = str(last_message.content)
-        tool_call_pattern = r"TOOL_CALL: product_lookup\(query=\"(.*?)\"\)"
-        match = re.search(tool_call_pattern, llm_response_content)
+        match = TOOL_CALL_PATTERN.search(llm_response_content)
         if match:
             return "extract_query_from_llm_response"
         else:
@@ -209,27 +443,65 @@ def extract_query_from_llm_response(state: AgentState) -> AgentState:
     updated_state = state.copy()  # Create a mutable copy of the state
     if isinstance(last_message, AIMessage):
         llm_response_content = str(last_message.content)
-        tool_call_pattern = r"TOOL_CALL: product_lookup\(query=\"(.*?)\"\)"
-        match = re.search(tool_call_pattern, llm_response_content)
-        if match:
-            query = match.group(1)
-            logger.info(f"extract_query_from_llm_response: Extracted query: {query}")
-            updated_state["query"] = query
+        # Every tool call in the response is looked up in the same round.
+        queries = list(dict.fromkeys(TOOL_CALL_PATTERN.findall(llm_response_content)))
+        queries = queries[: settings.max_parallel_lookups]
+        if queries:
+            logger.info(
+                "extract_query_from_llm_response: Extracted queries: %s", queries
+            )
+            updated_state["query"] = queries[0]
+            updated_state["queries"] = queries
             return updated_state
     logger.warning(
         "extract_query_from_llm_response: No query extracted or last message not AIMessage."
     )
     updated_state["query"] = None  # Ensure query is explicitly set to None if not found
+    updated_state["queries"] = []
     return updated_state
 
 
+def route_intent(state: AgentState) -> AgentState:
+    """Answer greetings and FAQ intents from templates without calling the LLM."""
+    messages = state.get("messages") or []
+    last_message = messages[-1] if messages else None
+    intent = None
+    if settings.intent_router_enabled and isinstance(last_message, HumanMessage):
+        intent = classify_intent(str(last_message.content))
+    if intent is None:
+        return {"intent": None}
+
+    logger.info("route_intent: Answering %r from template", intent)
+    intent_fast_path.inc()
+    reply = intent_reply(intent)
+    return {
+        "messages": [AIMessage(content=reply)],
+        "llm_response": reply,
+        "intent": intent,
+    }
+
+
+def after_route_intent(state: AgentState) -> Literal["call_llm", "__end__"]:
+    return "__end__" if state.get("intent") else "call_llm"
+
+
 builder = StateGraph(AgentState)
 
-builder.add_node("call_llm", call_llm)
-builder.add_node("product_lookup", product_lookup)
-builder.add_node("extract_query_from_llm_response", extract_query_from_llm_response)
+# Each node runs in a `node.<name>` span; see libs/tracing.py.
+builder.add_node("route_intent", traced("node.route_intent")(route_intent))
+builder.add_node("call_llm", traced("node.call_llm")(call_llm))
+builder.add_node("product_lookup", traced("node.product_lookup")(product_lookup))
+builder.add_node(
+    "extract_query_from_llm_response",
+    traced("node.extract_query_from_llm_response")(extract_query_from_llm_response),
+)
 
-builder.add_edge(START, "call_llm")
+builder.add_edge(START, "route_intent")
+builder.add_conditional_edges(
+    "route_intent",
+    after_route_intent,
+    {"call_llm": "call_llm", "__end__": END},
+)
 builder.add_conditional_edges(
     "call_llm",
     should_continue,
@@ -243,41 +515,217 @@ builder.add_edge("extract_query_from_llm_response", "product_lookup")
 builder.add_edge("product_lookup", "call_llm")
 
 
-# ---------- usage ----------
-async def chat_agent(thread_id: str, message: str):
-    # Ensure database client is connected for other operations if needed
-    await Database.connect()
-    if Database._async_client is None:
-        raise Exception("Database client failed to connect.")
+# Strong references to in-flight summary tasks so they are not garbage collected.
+_background_tasks: set[asyncio.Task] = set()
+# Threads with a summary in progress; one summarizer per thread at a time.
+_summarizing: set[str] = set()
+
+
+async def summarize_history(graph: CompiledStateGraph, config: dict) -> None:
+    """
+    Fold turns that fell out of the verbatim window into the running summary
+    and drop them from the checkpointed message list.
+
+    The summary LLM call runs without the thread lock so it never delays the
+    next turn; the lock is only taken to apply the update.
+    """
+    thread_id = config["configurable"]["thread_id"]
+    if thread_id in _summarizing:
+        return
+    _summarizing.add(thread_id)
+    try:
+        snapshot = await graph.aget_state(config)
+        values = snapshot.values
+        evicted = evicted_messages(
+            values.get("messages") or [], max_turns=settings.history_max_turns
+        )
+        if not evicted:
+            return
+        async with llm_limiter.acquire():
+            with span("history.summarize", messages=len(evicted)):
+                summary = await summarize_messages(
+                    llm,
+                    values.get("summary"),
+                    evicted,
+                    tool_message_chars=settings.history_tool_message_chars,
+                    max_words=settings.history_summary_max_words,
+                )
+        async with thread_locks.hold(thread_id):
+            current = await graph.aget_state(config)
+            current_ids = {m.id for m in current.values.get("messages") or []}
+            if current.values.get("summary") != values.get("summary") or not all(
+                m.id in current_ids for m in evicted
+            ):
+                return  # state moved on underneath us; retry after the next turn
+            await graph.aupdate_state(
+                config,
+                {
+                    "summary": summary,
+                    "messages": [RemoveMessage(id=str(m.id)) for m in evicted if m.id],
+                },
+                as_node="call_llm",
+            )
+        logger.info(
+            "summarize_history: Folded %d messages into summary for thread %s",
+            len(evicted),
+            thread_id,
+        )
+    except Exception as e:
+        logger.error("summarize_history: Failed to update summary: %s", e)
+    finally:
+        _summarizing.discard(thread_id)
+
+
+def schedule_summary(graph: CompiledStateGraph, config: dict) -> None:
+    """Run summarize_history in the background, off the request's critical path."""
+    if not settings.history_summary_enabled:
+        return
+    task = asyncio.create_task(summarize_history(graph, config))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def create_checkpointer() -> AsyncMongoDBSaver:
+    """Mongo-backed checkpointer shared by the HTTP and WebSocket chat paths."""
     # Cast Database.client to Any to satisfy type checker
     checkpointer = AsyncMongoDBSaver(
         client=cast(Any, Database._async_client),
         db_name=settings.database_name,
-        checkpoint_collection_name="checkpointer",
+        checkpoint_collection_name=CHECKPOINT_COLLECTION,
+        writes_collection_name=WRITES_COLLECTION,
+        ttl=settings.checkpoint_ttl_seconds,
     )
-    graph = builder.compile(checkpointer=checkpointer)
+    # AsyncMongoDBSaver does not forward `serde` to its base class.
+    if (serde := get_checkpoint_serde()) is not None:
+        checkpointer.serde = serde
+    # Time checkpoint I/O as `checkpoint.*` spans inside the turn's trace.
+    for method in ("aget_tuple", "aput", "aput_writes"):
+        setattr(
+            checkpointer,
+            method,
+            traced(f"checkpoint.{method}")(getattr(checkpointer, method)),
+        )
+    return checkpointer
+
+
+@lru_cache(maxsize=1)
+def memory_graph() -> CompiledStateGraph:
+    """Graph with a process-local checkpointer, for offline evaluation runs."""
+    return builder.compile(checkpointer=InMemorySaver())
+
+
+@lru_cache(maxsize=1)
+def session_graph() -> CompiledStateGraph:
+    """
+    Graph for WebSocket sessions, compiled once per worker. Each session
+    binds its own in-memory checkpointer with ``copy()``, which is cheap.
+    """
+    return builder.compile()
+
+
+# (client, graph) for the Mongo-checkpointed graph; see mongo_graph().
+_mongo_graph: Optional[tuple[Any, CompiledStateGraph]] = None
+
+
+def mongo_graph() -> CompiledStateGraph:
+    """
+    Graph with the Mongo checkpointer, compiled once per worker (warmup
+    builds it). Recompiled only if the database client was replaced.
+    """
+    global _mongo_graph
+    client = Database._async_client
+    if _mongo_graph is None or _mongo_graph[0] is not client:
+        _mongo_graph = (client, builder.compile(checkpointer=create_checkpointer()))
+    return _mongo_graph[1]
+
+
+def thread_config(thread_id: str) -> dict:
+    return {
+        "recursion_limit": settings.agent_recursion_limit,
+        "configurable": {"thread_id": thread_id},
+    }
 
+
+async def run_agent_turn(
+    graph: CompiledStateGraph,
+    thread_id: str,
+    message: str,
+    include_products: bool = True,
+    deadline_seconds: Optional[float] = None,
+) -> dict:
+    """Run one user turn through ``graph`` under the thread lock and deadline."""
+    logger.info(
+        "chat_agent: Invoking agent for thread_id: %s, message: %s", thread_id, message
+    )
+    initial_state: AgentState = {
+        "messages": [HumanMessage(content=message)],
+        "query": None,
+        "queries": [],
+        "llm_response": None,
+        "product_info": None,
+    }
+    config = thread_config(thread_id)
+
+    # The budget covers waiting for the thread lock too. On expiry (or when
+    # the caller cancels us on disconnect) the graph task is cancelled,
+    # which cancels whichever provider call is in flight.
+    async def run_turn() -> dict:
+        waiting = time.perf_counter()
+        async with thread_locks.hold(thread_id):
+            turn.set(lock_wait_ms=round((time.perf_counter() - waiting) * 1000, 3))
+            return await graph.ainvoke(initial_state, config=config)
+
+    deadline = Deadline(deadline_seconds or settings.chat_deadline_seconds)
+    token = current_deadline.set(deadline)
     try:
-        logger.info(
-            f"chat_agent: Invoking agent for thread_id: {thread_id}, message: {message}"
-        )
-        initial_state: AgentState = {
-            "messages": [HumanMessage(content=message)],
-            "query": None,
-            "llm_response": None,
-            "product_info": None,
-        }
-        final_state = await graph.ainvoke(
-            initial_state,
-            config={"recursion_limit": 5, "configurable": {"thread_id": thread_id}},
+        with span("agent.turn", thread_id=thread_id) as turn:
+            final_state = await with_timeout(run_turn(), deadline.remaining())
+    finally:
+        current_deadline.reset(token)
+    schedule_summary(graph, config)
+    final_content = final_state["messages"][-1].content
+    logger.debug("chat_agent: Agent invocation successful. Response: %s", final_content)
+    response: dict[str, Any] = {"AI": final_content}
+    if include_products:
+        response["products"] = final_state.get("product_info") or []
+    return response
+
+
+# ---------- usage ----------
+async def chat_agent(
+    thread_id: str,
+    message: str,
+    include_products: bool = True,
+    deadline_seconds: Optional[float] = None,
+):
+    from agents.chat_session import ChatSession
+
+    session = await ChatSession.owner(thread_id)
+    if session is not None:
+        # A WebSocket session on this worker holds the thread's latest state;
+        # a turn written to Mongo behind its back would be lost at its next
+        # flush, so the turn runs through the session instead.
+        return await session.send(
+            message, include_products, deadline_seconds=deadline_seconds
         )
-        final_content = final_state["messages"][-1].content
-        logger.warning(
-            f"chat_agent: Agent invocation successful. Response: {final_content}"
+    if settings.chat_checkpointer == "memory":
+        graph = memory_graph()
+    else:
+        # Connects on first use; raises DatabaseConnectionError otherwise
+        await Database.get_async_client()
+        graph = mongo_graph()
+
+    try:
+        response = await run_agent_turn(
+            graph, thread_id, message, include_products, deadline_seconds
         )
-        return {"AI": final_content, "products": str(final_state["product_info"])}
+        if settings.chat_checkpointer == "mongo":
+            CheckpointCompactor.mark_dirty(thread_id)
+        return response
     except Exception as e:
         logger.error(
-            f"chat_agent: An error occurred during agent invocation for thread_id {thread_id}: {e}"
+            "chat_agent: An error occurred during agent invocation for thread_id %s: %s",
+            thread_id,
+            e,
         )
         raise e
@@ -0,0 +1,187 @@
+import asyncio
+from typing import Any, ClassVar, Optional
+
+from langgraph.checkpoint.base import BaseCheckpointSaver, CheckpointTuple
+from langgraph.checkpoint.memory import InMemorySaver
+
+from agents.chat_agent import (
+    create_checkpointer,
+    run_agent_turn,
+    session_graph,
+    thread_config,
+    token_sink,
+)
+from libs.checkpoint_retention import CheckpointCompactor
+from libs.concurrency import thread_locks
+from libs.database import Database, settings
+from libs.logger import get_logger
+from libs.metrics import MetricsRegistry
+from libs.tracing import traced
+
+logger = get_logger(__name__)
+
+active_sessions = MetricsRegistry.gauge(
+    "chat_ws_sessions_active", "Open WebSocket chat sessions"
+)
+checkpoint_flushes = MetricsRegistry.counter(
+    "chat_ws_checkpoint_flushes_total", "Write-behind checkpoint flushes to Mongo"
+)
+checkpoint_flush_seconds = MetricsRegistry.histogram(
+    "chat_ws_checkpoint_flush_seconds", "Time spent writing a session checkpoint"
+)
+
+
+class ChatSession:
+    """
+    Hot, in-memory chat state for one WebSocket connection.
+
+    The thread's latest checkpoint is read from Mongo once when the session
+    opens; turns then run against an in-memory checkpointer, and the newest
+    checkpoint is written back to Mongo shortly after each turn (write-behind)
+    and once more when the session closes.
+
+    While a session is open it owns the thread: it is registered in `live`,
+    and HTTP turns for the thread on this worker run through it (see
+    chat_agent). Sessions are per worker, so with several workers HTTP turns
+    for a thread with an open WebSocket must reach the same worker.
+    """
+
+    live: ClassVar[dict[str, "ChatSession"]] = {}
+
+    def __init__(
+        self, thread_id: str, durable: Optional[BaseCheckpointSaver] = None
+    ) -> None:
+        self.thread_id = thread_id
+        self.config = thread_config(thread_id)
+        self.durable = durable
+        self.memory = InMemorySaver()
+        self.graph = session_graph().copy({"checkpointer": self.memory})
+        self._flushed_id: Optional[str] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._sends = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closing = False
+        self._closed = asyncio.Event()
+
+    @classmethod
+    async def owner(cls, thread_id: str) -> Optional["ChatSession"]:
+        """
+        The open session that owns ``thread_id`` on this worker, if any. A
+        closing session is waited out, so its final flush lands in Mongo
+        before the caller reads the thread from there.
+        """
+        session = cls.live.get(thread_id)
+        if session is not None and session._closing:
+            await session._closed.wait()
+            return None
+        return session
+
+    async def open(self) -> None:
+        """Load the thread's latest checkpoint from Mongo into memory."""
+        if self.durable is None:
+            await Database.connect()
+            self.durable = create_checkpointer()
+        saved = await self.durable.aget_tuple(self.config)
+        if saved is not None:
+            await self._reset_memory(saved)
+            self._flushed_id = saved.checkpoint["id"]
+        ChatSession.live[self.thread_id] = self
+        active_sessions.inc()
+
+    async def send(
+        self,
+        message: str,
+        include_products: bool = True,
+        tokens: Optional[asyncio.Queue] = None,
+        deadline_seconds: Optional[float] = None,
+    ) -> dict:
+        """Run one turn; reply text chunks are put on ``tokens`` as they stream."""
+        # Counted before the first await, so close() waits for every turn
+        # handed to the session, including HTTP turns routed by owner().
+        self._sends += 1
+        self._idle.clear()
+        sink_token = token_sink.set(tokens)
+        try:
+            response = await run_agent_turn(
+                self.graph, self.thread_id, message, include_products, deadline_seconds
+            )
+        finally:
+            token_sink.reset(sink_token)
+            self._sends -= 1
+            if not self._sends:
+                self._idle.set()
+        self._schedule_flush()
+        return response
+
+    async def close(self) -> None:
+        """Flush pending state to Mongo and release the in-memory copy."""
+        self._closing = True
+        await self._idle.wait()
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        try:
+            await self.flush()
+        finally:
+            await self.memory.adelete_thread(self.thread_id)
+            if ChatSession.live.get(self.thread_id) is self:
+                del ChatSession.live[self.thread_id]
+            self._closed.set()
+            active_sessions.dec()
+
+    @traced("checkpoint.flush")
+    async def flush(self) -> None:
+        """Write the newest in-memory checkpoint to Mongo if it changed."""
+        # The thread lock keeps turns and summary updates from adding
+        # checkpoints while we copy and trim.
+        async with thread_locks.hold(self.thread_id):
+            latest = await self.memory.aget_tuple(self.config)
+            if latest is None or latest.checkpoint["id"] == self._flushed_id:
+                return
+            assert self.durable is not None
+            started = asyncio.get_running_loop().time()
+            await self.durable.aput(
+                latest.parent_config or self._base_config(),
+                latest.checkpoint,
+                latest.metadata,
+                latest.checkpoint["channel_versions"],
+            )
+            self._flushed_id = latest.checkpoint["id"]
+            await self._reset_memory(latest)
+        CheckpointCompactor.mark_dirty(self.thread_id)
+        checkpoint_flushes.inc()
+        checkpoint_flush_seconds.observe(asyncio.get_running_loop().time() - started)
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        # Coalesces quick follow-up turns into a single Mongo write.
+        await asyncio.sleep(settings.ws_checkpoint_flush_seconds)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(
+                "ChatSession: Checkpoint flush failed for thread %s: %s",
+                self.thread_id,
+                e,
+            )
+
+    def _base_config(self) -> dict[str, Any]:
+        return {"configurable": {"thread_id": self.thread_id, "checkpoint_ns": ""}}
+
+    async def _reset_memory(self, saved: CheckpointTuple) -> None:
+        """
+        Make ``saved`` the thread's only checkpoint in memory. InMemorySaver
+        keeps every checkpoint and every message-list version, which would
+        otherwise grow quadratically over a long session.
+        """
+        await self.memory.adelete_thread(self.thread_id)
+        await self.memory.aput(
+            saved.parent_config or self._base_config(),
+            saved.checkpoint,
+            saved.metadata,
+            saved.checkpoint["channel_versions"],
+        )
@@ -0,0 +1,38 @@
+import hashlib
+
+from libs.slug import generate_slug
+
+CATEGORIES = ["Furniture", "Lighting", "Decor", "Bags", "Kitchen"]
+BRANDS = ["Luxor", "Nordhaus", "Atelier 9", "Kasa"]
+
+
+def fake_products(query: str, count: int = 4) -> list[dict]:
+    """
+    Deterministic offline stand-in for the product search: the same query
+    always yields the same ``count`` product records, shaped like the
+    documents stored in the Mongo products collection.
+    """
+    products = []
+    for index in range(count):
+        digest = hashlib.sha256(f"{query}:{index}".encode()).digest()
+        name = f"{query.strip().title() or 'Product'} {index + 1}"
+        amount = 20 + int.from_bytes(digest[:2], "big") % 980
+        products.append(
+            {
+                "id": digest[:12].hex(),
+                "sku": f"FAKE-{digest[12:16].hex().upper()}",
+                "name": name,
+                "description": f"A {query} pick for offline evaluation.",
+                "category": CATEGORIES[digest[16] % len(CATEGORIES)],
+                "brand": BRANDS[digest[17] % len(BRANDS)],
+                "price": {"amount": float(amount), "currency": "USD"},
+                "stock_quantity": digest[18] % 40,
+                "in_stock": digest[18] % 40 > 0,
+                "rating": round(3 + (digest[19] % 21) / 10, 1),
+                "images": [f"https://images.example/{generate_slug(name)}.jpg"],
+                "tags": [generate_slug(query)],
+                "reviews": [],
+                "variants": [],
+            }
+        )
+    return products
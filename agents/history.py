@@ -0,0 +1,122 @@
+from typing import Optional, Sequence
+
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+
+from libs.logger import get_logger
+
+logger = get_logger(__name__)
+
+SUMMARY_PROMPT = """You maintain a running summary of a shopping-assistant conversation.
+Update the existing summary with the new messages below. Keep what the customer is
+looking for, their preferences (style, budget, size, colour), products already shown
+or rejected, and any open questions. Reply with the updated summary only, in at most
+{max_words} words.
+
+Existing summary:
+{summary}
+
+New messages:
+{transcript}"""
+
+
+def split_turns(messages: Sequence[BaseMessage]) -> list[list[BaseMessage]]:
+    """Group messages into turns; each turn starts at a HumanMessage."""
+    turns: list[list[BaseMessage]] = []
+    for msg in messages:
+        if isinstance(msg, HumanMessage) or not turns:
+            turns.append([msg])
+        else:
+            turns[-1].append(msg)
+    return turns
+
+
+def _compact_tool_message(msg: ToolMessage, max_chars: int) -> ToolMessage:
+    content = str(msg.content)
+    if len(content) <= max_chars:
+        return msg
+    return ToolMessage(
+        content=content[:max_chars].rstrip() + " … [earlier results truncated]",
+        tool_call_id=msg.tool_call_id,
+        id=msg.id,
+    )
+
+
+def select_history(
+    messages: Sequence[BaseMessage],
+    summary: Optional[str] = None,
+    max_turns: int = 4,
+    tool_message_chars: int = 300,
+) -> list[BaseMessage]:
+    """
+    Build the message window sent to the LLM.
+
+    Keeps the last ``max_turns`` turns verbatim (tool outputs from earlier
+    turns are truncated to ``tool_message_chars``) and prepends the running
+    summary of everything older, so the prompt size stays roughly constant.
+    """
+    turns = split_turns(messages)
+    window = turns[-max_turns:] if max_turns > 0 else turns[-1:]
+
+    selected: list[BaseMessage] = []
+    if summary:
+        selected.append(
+            SystemMessage(content=f"Summary of the earlier conversation: {summary}")
+        )
+    for index, turn in enumerate(window):
+        is_current_turn = index == len(window) - 1
+        for msg in turn:
+            if isinstance(msg, ToolMessage) and not is_current_turn:
+                selected.append(_compact_tool_message(msg, tool_message_chars))
+            else:
+                selected.append(msg)
+    return selected
+
+
+def evicted_messages(
+    messages: Sequence[BaseMessage], max_turns: int = 4
+) -> list[BaseMessage]:
+    """Return the messages that fall outside the verbatim turn window."""
+    turns = split_turns(messages)
+    if max_turns <= 0 or len(turns) <= max_turns:
+        return []
+    return [msg for turn in turns[:-max_turns] for msg in turn]
+
+
+def _transcript(messages: Sequence[BaseMessage], tool_message_chars: int) -> str:
+    lines = []
+    for msg in messages:
+        if isinstance(msg, HumanMessage):
+            role = "Customer"
+        elif isinstance(msg, AIMessage):
+            role = "Assistant"
+        elif isinstance(msg, ToolMessage):
+            role = "Product lookup"
+            msg = _compact_tool_message(msg, tool_message_chars)
+        else:
+            role = "System"
+        lines.append(f"{role}: {msg.content}")
+    return "\n".join(lines)
+
+
+async def summarize_messages(
+    llm: BaseLanguageModel,
+    previous_summary: Optional[str],
+    messages: Sequence[BaseMessage],
+    tool_message_chars: int = 300,
+    max_words: int = 150,
+) -> str:
+    """Fold ``messages`` into ``previous_summary`` with a single LLM call."""
+    prompt = SUMMARY_PROMPT.format(
+        max_words=max_words,
+        summary=previous_summary or "(none yet)",
+        transcript=_transcript(messages, tool_message_chars),
+    )
+    result = await llm.ainvoke(prompt)
+    return str(getattr(result, "content", result)).strip()
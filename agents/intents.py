@@ -0,0 +1,75 @@
+import random
+import re
+from typing import Optional
+
+# Canned intents from GENZ_AGENT_INSTRUCTIONS section 3 ("Mock & Common Questions").
+# Patterns match the whole message (ignoring case, punctuation and emojis) so that
+# "hi, do you have sofas?" still goes to the LLM.
+_FILLER = r"(?:\s+(?:there|sofia|babe|bestie|girl|guys|so much|again|a lot))*"
+_TAIL = r"[\s!.?,:)(☀-➿\U0001f300-\U0001faff]*"
+
+INTENT_PATTERNS: dict[str, list[str]] = {
+    "greeting": [
+        r"(?:hi+|hey+|hello+|hiya|heya|yo|sup|hola|howdy)" + _FILLER,
+        r"good\s+(?:morning|afternoon|evening)" + _FILLER,
+        r"what'?s\s+up" + _FILLER,
+    ],
+    "identity": [
+        r"who\s+(?:are|r)\s+(?:you|u)",
+        r"what\s+(?:are|r)\s+(?:you|u)",
+        r"what'?s\s+your\s+name|what\s+is\s+your\s+name",
+        r"are\s+(?:you|u)\s+(?:a\s+)?(?:bot|robot|human|real|ai)",
+    ],
+    "how_to_order": [
+        r"how\s+(?:do|can)\s+i\s+(?:place\s+an?\s+)?(?:order|buy|purchase|checkout|check\s+out)(?:\s+(?:something|stuff|here|from\s+you))?",
+        r"how\s+to\s+(?:place\s+an?\s+)?(?:order|buy|purchase|checkout|check\s+out)",
+        r"how\s+does\s+(?:ordering|checkout)\s+work",
+    ],
+    "thanks": [
+        r"(?:thanks|thank\s+(?:you|u)|thx|ty|tysm|thank\s+u|appreciate\s+(?:it|you|u))"
+        + _FILLER,
+        r"(?:ok(?:ay)?|cool|great|perfect|awesome)[\s,]+(?:thanks|thank\s+(?:you|u)|thx|ty)"
+        + _FILLER,
+    ],
+}
+
+INTENT_REPLIES: dict[str, list[str]] = {
+    "greeting": [
+        "Heyyy 👋 I'm Sofia — your shopping bestie 🛍️ What are we hunting for today?",
+        "Hiii ✨ Sofia here, ready to find you something that slaps 🔥 What's on your wishlist?",
+    ],
+    "identity": [
+        "I'm Sofia 👑 your personal shopping bestie! I help you find pieces you'll love, "
+        "check prices and stock, and style your picks 😌 What are you shopping for?",
+    ],
+    "how_to_order": [
+        "Ordering's a breeze ✨ Just tap what you love, and I'll help you wrap it up 🫶 "
+        "Want me to pull some options for you first?",
+    ],
+    "thanks": [
+        "Anytime 🫶 Lmk if you wanna see what's trending this week 👀",
+        "Always a pleasure ✨ I'm here whenever you wanna shop some more 🛍️",
+    ],
+}
+
+_COMPILED: dict[str, re.Pattern] = {
+    intent: re.compile(
+        r"^\s*(?:" + "|".join(patterns) + r")" + _TAIL + r"$", re.IGNORECASE
+    )
+    for intent, patterns in INTENT_PATTERNS.items()
+}
+
+
+def classify_intent(text: str) -> Optional[str]:
+    """Return the canned intent matching ``text``, or None if the LLM is needed."""
+    if not text or len(text) > 80:
+        return None
+    for intent, pattern in _COMPILED.items():
+        if pattern.match(text):
+            return intent
+    return None
+
+
+def intent_reply(intent: str) -> str:
+    """Pick a templated reply for a canned intent."""
+    return random.choice(INTENT_REPLIES[intent])
@@ -0,0 +1,246 @@
+import asyncio
+import os
+import re
+import time
+import zlib
+from functools import lru_cache
+from typing import Any, AsyncIterator, ClassVar, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+from pydantic import SecretStr
+
+from agents.instructions import GENZ_AGENT_INSTRUCTIONS
+from libs.database import settings
+from libs.logger import get_logger
+
+load_dotenv()
+logger = get_logger(__name__)
+
+
+def gemini_api_key() -> SecretStr:
+    return SecretStr(str(os.getenv("GOOGLE_API_KEY")))
+
+
+class FakeShoppingLLM(LLM):
+    """
+    Deterministic offline stand-in for Gemini.
+
+    Mimics the agent protocol: a customer message gets a
+    ``TOOL_CALL: product_lookup(query=...)`` reply, and tool results get a
+    short recommendation. ``latency_ms`` simulates provider latency.
+    """
+
+    latency_ms: float = 0.0
+    last_prompt: Optional[str] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-shopping"
+
+    def _respond(self, prompt: str) -> str:
+        self.last_prompt = prompt
+        # get_buffer_string prefixes each message with its role.
+        last_message = re.split(r"\n(?=(?:Human|AI|Tool|System): )", prompt.rstrip())[
+            -1
+        ]
+        if last_message.startswith("Tool: "):
+            return "Ooo these are such a vibe 🔥 Want me to help you pick a fave?"
+        query = last_message.removeprefix("Human: ")
+        query = " ".join(query.replace('"', "").split())[:80]
+        return f'TOOL_CALL: product_lookup(query="{query}")'
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self._respond(prompt)
+
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return self._respond(prompt)
+
+    async def _astream(
+        self,
+        prompt: str,
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[GenerationChunk]:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        for piece in re.findall(r"\S+\s*", self._respond(prompt)):
+            yield GenerationChunk(text=piece)
+
+
+@lru_cache(maxsize=65536)
+def _token_vector(token: str, size: int) -> np.ndarray:
+    rng = np.random.default_rng(zlib.crc32(token.encode()))
+    return rng.standard_normal(size).astype(np.float32)
+
+
+class TokenHashEmbeddings(Embeddings):
+    """
+    Deterministic offline embeddings: the normalised sum of one pseudo-random
+    vector per lower-cased word. Texts sharing words get similar vectors, so
+    vector search over the synthetic catalog returns sensible matches.
+    """
+
+    def __init__(self, size: int = 768):
+        self.size = size
+
+    def embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        for token in re.findall(r"[a-z0-9]+", text.lower()):
+            vector += _token_vector(token, self.size)
+        norm = float(np.linalg.norm(vector))
+        if norm:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed(text)
+
+
+@lru_cache(maxsize=1)
+def get_llm() -> BaseLanguageModel:
+    """Return the chat LLM selected by ``settings.llm_provider``."""
+    if settings.llm_provider == "fake":
+        return FakeShoppingLLM(latency_ms=settings.fake_llm_latency_ms)
+
+    from langchain_google_genai import GoogleGenerativeAI
+
+    return GoogleGenerativeAI(
+        model=settings.llm_model,
+        temperature=settings.llm_temperature,
+        google_api_key=gemini_api_key(),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_embeddings() -> Embeddings:
+    """Return the query embedding model selected by ``settings.embedding_provider``."""
+    if settings.embedding_provider == "fake":
+        # Same dimensionality as text-embedding-004 so the vector index still fits.
+        return TokenHashEmbeddings(size=768)
+
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    return GoogleGenerativeAIEmbeddings(
+        model="text-embedding-004", google_api_key=gemini_api_key()
+    )
+
+
+@lru_cache(maxsize=2)
+def get_cached_content_llm(cached_content: str) -> BaseLanguageModel:
+    """Gemini chat model bound to a CachedContent holding the system instructions."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model=settings.llm_model,
+        temperature=settings.llm_temperature,
+        google_api_key=gemini_api_key(),
+        cached_content=cached_content,
+    )
+
+
+class GeminiInstructionCache:
+    """
+    Keeps a Gemini CachedContent for GENZ_AGENT_INSTRUCTIONS so the static
+    system prompt is processed once per TTL instead of on every turn.
+
+    Creation failures (e.g. prompt below the provider's minimum cache size)
+    disable the cache for ``gemini_context_cache_retry_seconds`` and callers
+    fall back to sending the instructions inline.
+    """
+
+    _name: ClassVar[Optional[str]] = None
+    _expires_at: ClassVar[float] = 0.0
+    _retry_at: ClassVar[float] = 0.0
+    _lock: ClassVar[asyncio.Lock] = asyncio.Lock()
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return (
+            settings.gemini_context_cache_enabled and settings.llm_provider == "gemini"
+        )
+
+    @classmethod
+    async def get_name(cls) -> Optional[str]:
+        """Return a live cache name, creating or renewing it when needed."""
+        if not cls.enabled():
+            return None
+        now = time.time()
+        if cls._name and now < cls._expires_at - 60:
+            return cls._name
+        if now < cls._retry_at:
+            return None
+        async with cls._lock:
+            if cls._name and time.time() < cls._expires_at - 60:
+                return cls._name
+            try:
+                cls._name = await cls._create()
+                cls._expires_at = (
+                    time.time() + settings.gemini_context_cache_ttl_seconds
+                )
+                logger.info("Created Gemini context cache %s", cls._name)
+            except Exception as e:
+                logger.warning(
+                    "Gemini context cache unavailable, sending inline: %s",
+                    e,
+                    exc_info=True,
+                )
+                cls._name = None
+                cls._retry_at = (
+                    time.time() + settings.gemini_context_cache_retry_seconds
+                )
+        return cls._name
+
+    @classmethod
+    async def _create(cls) -> str:
+        from google.ai.generativelanguage_v1beta import (
+            CacheServiceAsyncClient,
+            CachedContent,
+            Content,
+            Part,
+        )
+        from google.protobuf import duration_pb2
+
+        client = CacheServiceAsyncClient(
+            client_options={"api_key": gemini_api_key().get_secret_value()}
+        )
+        model = settings.llm_model
+        cached = await client.create_cached_content(
+            cached_content=CachedContent(
+                model=model if model.startswith("models/") else f"models/{model}",
+                display_name="tryluxor-agent-instructions",
+                system_instruction=Content(parts=[Part(text=GENZ_AGENT_INSTRUCTIONS)]),
+                ttl=duration_pb2.Duration(
+                    seconds=settings.gemini_context_cache_ttl_seconds
+                ),
+            )
+        )
+        return cached.name
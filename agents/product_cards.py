@@ -0,0 +1,232 @@
+from typing import Any, Iterable, Optional
+
+from langchain_core.documents import Document
+
+from libs.slug import generate_slug
+from models.products_model import ChatProduct
+
+# Rough characters-per-token ratio for Gemini models; good enough for budgeting.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for prompt budgeting (no tokenizer round-trip)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    text = " ".join(str(text).split())
+    if len(text) <= max_chars:
+        return text
+    return text[: max(max_chars - 1, 0)].rstrip() + "…"
+
+
+def _unique(values: Iterable[Any], limit: int) -> list[str]:
+    seen: list[str] = []
+    for value in values:
+        value = str(value).strip()
+        if value and value.lower() not in (s.lower() for s in seen):
+            seen.append(value)
+        if len(seen) >= limit:
+            break
+    return seen
+
+
+def _product_id(product: dict) -> str:
+    """The Mongo ``_id`` when the record has one, else its catalog ``id``."""
+    if product.get("_id") is not None:
+        return str(product["_id"])
+    return str(product.get("id") or "")
+
+
+def _iter_records(
+    results: Iterable[tuple[Document, float] | dict],
+) -> Iterable[tuple[dict, Optional[float]]]:
+    """Yield (product_dict, score) pairs from vector or regex lookup results."""
+    for item in results:
+        if isinstance(item, tuple):
+            doc, score = item
+            yield doc.metadata, score
+        elif isinstance(item, dict):
+            yield item, None
+
+
+def product_card(product: dict, score: Optional[float] = None, review_chars: int = 120) -> dict:
+    """
+    Reduce a full product record to the fields the agent needs to recommend it.
+    """
+    card: dict[str, Any] = {
+        "id": _product_id(product),
+        "sku": product.get("sku"),
+        "name": product.get("name"),
+        "category": product.get("category"),
+        "brand": product.get("brand"),
+    }
+
+    price = product.get("price") or {}
+    if isinstance(price, dict) and price.get("amount") is not None:
+        card["price"] = {
+            "amount": price.get("amount"),
+            "currency": price.get("currency") or "USD",
+            "discounted_amount": price.get("discounted_amount"),
+            "discount_percentage": price.get("discount_percentage"),
+        }
+
+    card["in_stock"] = product.get("in_stock")
+    card["stock_quantity"] = product.get("stock_quantity")
+    card["rating"] = product.get("rating")
+
+    # Records from the catalog snapshot are already cards: keep their
+    # precomputed review summary and variant names.
+    reviews = product.get("reviews") or []
+    card["review_count"] = len(reviews) or product.get("review_count", 0)
+    comments = _unique(
+        (r.get("comment", "") for r in reviews if isinstance(r, dict)), limit=1
+    ) or ([product["top_review"]] if product.get("top_review") else [])
+    if comments:
+        card["top_review"] = _truncate(comments[0], review_chars)
+
+    variants = product.get("variants") or []
+    card["variants"] = _unique(
+        (v.get("name", "") if isinstance(v, dict) else v for v in variants), limit=4
+    )
+    card["tags"] = _unique(product.get("tags") or [], limit=5)
+    if score is not None:
+        card["score"] = round(float(score), 3)
+    return card
+
+
+def render_card(card: dict) -> str:
+    """Render a product card as a single compact line for the LLM prompt."""
+    parts = [str(card.get("name") or "Unnamed product")]
+    if card.get("category"):
+        parts.append(str(card["category"]))
+    if card.get("brand"):
+        parts.append(f"by {card['brand']}")
+
+    price = card.get("price")
+    if price:
+        text = f"{price['amount']} {price['currency']}"
+        if price.get("discounted_amount"):
+            text += f" (now {price['discounted_amount']}"
+            if price.get("discount_percentage"):
+                text += f", {price['discount_percentage']}% off"
+            text += ")"
+        parts.append(text)
+
+    if card.get("in_stock") is False or card.get("stock_quantity") == 0:
+        parts.append("out of stock")
+    elif card.get("stock_quantity") is not None and card["stock_quantity"] <= 5:
+        parts.append(f"only {card['stock_quantity']} left")
+    else:
+        parts.append("in stock")
+
+    if card.get("rating") is not None:
+        parts.append(f"rating {card['rating']} ({card.get('review_count', 0)} reviews)")
+    if card.get("variants"):
+        parts.append("variants: " + ", ".join(card["variants"]))
+    if card.get("tags"):
+        parts.append("tags: " + ", ".join(card["tags"]))
+    if card.get("top_review"):
+        parts.append(f'review: "{card["top_review"]}"')
+    if card.get("sku"):
+        parts.append(f"sku {card['sku']}")
+    return " | ".join(parts)
+
+
+def _unique_records(
+    results: Iterable[tuple[Document, float] | dict],
+) -> Iterable[tuple[dict, Optional[float]]]:
+    """
+    Drop repeated products, keeping the first (best scored) hit. Records with
+    no identifying field are always kept, since they cannot be told apart.
+    """
+    seen: set[str] = set()
+    for product, score in _iter_records(results):
+        identity = (
+            product.get("sku") or product.get("id") or product.get("_id") or product.get("name")
+        )
+        if identity is None:
+            yield product, score
+            continue
+        key = str(identity).lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        yield product, score
+
+
+def build_product_cards(
+    results: Iterable[tuple[Document, float] | dict], review_chars: int = 120
+) -> list[dict]:
+    """Build deduplicated product cards, keeping the first (best scored) hit."""
+    return [
+        product_card(product, score, review_chars)
+        for product, score in _unique_records(results)
+    ]
+
+
+def chat_product(product: dict, score: Optional[float] = None) -> ChatProduct:
+    """Reduce a full product record to what the frontend needs to render a tile."""
+    name = str(product.get("name") or "")
+    price = product.get("price") or {}
+    amount = None
+    currency = "USD"
+    if isinstance(price, dict):
+        amount = price.get("discounted_amount") or price.get("amount")
+        currency = price.get("currency") or currency
+    images = product.get("images") or []
+    return ChatProduct(
+        id=_product_id(product),
+        slug=generate_slug(name),
+        name=name,
+        price=amount,
+        currency=currency,
+        image=images[0] if images else None,
+        score=round(float(score), 3) if score is not None else None,
+    )
+
+
+def build_product_payload(
+    results: Iterable[tuple[Document, float] | dict],
+) -> list[dict]:
+    """Deduplicated, JSON-ready product list for the chat API response."""
+    return [
+        chat_product(product, score).model_dump()
+        for product, score in _unique_records(results)
+    ]
+
+
+def render_product_cards(
+    results: Iterable[tuple[Document, float] | dict],
+    token_budget: int = 800,
+    review_chars: int = 120,
+) -> str:
+    """
+    Render lookup results as compact numbered product cards within a token budget.
+
+    Cards are added in result order until the budget is spent; at least one
+    card is always included (truncated if needed) and the number of omitted
+    results is reported so the model knows there is more to offer.
+    """
+    cards = build_product_cards(results, review_chars)
+    if not cards:
+        return "No products found."
+
+    lines: list[str] = []
+    used = 0
+    for index, card in enumerate(cards, start=1):
+        line = f"{index}. {render_card(card)}"
+        cost = estimate_tokens(line) + 1
+        if lines and used + cost > token_budget:
+            break
+        if not lines and cost > token_budget:
+            line = _truncate(line, token_budget * CHARS_PER_TOKEN)
+            cost = token_budget
+        lines.append(line)
+        used += cost
+
+    omitted = len(cards) - len(lines)
+    if omitted > 0:
+        lines.append(f"(+{omitted} more matching products not shown)")
+    return "\n".join(lines)
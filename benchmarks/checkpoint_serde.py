@@ -0,0 +1,238 @@
+"""
+Compare checkpoint serializers: bytes written, encode/decode time and
+end-to-end chat latency through the agent graph.
+
+Runs fully offline (fake LLM, synthetic lookup results, in-memory saver):
+
+    python -m benchmarks.checkpoint_serde --turns 10 --products 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+from langchain_core.documents import Document
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.messages import HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.graph import END, START, StateGraph
+
+import agents.chat_agent as chat_agent
+from agents.product_cards import render_product_cards
+from libs.checkpoint_serde import ZstdMsgpackSerializer
+
+
+class CountingSerializer:
+    """Wraps a serializer and counts encoded bytes and time spent."""
+
+    def __init__(self, inner: SerializerProtocol):
+        self.inner = inner
+        self.bytes_written = 0
+        self.encode_seconds = 0.0
+        self.decode_seconds = 0.0
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        started = time.perf_counter()
+        type_, data = self.inner.dumps_typed(obj)
+        self.encode_seconds += time.perf_counter() - started
+        self.bytes_written += len(data)
+        return type_, data
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        started = time.perf_counter()
+        value = self.inner.loads_typed(data)
+        self.decode_seconds += time.perf_counter() - started
+        return value
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.inner.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.inner.loads(data)
+
+
+def synthetic_product(rng: random.Random, index: int) -> dict:
+    return {
+        "_id": f"{index:024x}",
+        "id": str(index),
+        "sku": f"SKU{index:05d}",
+        "name": f"Product {index}",
+        "description": " ".join(
+            rng.choice(["soft", "modern", "oak", "velvet", "cozy"]) for _ in range(60)
+        ),
+        "category": rng.choice(["Furniture", "Lighting", "Decor"]),
+        "brand": rng.choice(["Luxor", "Nordic", "Casa"]),
+        "price": {"amount": round(rng.uniform(20, 2000), 2), "currency": "USD"},
+        "stock_quantity": rng.randint(0, 50),
+        "in_stock": True,
+        "images": [f"https://cdn.example.com/{index}/{i}.jpg" for i in range(4)],
+        "tags": ["living room", "modern", "bestseller"],
+        "rating": round(rng.uniform(3, 5), 1),
+        "reviews": [
+            {
+                "user_id": i,
+                "rating": 5.0,
+                "comment": "Love it, great quality " * 8,
+                "created_at": "2025-01-01T00:00:00",
+            }
+            for i in range(rng.randint(2, 8))
+        ],
+        "variants": [
+            {"sku": f"SKU{index:05d}-{c}", "name": c, "attributes": {"color": c}}
+            for c in ("Red", "Blue", "Grey")
+        ],
+        "manufacturer": {
+            "name": "Acme",
+            "country": "IT",
+            "website": "https://acme.example.com",
+        },
+        "dimensions": {"length": 200.0, "width": 90.0, "height": 80.0},
+        "created_at": "2025-01-01T00:00:00",
+        "updated_at": "2025-01-01T00:00:00",
+    }
+
+
+def build_graph(products: int, seed: int) -> StateGraph:
+    """The chat agent topology with the Mongo lookup replaced by synthetic results."""
+    rng = random.Random(seed)
+
+    def product_lookup(state):
+        results = [
+            (
+                Document(page_content="summary", metadata=synthetic_product(rng, i)),
+                rng.random(),
+            )
+            for i in range(products)
+        ]
+        return {
+            "messages": [
+                ToolMessage(
+                    content=render_product_cards(results),
+                    tool_call_id="product_lookup_call",
+                )
+            ],
+            "product_info": results,
+        }
+
+    builder = StateGraph(chat_agent.AgentState)
+    builder.add_node("call_llm", chat_agent.call_llm)
+    builder.add_node("product_lookup", product_lookup)
+    builder.add_node(
+        "extract_query_from_llm_response", chat_agent.extract_query_from_llm_response
+    )
+    builder.add_edge(START, "call_llm")
+    builder.add_conditional_edges(
+        "call_llm",
+        chat_agent.should_continue,
+        {
+            "extract_query_from_llm_response": "extract_query_from_llm_response",
+            "call_llm": "call_llm",
+            "__end__": END,
+        },
+    )
+    builder.add_edge("extract_query_from_llm_response", "product_lookup")
+    builder.add_edge("product_lookup", "call_llm")
+    return builder
+
+
+async def run_chat(
+    serde: SerializerProtocol, turns: int, products: int, seed: int
+) -> dict:
+    counting = CountingSerializer(serde)
+    saver = InMemorySaver()
+    saver.serde = counting
+    graph = build_graph(products, seed).compile(checkpointer=saver)
+    chat_agent.llm = FakeListLLM(
+        responses=[
+            'TOOL_CALL: product_lookup(query="sofa")',
+            "Here are some sofas you will love!",
+        ]
+    )
+
+    latencies = []
+    config = {"recursion_limit": 5, "configurable": {"thread_id": "bench"}}
+    for turn in range(turns):
+        started = time.perf_counter()
+        await graph.ainvoke(
+            {
+                "messages": [HumanMessage(content=f"show me sofas #{turn}")],
+                "query": None,
+                "llm_response": None,
+                "product_info": None,
+            },
+            config=config,
+        )
+        latencies.append(time.perf_counter() - started)
+
+    state = (await graph.aget_state(config)).values
+    return {"latencies": latencies, "counting": counting, "state": state}
+
+
+def time_codec(serde: SerializerProtocol, value: Any, repeat: int) -> dict:
+    encoded = serde.dumps_typed(value)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        serde.dumps_typed(value)
+    encode = (time.perf_counter() - started) / repeat
+    started = time.perf_counter()
+    for _ in range(repeat):
+        serde.loads_typed(encoded)
+    decode = (time.perf_counter() - started) / repeat
+    return {
+        "bytes": len(encoded[1]),
+        "encode_ms": encode * 1000,
+        "decode_ms": decode * 1000,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--products", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--zstd-level", type=int, default=3)
+    args = parser.parse_args()
+
+    serializers: dict[str, SerializerProtocol] = {
+        "default": JsonPlusSerializer(),
+        "msgpack_zstd": ZstdMsgpackSerializer(level=args.zstd_level),
+    }
+    report = {}
+    for name, serde in serializers.items():
+        chat = await run_chat(serde, args.turns, args.products, args.seed)
+        codec = time_codec(serde, chat["state"], args.repeat)
+        counting: CountingSerializer = chat["counting"]
+        report[name] = {
+            "checkpoint_bytes_written": counting.bytes_written,
+            "encode_ms_total": round(counting.encode_seconds * 1000, 3),
+            "decode_ms_total": round(counting.decode_seconds * 1000, 3),
+            "final_state_bytes": codec["bytes"],
+            "final_state_encode_ms": round(codec["encode_ms"], 3),
+            "final_state_decode_ms": round(codec["decode_ms"], 3),
+            "chat_turn_ms_p50": round(statistics.median(chat["latencies"]) * 1000, 3),
+            "chat_turn_ms_max": round(max(chat["latencies"]) * 1000, 3),
+        }
+
+    default_bytes = report["default"]["checkpoint_bytes_written"] or 1
+    report["msgpack_zstd"]["bytes_ratio_vs_default"] = round(
+        report["msgpack_zstd"]["checkpoint_bytes_written"] / default_bytes, 3
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
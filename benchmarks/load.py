@@ -0,0 +1,275 @@
+"""
+Load-test the FastAPI app in-process at fixed concurrency.
+
+Drives /products, /products/search, /products/{slug} and /chat through
+httpx's ASGI transport and reports p50/p95/p99 latency, RPS, error counts
+and allocations per scenario as diffable JSON (sorted keys, fixed rounding).
+
+By default it runs fully offline: fake LLM/embeddings/catalog, in-memory
+chat checkpoints and an in-memory stand-in for the products collection.
+Pass --mongo-uri to run the catalog routes against a local MongoDB instead
+(the catalog is written to the `products` collection of --database).
+
+    python -m benchmarks.load --requests 500 --concurrency 16 --output bench.json
+    python -m benchmarks.load --compare bench.json --max-regression 0.2
+
+With --compare the run exits non-zero when a scenario's p95 or RPS regresses
+by more than --max-regression against the baseline file.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+import httpx
+
+from benchmarks.memory_mongo import MemoryCollection
+from libs.database import Database, settings
+from libs.slug import generate_slug
+from seeds.synthetic_catalog import generate_products
+
+QUERIES = ["velvet sofa", "black tote bag", "floor lamp", "coffee table", "boucle rug"]
+
+Request = tuple[str, str, Any]  # method, path, json body
+
+
+def build_catalog(size: int) -> list[dict]:
+    """Deterministic product documents shaped like the seeded collection."""
+    return list(generate_products(size, seed=42, embedding_dims=None))
+
+
+def scenarios(catalog: list[dict]) -> dict[str, Callable[[int], Request]]:
+    slugs = [generate_slug(product["name"]) for product in catalog[:50]]
+    return {
+        "products_list": lambda i: ("GET", "/products", None),
+        "products_search": lambda i: (
+            "GET",
+            f"/products/search?search={QUERIES[i % len(QUERIES)].split()[1]}"
+            "&min_price=50&max_price=800&limit=20",
+            None,
+        ),
+        "product_by_slug": lambda i: (
+            "GET",
+            f"/products/{slugs[i % len(slugs)]}",
+            None,
+        ),
+        "chat": lambda i: ("POST", "/chat", {"message": QUERIES[i % len(QUERIES)]}),
+    }
+
+
+def percentile(values: list[float], q: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    make_request: Callable[[int], Request],
+    total: int,
+    concurrency: int,
+) -> tuple[list[float], dict[str, int], float]:
+    """Send ``total`` requests with ``concurrency`` in flight; return latencies."""
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        for i in counter:
+            method, path, body = make_request(i)
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[str(response.status_code)] = (
+                statuses.get(str(response.status_code), 0) + 1
+            )
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+async def measure_allocations(
+    client: httpx.AsyncClient, make_request: Callable[[int], Request], total: int
+) -> dict[str, float]:
+    """
+    Separate sequential pass under tracemalloc so it does not skew latency.
+    Reports net live-memory growth per request and the peak traced size.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    await drive(client, make_request, total, concurrency=1)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated = sum(
+        stat.size_diff
+        for stat in after.compare_to(before, "filename")
+        if stat.size_diff > 0
+    )
+    return {
+        "alloc_net_kib_per_request": round(allocated / 1024 / total, 1),
+        "alloc_peak_kib": round(peak / 1024, 1),
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    make_request: Callable[[int], Request],
+    requests: int,
+    concurrency: int,
+    alloc_requests: int,
+) -> dict[str, Any]:
+    await drive(client, make_request, min(requests, concurrency * 2), concurrency)
+    latencies, statuses, elapsed = await drive(
+        client, make_request, requests, concurrency
+    )
+    result: dict[str, Any] = {
+        "requests": requests,
+        "statuses": statuses,
+        "errors": sum(n for code, n in statuses.items() if not code.startswith("2")),
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+    if alloc_requests:
+        result.update(await measure_allocations(client, make_request, alloc_requests))
+    return result
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], max_regression: float
+) -> list[str]:
+    failures = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+            failures.append(
+                f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms"
+            )
+        if current["rps"] < previous["rps"] * (1 - max_regression):
+            failures.append(f"{name}: rps {previous['rps']} -> {current['rps']}")
+    return failures
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--catalog-size", type=int, default=1000)
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--lookup-latency-ms", type=float, default=10.0)
+    parser.add_argument("--alloc-requests", type=int, default=20)
+    parser.add_argument("--scenarios", nargs="*", default=None)
+    parser.add_argument("--mongo-uri", default=None)
+    parser.add_argument("--database", default="tryLuxor_benchmark")
+    parser.add_argument("--output", default="-")
+    parser.add_argument("--compare", default=None, help="baseline JSON to gate on")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # Offline providers must be selected before the app (and agent) import.
+    settings.llm_provider = "fake"
+    settings.fake_llm_latency_ms = args.llm_latency_ms
+    settings.embedding_provider = "fake"
+    settings.catalog_provider = "fake"
+    settings.fake_lookup_latency_ms = args.lookup_latency_ms
+    settings.chat_checkpointer = "memory"
+    settings.history_summary_enabled = False
+    settings.checkpoint_compaction_enabled = False
+    # Measure the app, not the load shedder.
+    settings.chat_max_in_flight = max(settings.chat_max_in_flight, args.concurrency)
+    settings.llm_max_concurrency = max(settings.llm_max_concurrency, args.concurrency)
+
+    from main import app
+
+    catalog = build_catalog(args.catalog_size)
+    if args.mongo_uri:
+        settings.mongo_uri = args.mongo_uri
+        settings.database_name = args.database
+        await Database.connect()
+        collection = await Database.get_async_collection("products")
+        await collection.delete_many({})
+        await collection.insert_many(catalog)
+    else:
+        products = MemoryCollection(catalog)
+
+        async def get_async_collection(name: str) -> MemoryCollection:
+            return products
+
+        Database.get_async_collection = get_async_collection  # type: ignore[method-assign]
+        Database.get_catalog_collection = get_async_collection  # type: ignore[method-assign]
+
+    selected = scenarios(catalog)
+    if args.scenarios:
+        selected = {name: selected[name] for name in args.scenarios}
+
+    results: dict[str, Any] = {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "catalog_size": args.catalog_size,
+            "llm_latency_ms": args.llm_latency_ms,
+            "lookup_latency_ms": args.lookup_latency_ms,
+            "backend": "mongo" if args.mongo_uri else "memory",
+            "python": platform.python_version(),
+        },
+        "scenarios": {},
+    }
+    # Per-request app logging would dominate the measurement.
+    logging.disable(logging.WARNING)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        # Keep stray prints from the app out of the JSON report on stdout.
+        with contextlib.redirect_stdout(sys.stderr):
+            for name, make_request in selected.items():
+                print(f"running {name}...", file=sys.stderr)
+                results["scenarios"][name] = await run_scenario(
+                    client,
+                    make_request,
+                    args.requests,
+                    args.concurrency,
+                    args.alloc_requests,
+                )
+    if args.mongo_uri:
+        await Database.disconnect()
+
+    report = json.dumps(results, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(report)
+    else:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(report + "\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as source:
+            failures = compare(results, json.load(source), args.max_regression)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""
+In-memory stand-in for the motor collection API used by the product routes.
+
+Supports the subset the app issues: find/count_documents/find_one with
+equality, $regex/$options, $gt/$gte/$lt/$lte/$in and $or filters on dotted
+paths, and cursors with sort/skip/limit/to_list. Only meant for offline
+benchmarks; anything else raises NotImplementedError so gaps are obvious.
+"""
+
+import re
+from typing import Any, Optional
+
+
+def _get(doc: Any, path: str) -> Any:
+    for part in path.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+
+def _compare(value: Any, op: str, arg: Any, options: str) -> bool:
+    if isinstance(value, list) and op != "$in":
+        return any(_compare(item, op, arg, options) for item in value)
+    if op == "$regex":
+        flags = re.IGNORECASE if "i" in options else 0
+        return isinstance(value, str) and re.search(arg, value, flags) is not None
+    if op == "$eq":
+        return value == arg
+    if op == "$in":
+        values = value if isinstance(value, list) else [value]
+        return any(item in arg for item in values)
+    if value is None:
+        return False
+    if op == "$gt":
+        return value > arg
+    if op == "$gte":
+        return value >= arg
+    if op == "$lt":
+        return value < arg
+    if op == "$lte":
+        return value <= arg
+    raise NotImplementedError(f"memory_mongo: unsupported operator {op}")
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+            continue
+        value = _get(doc, key)
+        if isinstance(condition, dict) and any(k.startswith("$") for k in condition):
+            options = condition.get("$options", "")
+            for op, arg in condition.items():
+                if op != "$options" and not _compare(value, op, arg, options):
+                    return False
+        elif not _compare(value, "$eq", condition, ""):
+            return False
+    return True
+
+
+class MemoryCursor:
+    def __init__(self, docs: list[dict]):
+        self._docs = docs
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key: str, direction: int = 1) -> "MemoryCursor":
+        present = [doc for doc in self._docs if _get(doc, key) is not None]
+        missing = [doc for doc in self._docs if _get(doc, key) is None]
+        present.sort(key=lambda doc: _get(doc, key), reverse=direction < 0)
+        # Missing values sort lowest, as in MongoDB.
+        self._docs = missing + present if direction > 0 else present + missing
+        return self
+
+    def skip(self, count: int) -> "MemoryCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "MemoryCursor":
+        self._limit = count
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> list[dict]:
+        docs = self._docs[self._skip :]
+        for bound in (self._limit, length):
+            if bound:
+                docs = docs[:bound]
+        # Routes mutate results (e.g. pop "_id"), so hand out copies.
+        return [dict(doc) for doc in docs]
+
+
+class MemoryCollection:
+    def __init__(self, docs: Optional[list[dict]] = None):
+        self.docs: list[dict] = list(docs or [])
+
+    def find(self, query: Optional[dict] = None) -> MemoryCursor:
+        return MemoryCursor([doc for doc in self.docs if matches(doc, query or {})])
+
+    async def find_one(self, query: Optional[dict] = None) -> Optional[dict]:
+        found = await self.find(query).limit(1).to_list()
+        return found[0] if found else None
+
+    async def count_documents(self, query: dict) -> int:
+        return sum(1 for doc in self.docs if matches(doc, query))
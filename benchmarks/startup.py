@@ -0,0 +1,147 @@
+"""
+Report what a cold worker spends before it can serve traffic.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter and
+breaks the import cost down per top-level package and per slowest module,
+then times a cold process from interpreter start to its first /products
+response (in-process ASGI call, offline catalog, no lifespan).
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 5 --top 15 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+COLD_REQUEST = """
+import time
+started = time.perf_counter()
+import asyncio, httpx
+from main import app
+imported = time.perf_counter()
+from benchmarks.memory_mongo import MemoryCollection
+from libs.database import Database
+
+products = MemoryCollection(
+    [
+        {"_id": i, "sku": f"SKU-{i}", "name": f"Lamp {i}", "category": "Lighting",
+         "price": {"amount": 10.0 + i, "currency": "USD"}}
+        for i in range(100)
+    ]
+)
+async def get_collection(name):
+    return products
+Database.get_async_collection = Database.get_catalog_collection = get_collection
+
+async def first_request():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://cold") as c:
+        response = await c.get("/products")
+        assert response.status_code == 200, response.text
+asyncio.run(first_request())
+done = time.perf_counter()
+print(f"{imported - started} {done - started}")
+"""
+
+
+def child_env() -> dict[str, str]:
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="1")
+    env.setdefault("GOOGLE_API_KEY", "startup-report")
+    return env
+
+
+def import_breakdown(top: int) -> dict[str, Any]:
+    """Parse -X importtime output for `import main` (microseconds -> ms)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT,
+        env=child_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules: list[tuple[str, int, int]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (
+            part.strip() for part in line.split(":", 1)[1].split("|")
+        )
+        modules.append((name, int(self_us), int(cumulative_us)))
+
+    packages: dict[str, int] = {}
+    for name, self_us, _ in modules:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    slowest = sorted(modules, key=lambda module: module[1], reverse=True)[:top]
+    return {
+        "total_ms": round(sum(self_us for _, self_us, _ in modules) / 1000, 1),
+        "modules": len(modules),
+        "by_package_ms": {
+            package: round(us / 1000, 1)
+            for package, us in sorted(packages.items(), key=lambda p: -p[1])[:top]
+        },
+        "slowest_modules_ms": {
+            name: round(self_us / 1000, 1) for name, self_us, _ in slowest
+        },
+        "app_modules_cumulative_ms": {
+            name: round(cumulative_us / 1000, 1)
+            for name, _, cumulative_us in modules
+            if name.split(".")[0] in ("main", "routes", "agents", "libs", "seeds")
+            and cumulative_us >= 5000
+        },
+    }
+
+
+def cold_first_response(runs: int) -> dict[str, Any]:
+    imports, firsts = [], []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", COLD_REQUEST],
+            cwd=ROOT,
+            env=child_env(),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        imported, first = map(float, result.stdout.split()[-2:])
+        imports.append(imported * 1000)
+        firsts.append(first * 1000)
+    return {
+        "runs": runs,
+        "import_main_ms": round(statistics.median(imports), 1),
+        "first_products_response_ms": round(statistics.median(firsts), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", default="-")
+    args = parser.parse_args()
+
+    report = {
+        "python": sys.version.split()[0],
+        "imports": import_breakdown(args.top),
+        "cold_start": cold_first_response(args.runs),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
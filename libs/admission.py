@@ -0,0 +1,114 @@
+import math
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from libs.database import settings
+from libs.metrics import MetricsRegistry
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; ``retry_after`` is a hint in seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Adaptive admission control for expensive endpoints.
+
+    Tracks in-flight requests and an EWMA of recent LLM latency. The
+    concurrency limit shrinks proportionally when latency rises above
+    ``target_latency`` (Little's law: keep queueing delay roughly constant),
+    never dropping below ``min_in_flight``. Requests over the limit are
+    rejected up front instead of queueing until they time out. Priority
+    requests are always admitted but still counted.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_in_flight: int,
+        min_in_flight: int,
+        target_latency: float,
+        ewma_alpha: float = 0.2,
+    ):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.min_in_flight = min_in_flight
+        self.target_latency = target_latency
+        self.ewma_alpha = ewma_alpha
+        self.in_flight = 0
+        self.latency_ewma: Optional[float] = None
+        self._lock = threading.Lock()
+        self._in_flight_gauge = MetricsRegistry.gauge(
+            f"{name}_admission_in_flight", f"Admitted {name} requests in flight"
+        )
+        self._limit_gauge = MetricsRegistry.gauge(
+            f"{name}_admission_limit", f"Current adaptive {name} concurrency limit"
+        )
+        self._latency_gauge = MetricsRegistry.gauge(
+            f"{name}_admission_latency_ewma_seconds",
+            f"EWMA of recent LLM latency seen by {name}",
+        )
+        self._rejected = MetricsRegistry.counter(
+            f"{name}_admission_rejected_total", f"{name} requests shed with 429"
+        )
+        self._priority = MetricsRegistry.counter(
+            f"{name}_admission_priority_total",
+            f"{name} requests admitted through the priority bypass",
+        )
+        self._limit_gauge.set(max_in_flight)
+
+    def record_latency(self, seconds: float) -> None:
+        """Feed an observed LLM call latency into the EWMA."""
+        with self._lock:
+            if self.latency_ewma is None:
+                self.latency_ewma = seconds
+            else:
+                self.latency_ewma += self.ewma_alpha * (seconds - self.latency_ewma)
+            self._latency_gauge.set(self.latency_ewma)
+            self._limit_gauge.set(self.limit())
+
+    def limit(self) -> int:
+        if not self.latency_ewma or self.latency_ewma <= self.target_latency:
+            return self.max_in_flight
+        scaled = self.max_in_flight * self.target_latency / self.latency_ewma
+        return max(self.min_in_flight, int(scaled))
+
+    def retry_after(self) -> int:
+        """Seconds until capacity is likely to free up."""
+        latency = self.latency_ewma or self.target_latency
+        return max(1, math.ceil(latency))
+
+    def check(self, priority: bool = False) -> None:
+        """Raise AdmissionRejected if a request would be shed now, without admitting it."""
+        if not priority and self.in_flight >= self.limit():
+            self._rejected.inc()
+            raise AdmissionRejected(
+                f"{self.name} over capacity ({self.in_flight}/{self.limit()} in flight)",
+                retry_after=self.retry_after(),
+            )
+
+    @asynccontextmanager
+    async def admit(self, priority: bool = False) -> AsyncIterator[None]:
+        self.check(priority)
+        if priority:
+            self._priority.inc()
+        self.in_flight += 1
+        self._in_flight_gauge.set(self.in_flight)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._in_flight_gauge.set(self.in_flight)
+
+
+chat_admission = AdmissionController(
+    "chat",
+    max_in_flight=settings.chat_max_in_flight,
+    min_in_flight=settings.chat_min_in_flight,
+    target_latency=settings.chat_target_llm_latency_seconds,
+)
@@ -0,0 +1,24 @@
+import secrets
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from libs.database import settings
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """True when admin endpoints are enabled and ``token`` matches."""
+    if settings.admin_token is None or not token:
+        return False
+    return secrets.compare_digest(token, settings.admin_token.get_secret_value())
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """
+    Guard for admin-only endpoints: the `X-Admin-Token` header must match
+    `settings.admin_token`. Without a configured token the endpoints are off.
+    """
+    if settings.admin_token is None:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
@@ -0,0 +1,326 @@
+"""
+Read-only, memory-mapped catalog snapshot shared by all workers on a host.
+
+One file holds, per product row: the id, the slug, a compact JSON product
+record, and one row of a float32 embedding matrix (L2-normalised, so a dot
+product is the cosine similarity). Workers map it with ``mmap`` and read it
+through zero-copy NumPy views; the pages live once in the OS page cache no
+matter how many workers map them, and opening a snapshot does not touch
+Mongo. A builder process (seeds/catalog_snapshot.py) writes a new version
+next to the old one and atomically repoints ``CURRENT``; workers notice on
+their next periodic check and swap.
+
+Layout: 8-byte magic, little-endian uint64 header length, JSON header
+(version, rows, dims and a section table), then 64-byte aligned sections:
+
+    embeddings      float32 [rows, dims]
+    id_offsets      uint64  [rows + 1]   into id_blob (utf-8)
+    slug_offsets    uint64  [rows + 1]   into slug_blob (utf-8)
+    record_offsets  uint64  [rows + 1]   into record_blob (JSON)
+    slug_order      uint32  [rows]       rows sorted by slug bytes
+"""
+
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, ClassVar, Optional, Sequence
+
+import orjson
+
+from libs.database import settings
+from libs.logger import get_logger
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# numpy is imported where a snapshot is actually built or mapped, so workers
+# without a published snapshot (the default) do not import it at startup.
+logger = get_logger(__name__)
+
+MAGIC = b"LUXCAT01"
+ALIGN = 64
+POINTER = "CURRENT"
+SECTIONS = ("id", "slug", "record")
+
+
+class SnapshotFormatError(Exception):
+    """Raised when a snapshot file is truncated or not a catalog snapshot."""
+
+
+def _pad(size: int) -> int:
+    return -size % ALIGN
+
+
+class SnapshotWriter:
+    """
+    Streams rows into a new snapshot file. Embeddings and records are
+    spilled to temporary files as they arrive, so building a large catalog
+    only keeps ids and slugs in memory.
+    """
+
+    def __init__(self, path: str, dims: int):
+        self.path = path
+        self.dims = dims
+        self.rows = 0
+        self._ids: list[bytes] = []
+        self._slugs: list[bytes] = []
+        self._record_offsets = [0]
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._embeddings = tempfile.TemporaryFile(dir=directory)
+        self._records = tempfile.TemporaryFile(dir=directory)
+
+    def add(
+        self,
+        product_id: str,
+        slug: str,
+        record: dict,
+        embedding: Optional[Sequence[float]] = None,
+    ) -> None:
+        import numpy as np
+
+        if self.dims:
+            vector = np.zeros(self.dims, dtype=np.float32)
+            if embedding is not None and len(embedding) == self.dims:
+                vector[:] = embedding
+                norm = float(np.linalg.norm(vector))
+                if norm:
+                    vector /= norm
+            self._embeddings.write(vector.tobytes())
+        data = orjson.dumps(record)
+        self._records.write(data)
+        self._record_offsets.append(self._record_offsets[-1] + len(data))
+        self._ids.append(product_id.encode())
+        self._slugs.append(slug.encode())
+        self.rows += 1
+
+    @staticmethod
+    def _blob(values: list[bytes]) -> tuple["np.ndarray", bytes]:
+        import numpy as np
+
+        offsets = np.zeros(len(values) + 1, dtype=np.uint64)
+        np.cumsum([len(value) for value in values], out=offsets[1:])
+        return offsets, b"".join(values)
+
+    def finish(self, version: Optional[str] = None) -> dict:
+        """Write the snapshot file (via a temp file + rename) and return its header."""
+        import numpy as np
+
+        id_offsets, id_blob = self._blob(self._ids)
+        slug_offsets, slug_blob = self._blob(self._slugs)
+        order = sorted(range(self.rows), key=self._slugs.__getitem__)
+        arrays: list[tuple[str, Any]] = [
+            ("embeddings", self._embeddings),
+            ("id_offsets", id_offsets),
+            ("id_blob", id_blob),
+            ("slug_offsets", slug_offsets),
+            ("slug_blob", slug_blob),
+            ("record_offsets", np.asarray(self._record_offsets, dtype=np.uint64)),
+            ("record_blob", self._records),
+            ("slug_order", np.asarray(order, dtype=np.uint32)),
+        ]
+        sizes = {}
+        for name, value in arrays:
+            if isinstance(value, bytes):
+                sizes[name] = len(value)
+            elif isinstance(value, np.ndarray):
+                sizes[name] = value.nbytes
+            else:  # spilled temp file, positioned at its end
+                sizes[name] = value.tell()
+        header: dict[str, Any] = {
+            "version": version
+            or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f"),
+            "created_at": time.time(),
+            "rows": self.rows,
+            "dims": self.dims,
+            "sections": {},
+        }
+        # The header size depends on the offsets it lists; iterate to a fixpoint.
+        header_size = 0
+        while True:
+            offset = len(MAGIC) + 8 + header_size
+            offset += _pad(offset)
+            for name, _ in arrays:
+                header["sections"][name] = [offset, sizes[name]]
+                offset += sizes[name] + _pad(sizes[name])
+            encoded = orjson.dumps(header)
+            if len(encoded) == header_size:
+                break
+            header_size = len(encoded)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(MAGIC + struct.pack("<Q", len(encoded)) + encoded)
+            for name, value in arrays:
+                out.write(b"\0" * (header["sections"][name][0] - out.tell()))
+                if isinstance(value, bytes):
+                    out.write(value)
+                elif isinstance(value, np.ndarray):
+                    out.write(value.tobytes())
+                else:
+                    value.seek(0)
+                    shutil.copyfileobj(value, out, 1 << 20)
+                    value.close()
+            out.write(b"\0" * _pad(out.tell()))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, self.path)
+        return header
+
+
+def publish(directory: str, path: str, keep: int = 2) -> None:
+    """Atomically point ``directory/CURRENT`` at ``path``; prune old versions."""
+    pointer = os.path.join(directory, POINTER)
+    tmp_pointer = f"{pointer}.tmp"
+    with open(tmp_pointer, "w", encoding="utf-8") as out:
+        out.write(os.path.basename(path))
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_pointer, pointer)
+    # Workers still mapping an unlinked version keep reading it until they swap.
+    versions = sorted(name for name in os.listdir(directory) if name.endswith(".snap"))
+    for name in versions[: max(len(versions) - keep, 0)]:
+        if name != os.path.basename(path):
+            os.remove(os.path.join(directory, name))
+
+
+class CatalogSnapshot:
+    """A mapped snapshot file. All arrays are read-only views into the map."""
+
+    def __init__(self, path: str):
+        import numpy as np
+
+        self.path = path
+        with open(path, "rb") as source:
+            self._map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC:
+            raise SnapshotFormatError(f"{path} is not a catalog snapshot")
+        (header_size,) = struct.unpack_from("<Q", self._map, len(MAGIC))
+        start = len(MAGIC) + 8
+        self.header = orjson.loads(self._map[start : start + header_size])
+        self.version: str = self.header["version"]
+        self.rows: int = self.header["rows"]
+        self.dims: int = self.header["dims"]
+        sections = self.header["sections"]
+        if max(offset + size for offset, size in sections.values()) > len(self._map):
+            raise SnapshotFormatError(f"{path} is truncated")
+
+        def view(name: str, dtype: Any, count: int) -> "np.ndarray":
+            return np.frombuffer(
+                self._map, dtype=dtype, count=count, offset=sections[name][0]
+            )
+
+        self.embeddings = view("embeddings", np.float32, self.rows * self.dims)
+        self.embeddings = self.embeddings.reshape(self.rows, self.dims)
+        self._offsets = {
+            name: view(f"{name}_offsets", np.uint64, self.rows + 1) for name in SECTIONS
+        }
+        self._blobs = {name: sections[f"{name}_blob"][0] for name in SECTIONS}
+        self.slug_order = view("slug_order", np.uint32, self.rows)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _bytes(self, section: str, row: int) -> bytes:
+        offsets = self._offsets[section]
+        base = self._blobs[section]
+        return self._map[base + int(offsets[row]) : base + int(offsets[row + 1])]
+
+    def product_id(self, row: int) -> str:
+        return self._bytes("id", row).decode()
+
+    def slug(self, row: int) -> str:
+        return self._bytes("slug", row).decode()
+
+    def record(self, row: int) -> dict:
+        return orjson.loads(self._bytes("record", row))
+
+    def find_slug(self, slug: str) -> Optional[int]:
+        """Row for ``slug`` by binary search over the sorted slug order."""
+        target = slug.encode()
+        low, high = 0, self.rows
+        while low < high:
+            middle = (low + high) // 2
+            if self._bytes("slug", int(self.slug_order[middle])) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.rows:
+            row = int(self.slug_order[low])
+            if self._bytes("slug", row) == target:
+                return row
+        return None
+
+    def search(self, vector: Sequence[float], k: int = 4) -> list[tuple[int, float]]:
+        """Top-``k`` (row, cosine score) pairs by brute-force dot product."""
+        import numpy as np
+
+        if not self.rows or not self.dims:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if not norm:
+            return []
+        scores = self.embeddings @ (query / norm)
+        k = min(k, self.rows)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), float(scores[row])) for row in top]
+
+
+class SnapshotStore:
+    """
+    The snapshot this worker currently serves from. ``current()`` re-reads
+    the ``CURRENT`` pointer at most every ``catalog_snapshot_check_seconds``
+    and swaps to a newly published version; readers holding the old object
+    keep a valid mapping until they drop it.
+    """
+
+    _snapshot: ClassVar[Optional[CatalogSnapshot]] = None
+    _pointer: ClassVar[Optional[str]] = None
+    _checked_at: ClassVar[float] = float("-inf")
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def current(cls) -> Optional[CatalogSnapshot]:
+        now = time.monotonic()
+        if now - cls._checked_at < settings.catalog_snapshot_check_seconds:
+            return cls._snapshot
+        with cls._lock:
+            cls._checked_at = now
+            try:
+                with open(
+                    os.path.join(settings.catalog_snapshot_dir, POINTER),
+                    encoding="utf-8",
+                ) as pointer:
+                    name = pointer.read().strip()
+            except FileNotFoundError:
+                return cls._snapshot
+            if name == cls._pointer:
+                return cls._snapshot
+            try:
+                snapshot = CatalogSnapshot(
+                    os.path.join(settings.catalog_snapshot_dir, name)
+                )
+            except (OSError, SnapshotFormatError) as e:
+                logger.exception("Could not map catalog snapshot %s", name)
+                return cls._snapshot
+            cls._snapshot, cls._pointer = snapshot, name
+            logger.info(
+                "Serving catalog snapshot %s (%d products, %d dims)",
+                snapshot.version,
+                snapshot.rows,
+                snapshot.dims,
+            )
+            return snapshot
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._snapshot = cls._pointer = None
+            cls._checked_at = float("-inf")
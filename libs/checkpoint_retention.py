@@ -0,0 +1,239 @@
+import asyncio
+import time
+from typing import ClassVar, Optional
+
+from pymongo.errors import OperationFailure
+
+from libs.database import Database, settings
+from libs.logger import get_logger
+from libs.metrics import MetricsRegistry
+
+logger = get_logger(__name__)
+
+CHECKPOINT_COLLECTION = "checkpointer"
+WRITES_COLLECTION = "checkpoint_writes_aio"
+TTL_INDEX_NAME = "created_at_ttl"
+
+bytes_reclaimed = MetricsRegistry.counter(
+    "checkpoint_compactor_bytes_reclaimed_total",
+    "BSON bytes of checkpoint and write documents deleted by the compactor",
+)
+checkpoints_deleted = MetricsRegistry.counter(
+    "checkpoint_compactor_checkpoints_deleted_total",
+    "Checkpoint documents deleted by the compactor",
+)
+writes_deleted = MetricsRegistry.counter(
+    "checkpoint_compactor_writes_deleted_total",
+    "Pending-write documents deleted by the compactor",
+)
+compaction_runs = MetricsRegistry.counter(
+    "checkpoint_compactor_runs_total", "Completed compaction passes"
+)
+compaction_duration = MetricsRegistry.histogram(
+    "checkpoint_compactor_run_seconds", "Duration of a compaction pass"
+)
+dirty_threads_gauge = MetricsRegistry.gauge(
+    "checkpoint_compactor_dirty_threads", "Threads waiting to be compacted"
+)
+
+
+async def _bson_size(collection, query: dict) -> int:
+    """Total BSON size of documents matching ``query``."""
+    cursor = collection.aggregate(
+        [
+            {"$match": query},
+            {"$group": {"_id": None, "bytes": {"$sum": {"$bsonSize": "$$ROOT"}}}},
+        ]
+    )
+    async for row in cursor:
+        return int(row["bytes"])
+    return 0
+
+
+async def _ensure_ttl_index(collection, ttl_seconds: int) -> None:
+    """Create the created_at TTL index, or update its expiry if it changed."""
+    indexes = await collection.index_information()
+    for name, info in indexes.items():
+        if info.get("key") == [("created_at", 1)]:
+            if info.get("expireAfterSeconds") != ttl_seconds:
+                await collection.database.command(
+                    {
+                        "collMod": collection.name,
+                        "index": {"name": name, "expireAfterSeconds": ttl_seconds},
+                    }
+                )
+            return
+    await collection.create_index(
+        [("created_at", 1)], name=TTL_INDEX_NAME, expireAfterSeconds=ttl_seconds
+    )
+
+
+class CheckpointCompactor:
+    """
+    Keeps the LangGraph checkpoint collections bounded.
+
+    - Threads touched by chat turns are marked dirty and pruned in the
+      background down to their latest ``checkpoint_keep_last`` checkpoints
+      (plus the pending writes that belong to them).
+    - A periodic full sweep catches threads written before the compactor ran.
+    - TTL indexes on ``created_at`` expire threads that went inactive.
+    """
+
+    _dirty: ClassVar[set[tuple[str, str]]] = set()
+    _task: ClassVar[Optional[asyncio.Task]] = None
+
+    @classmethod
+    def mark_dirty(cls, thread_id: str, checkpoint_ns: str = "") -> None:
+        """Schedule a thread for compaction after a chat turn wrote to it."""
+        cls._dirty.add((thread_id, checkpoint_ns))
+        dirty_threads_gauge.set(len(cls._dirty))
+
+    @classmethod
+    async def ensure_indexes(cls) -> None:
+        """
+        Create the saver's lookup indexes and, when configured, the TTL indexes.
+
+        AsyncMongoDBSaver only builds its own indexes while a collection has
+        fewer than two, so they must exist before the TTL index is added.
+        """
+        db = await Database.get_async_database()
+        await db[CHECKPOINT_COLLECTION].create_index(
+            [("thread_id", 1), ("checkpoint_ns", 1), ("checkpoint_id", -1)],
+            unique=True,
+        )
+        await db[WRITES_COLLECTION].create_index(
+            [
+                ("thread_id", 1),
+                ("checkpoint_ns", 1),
+                ("checkpoint_id", -1),
+                ("task_id", 1),
+                ("idx", 1),
+            ],
+            unique=True,
+        )
+        if not settings.checkpoint_ttl_seconds:
+            return
+        for name in (CHECKPOINT_COLLECTION, WRITES_COLLECTION):
+            try:
+                await _ensure_ttl_index(db[name], settings.checkpoint_ttl_seconds)
+            except OperationFailure as e:
+                logger.exception("Could not apply TTL index on %s", name)
+
+    @classmethod
+    async def prune_thread(
+        cls, thread_id: str, checkpoint_ns: str = "", keep_last: Optional[int] = None
+    ) -> int:
+        """
+        Delete all but the newest ``keep_last`` checkpoints of a thread.
+        Returns the number of bytes reclaimed.
+        """
+        keep_last = max(keep_last or settings.checkpoint_keep_last, 1)
+        db = await Database.get_async_database()
+        checkpoints = db[CHECKPOINT_COLLECTION]
+        writes = db[WRITES_COLLECTION]
+
+        scope = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+        stale_ids = [
+            doc["checkpoint_id"]
+            async for doc in checkpoints.find(
+                scope, {"checkpoint_id": 1, "_id": 0}
+            )
+            .sort("checkpoint_id", -1)
+            .skip(keep_last)
+        ]
+        if not stale_ids:
+            return 0
+
+        stale = {**scope, "checkpoint_id": {"$in": stale_ids}}
+        reclaimed = await _bson_size(checkpoints, stale) + await _bson_size(
+            writes, stale
+        )
+        deleted_checkpoints = await checkpoints.delete_many(stale)
+        deleted_writes = await writes.delete_many(stale)
+
+        bytes_reclaimed.inc(reclaimed)
+        checkpoints_deleted.inc(deleted_checkpoints.deleted_count)
+        writes_deleted.inc(deleted_writes.deleted_count)
+        return reclaimed
+
+    @classmethod
+    async def compact_dirty(cls) -> int:
+        """Prune every thread marked dirty since the last pass."""
+        dirty, cls._dirty = cls._dirty, set()
+        dirty_threads_gauge.set(0)
+        reclaimed = 0
+        for thread_id, checkpoint_ns in dirty:
+            try:
+                reclaimed += await cls.prune_thread(thread_id, checkpoint_ns)
+            except Exception as e:
+                logger.exception("Failed to compact thread %s", thread_id)
+        return reclaimed
+
+    @classmethod
+    async def sweep(cls) -> int:
+        """Find every thread holding more checkpoints than allowed and prune it."""
+        db = await Database.get_async_database()
+        keep_last = max(settings.checkpoint_keep_last, 1)
+        cursor = db[CHECKPOINT_COLLECTION].aggregate(
+            [
+                {
+                    "$group": {
+                        "_id": {
+                            "thread_id": "$thread_id",
+                            "checkpoint_ns": "$checkpoint_ns",
+                        },
+                        "count": {"$sum": 1},
+                    }
+                },
+                {"$match": {"count": {"$gt": keep_last}}},
+            ],
+            allowDiskUse=True,
+        )
+        async for row in cursor:
+            cls.mark_dirty(row["_id"]["thread_id"], row["_id"].get("checkpoint_ns", ""))
+        return await cls.compact_dirty()
+
+    @classmethod
+    async def _run(cls) -> None:
+        passes = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                if passes % max(settings.checkpoint_full_sweep_every, 1) == 0:
+                    reclaimed = await cls.sweep()
+                else:
+                    reclaimed = await cls.compact_dirty()
+                if reclaimed:
+                    logger.info("Checkpoint compactor reclaimed %d bytes", reclaimed)
+            except Exception as e:
+                logger.exception("Checkpoint compaction pass failed")
+            compaction_duration.observe(time.perf_counter() - started)
+            compaction_runs.inc()
+            passes += 1
+            await asyncio.sleep(settings.checkpoint_compaction_interval_seconds)
+
+    @classmethod
+    async def start(cls) -> None:
+        """Apply indexes and launch the background compactor (idempotent)."""
+        if not settings.checkpoint_compaction_enabled or cls._task is not None:
+            return
+        await cls.ensure_indexes()
+        cls._task = asyncio.create_task(cls._run())
+        logger.info("Checkpoint compactor started.")
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Cancel the background compactor, flushing dirty threads first."""
+        if cls._task is None:
+            return
+        cls._task.cancel()
+        try:
+            await cls._task
+        except asyncio.CancelledError:
+            pass
+        cls._task = None
+        try:
+            await cls.compact_dirty()
+        except Exception as e:
+            logger.exception("Final checkpoint compaction failed")
+        logger.info("Checkpoint compactor stopped.")
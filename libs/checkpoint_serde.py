@@ -0,0 +1,68 @@
+import threading
+from typing import Any, Optional
+
+import zstandard
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from libs.database import settings
+
+ZSTD_SUFFIX = "+zstd"
+
+
+class ZstdMsgpackSerializer(JsonPlusSerializer):
+    """
+    Checkpoint serializer that msgpack-encodes with ormsgpack (via
+    JsonPlusSerializer) and compresses payloads with zstd.
+
+    Payloads smaller than ``min_size`` bytes are stored uncompressed, and
+    blobs written by the default serializer still load, so the option can be
+    switched on for an existing checkpoint collection.
+    """
+
+    def __init__(self, level: int = 3, min_size: int = 256, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.level = level
+        self.min_size = min_size
+        # zstd (de)compressor objects are not thread-safe; keep one per thread.
+        self._local = threading.local()
+
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(
+                level=self.level
+            )
+        return compressor
+
+    def _decompressor(self) -> zstandard.ZstdDecompressor:
+        decompressor = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = self._local.decompressor = zstandard.ZstdDecompressor()
+        return decompressor
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        type_, data = super().dumps_typed(obj)
+        if type_ in ("null", "bytes") or len(data) < self.min_size:
+            return type_, data
+        return type_ + ZSTD_SUFFIX, self._compressor().compress(data)
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(ZSTD_SUFFIX):
+            type_ = type_[: -len(ZSTD_SUFFIX)]
+            payload = self._decompressor().decompress(payload)
+        return super().loads_typed((type_, payload))
+
+
+def get_checkpoint_serde() -> Optional[SerializerProtocol]:
+    """
+    Return the serializer selected by ``settings.checkpoint_serializer``,
+    or None to keep the checkpointer's default.
+    """
+    if settings.checkpoint_serializer == "msgpack_zstd":
+        return ZstdMsgpackSerializer(
+            level=settings.checkpoint_zstd_level,
+            min_size=settings.checkpoint_zstd_min_size,
+        )
+    return None
@@ -0,0 +1,135 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from libs.database import settings
+from libs.metrics import MetricsRegistry
+
+
+class QueueFullError(Exception):
+    """Raised when a limiter's wait queue is full and the caller should back off."""
+
+
+class KeyedLocks:
+    """
+    One FIFO asyncio.Lock per key (e.g. chat thread id), so work on the same
+    key runs in arrival order while different keys proceed in parallel.
+    Locks are dropped as soon as nobody holds or waits on them.
+
+    Scope is a single worker process; requests for one thread that land on
+    different gunicorn workers are not serialized by this class.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._users: dict[str, int] = {}
+        self._waiting = MetricsRegistry.gauge(
+            f"{name}_lock_waiting", f"Tasks waiting for a {name} lock"
+        )
+        self._active = MetricsRegistry.gauge(
+            f"{name}_locks_active", f"Keys with a held or awaited {name} lock"
+        )
+        self._wait_seconds = MetricsRegistry.histogram(
+            f"{name}_lock_wait_seconds", f"Time spent waiting for a {name} lock"
+        )
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[None]:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+            self._active.inc()
+        self._users[key] = self._users.get(key, 0) + 1
+
+        started = time.perf_counter()
+        self._waiting.inc()
+        try:
+            await lock.acquire()
+        except BaseException:
+            self._release_user(key)
+            raise
+        finally:
+            self._waiting.dec()
+        self._wait_seconds.observe(time.perf_counter() - started)
+        try:
+            yield
+        finally:
+            lock.release()
+            self._release_user(key)
+
+    def _release_user(self, key: str) -> None:
+        self._users[key] -= 1
+        if self._users[key] == 0:
+            del self._users[key]
+            del self._locks[key]
+            self._active.dec()
+
+
+class ConcurrencyLimiter:
+    """
+    Semaphore with a bounded wait queue.
+
+    At most ``max_concurrency`` holders run at once; up to ``max_queue``
+    callers wait in FIFO order and anyone beyond that gets QueueFullError
+    immediately instead of piling up behind a slow provider.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._queued = 0
+        self._in_flight = MetricsRegistry.gauge(
+            f"{name}_in_flight", f"{name} calls currently running"
+        )
+        self._queue_depth = MetricsRegistry.gauge(
+            f"{name}_queue_depth", f"{name} calls waiting for a slot"
+        )
+        self._wait_seconds = MetricsRegistry.histogram(
+            f"{name}_queue_wait_seconds", f"Time {name} calls spent queued"
+        )
+        self._rejected = MetricsRegistry.counter(
+            f"{name}_rejected_total",
+            f"{name} calls rejected because the queue was full",
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[None]:
+        if self._semaphore.locked() and self._queued >= self.max_queue:
+            self._rejected.inc()
+            raise QueueFullError(f"{self.name} queue is full ({self._queued} waiting)")
+
+        started = time.perf_counter()
+        self._queued += 1
+        self._queue_depth.set(self._queued)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._queued -= 1
+            self._queue_depth.set(self._queued)
+        self._wait_seconds.observe(time.perf_counter() - started)
+
+        self._in_flight.inc()
+        try:
+            yield
+        finally:
+            self._in_flight.dec()
+            self._semaphore.release()
+
+
+# Turns on one chat thread run one at a time so checkpoint updates are not lost.
+thread_locks = KeyedLocks("chat_thread")
+
+# Bounds in-flight LLM calls per worker to avoid provider rate-limit storms.
+llm_limiter = ConcurrencyLimiter(
+    "llm",
+    max_concurrency=settings.llm_max_concurrency,
+    max_queue=settings.llm_max_queue,
+)
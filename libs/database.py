@@ -1,14 +1,25 @@
 # db.py
 import asyncio
-from typing import Optional, ClassVar
+import threading
+from typing import Literal, Optional, ClassVar
 
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from pymongo import MongoClient
 from pymongo.collection import Collection
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+)
 from pymongo.database import Database as SyncDatabase
 
+from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from libs.logger import get_logger
+from libs.mongo_monitoring import MongoMonitor
 
 
 # ──────────────────────────────────────────────
@@ -20,6 +31,126 @@ class Settings(BaseSettings):
     mongo_uri: str = "mongodb://localhost:27017"
     database_name: str = "tryLuxor"
 
+    # MongoDB connection pool (per worker process); these override the same
+    # options given in the mongo_uri query string.
+    mongo_max_pool_size: int = 20
+    mongo_min_pool_size: int = 2
+    mongo_max_idle_time_ms: Optional[int] = 60_000
+    mongo_max_connecting: int = 2
+    mongo_wait_queue_timeout_ms: Optional[int] = 5_000
+    mongo_connect_timeout_ms: int = 5_000
+    mongo_server_selection_timeout_ms: int = 5_000
+    mongo_socket_timeout_ms: Optional[int] = None
+    mongo_compressors: list[str] = ["zstd", "zlib"]
+    # Catalog reads (product list/search/slug, chat lookups) may be served by
+    # secondaries; writes and checkpoint reads always use the client default
+    # (primary). maxStalenessSeconds must be >= 90 or unset.
+    catalog_read_preference: Literal[
+        "primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"
+    ] = "secondaryPreferred"
+    catalog_max_staleness_seconds: Optional[int] = 90
+    catalog_read_concern: Literal["local", "available", "majority"] = "local"
+    # Shared memory-mapped catalog snapshot (libs/catalog_snapshot.py)
+    catalog_snapshot_dir: str = "var/catalog"
+    catalog_snapshot_check_seconds: float = 15.0
+    catalog_snapshot_keep: int = 2
+    # Command/pool instrumentation (see libs/mongo_monitoring.py)
+    mongo_monitoring_enabled: bool = True
+    mongo_slow_command_ms: float = 100.0
+    # Log the winning plan of slow queries (one explain per query shape)
+    mongo_slow_command_explain: bool = False
+    # The sync client only backs tooling (scripts, notebooks, live tests)
+    mongo_sync_max_pool_size: int = 4
+
+    # Agent prompt budgeting
+    product_card_token_budget: int = 800
+    product_card_review_chars: int = 120
+    max_parallel_lookups: int = 4
+    # route_intent -> call_llm -> extract -> product_lookup -> call_llm
+    agent_recursion_limit: int = 6
+
+    # LLM provider ("fake" runs offline with a deterministic stand-in)
+    llm_provider: Literal["gemini", "fake"] = "gemini"
+    llm_model: str = "gemini-2.5-flash"
+    llm_temperature: float = 0.7
+    fake_llm_latency_ms: float = 0.0
+    # Offline stand-ins for the embedding model and the product catalog
+    embedding_provider: Literal["gemini", "fake"] = "gemini"
+    # "snapshot" serves chat lookups from the mapped catalog snapshot
+    catalog_provider: Literal["mongo", "fake", "snapshot"] = "mongo"
+    fake_lookup_latency_ms: float = 0.0
+    # "memory" keeps chat threads in-process (offline evaluation only)
+    chat_checkpointer: Literal["mongo", "memory"] = "mongo"
+    # Per-worker cap on concurrent LLM calls and callers allowed to wait
+    llm_max_concurrency: int = 8
+    llm_max_queue: int = 32
+    # Adaptive admission control for /chat
+    chat_max_in_flight: int = 16
+    chat_min_in_flight: int = 2
+    chat_target_llm_latency_seconds: float = 3.0
+    chat_priority_values: list[str] = ["critical", "checkout"]
+    # Per-request time budget for one chat turn, split across graph nodes
+    chat_deadline_seconds: float = 30.0
+    lookup_deadline_seconds: float = 8.0
+    # Budget held back from lookups so the final LLM answer can still run
+    llm_deadline_reserve_seconds: float = 10.0
+    # WebSocket chat: delay before hot session state is written back to Mongo
+    ws_checkpoint_flush_seconds: float = 2.0
+    # Token for admin-only endpoints (X-Admin-Token); unset disables them
+    admin_token: Optional[SecretStr] = None
+    # Catalog seeding pipeline
+    seed_chunk_size: int = 500
+    seed_concurrency: int = 4
+    seed_embedding_batch_size: int = 100
+    # Products requested per LLM prompt when seeding with source=llm
+    seed_llm_batch_size: int = 20
+    seed_job_stale_seconds: float = 120.0
+    # Worker warmup before reporting ready (GET /ready)
+    warmup_enabled: bool = True
+    # Hold the lifespan until warm so a worker never takes traffic cold;
+    # set false to warm in the background and rely on GET /ready instead
+    warmup_blocking: bool = True
+    # Upper bound on the blocking wait; warmup then finishes in the background
+    warmup_timeout_seconds: float = 60.0
+    warmup_pool_connections: int = 4
+    warmup_embeddings: bool = True
+    warmup_agent_graph: bool = True
+    warmup_catalog: bool = True
+    warmup_step_timeout_seconds: float = 30.0
+    # Request tracing (libs/tracing.py); span durations always feed /metrics
+    tracing_enabled: bool = True
+    tracing_exporter: Literal["none", "stdout", "file"] = "none"
+    tracing_file: str = "var/traces.ndjson"
+    # On-demand profiling (libs/profiling.py); admin-only and off by default
+    profiling_enabled: bool = False
+    profiling_max_seconds: float = 60.0
+    profiling_keep_results: int = 20
+    # Batch chat evaluation
+    batch_max_concurrency: int = 8
+    batch_max_items: int = 1000
+    gemini_context_cache_enabled: bool = False
+    gemini_context_cache_ttl_seconds: int = 3600
+    gemini_context_cache_retry_seconds: int = 600
+
+    # Answer greetings/FAQ intents from templates without an LLM call
+    intent_router_enabled: bool = True
+
+    # Conversation history window sent to the LLM
+    history_max_turns: int = 4
+    history_tool_message_chars: int = 300
+    history_summary_enabled: bool = True
+    history_summary_max_words: int = 150
+
+    # Checkpoint retention
+    checkpoint_keep_last: int = 1
+    checkpoint_ttl_seconds: Optional[int] = 14 * 24 * 3600
+    checkpoint_compaction_enabled: bool = True
+    checkpoint_compaction_interval_seconds: float = 60.0
+    checkpoint_full_sweep_every: int = 60
+    checkpoint_serializer: Literal["default", "msgpack_zstd"] = "default"
+    checkpoint_zstd_level: int = 3
+    checkpoint_zstd_min_size: int = 256
+
 
 settings = Settings()
 logger = get_logger(__name__)
@@ -32,12 +163,62 @@ class DatabaseConnectionError(Exception):
     """Raised when database connection fails or is not initialized."""
 
 
+def client_options(**overrides) -> dict:
+    """Keyword arguments for MongoClient/AsyncIOMotorClient from settings."""
+    options = {
+        "maxPoolSize": settings.mongo_max_pool_size,
+        "minPoolSize": settings.mongo_min_pool_size,
+        "maxIdleTimeMS": settings.mongo_max_idle_time_ms,
+        "maxConnecting": settings.mongo_max_connecting,
+        "waitQueueTimeoutMS": settings.mongo_wait_queue_timeout_ms,
+        "connectTimeoutMS": settings.mongo_connect_timeout_ms,
+        "serverSelectionTimeoutMS": settings.mongo_server_selection_timeout_ms,
+        "socketTimeoutMS": settings.mongo_socket_timeout_ms,
+        "compressors": ",".join(settings.mongo_compressors) or None,
+        "appname": "tryLuxor",
+        # Client default: writes, checkpoints and admin reads stay on the
+        # primary; catalog reads opt in via Database.get_catalog_collection.
+        "readPreference": "primary",
+    }
+    if settings.mongo_monitoring_enabled:
+        MongoMonitor.configure(
+            settings.mongo_slow_command_ms, settings.mongo_slow_command_explain
+        )
+        options["event_listeners"] = MongoMonitor.listeners()
+    options.update(overrides)
+    return {key: value for key, value in options.items() if value is not None}
+
+
+READ_PREFERENCES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def catalog_read_options() -> dict:
+    """read_preference/read_concern for catalog collections, from settings."""
+    mode = READ_PREFERENCES.get(settings.catalog_read_preference)
+    read_preference = (
+        mode(max_staleness=settings.catalog_max_staleness_seconds or -1)
+        if mode
+        else Primary()
+    )
+    return {
+        "read_preference": read_preference,
+        "read_concern": ReadConcern(settings.catalog_read_concern),
+    }
+
+
 # ──────────────────────────────────────────────
 # Database Class
 # ──────────────────────────────────────────────
 class Database:
     """
-    Singleton-style database connector supporting both async and sync clients.
+    Singleton-style database connector. The app runs on one async (motor)
+    client per process; a sync client is only created on first use of the
+    sync accessors, for tooling that cannot await.
     """
 
     _async_client: ClassVar[Optional[AsyncIOMotorClient]] = None
@@ -45,59 +226,72 @@ class Database:
     _async_db: ClassVar[Optional[AsyncIOMotorDatabase]] = None
     _sync_db: ClassVar[Optional[SyncDatabase]] = None
     _lock: ClassVar[asyncio.Lock] = asyncio.Lock()
+    _sync_lock: ClassVar[threading.Lock] = threading.Lock()
 
     @classmethod
     async def connect(cls) -> None:
         """
-        Establish async & sync MongoDB connections.
+        Establish the async MongoDB connection pool.
         Safe to call multiple times — connection will be created only once.
         """
         async with cls._lock:
-            if cls._async_client and cls._sync_client:
+            if cls._async_client:
                 return  # already connected
 
             try:
-                cls._async_client = AsyncIOMotorClient(settings.mongo_uri)
-                cls._sync_client = MongoClient(settings.mongo_uri)
-
-                # Test connections
+                cls._async_client = AsyncIOMotorClient(
+                    settings.mongo_uri, **client_options()
+                )
+                # Slow-query explains are issued back on this loop
+                MongoMonitor.attach(asyncio.get_running_loop())
+                # Test connection
                 await cls._async_client.admin.command("ping")
-                cls._sync_client.admin.command("ping")
-
-                # Cache DB references
+                # Cache DB reference
                 cls._async_db = cls._async_client[settings.database_name]
-                cls._sync_db = cls._sync_client[settings.database_name]
 
                 logger.info(
-                    f"Connected to MongoDB → {settings.mongo_uri}/{settings.database_name}"
+                    f"Connected to MongoDB → {settings.mongo_uri}/{settings.database_name} "
+                    f"(pool {settings.mongo_min_pool_size}-{settings.mongo_max_pool_size})"
                 )
             except Exception as e:
                 logger.exception("Failed to connect to MongoDB.")
                 # Reset on failure to avoid stale references
+                if cls._async_client:
+                    cls._async_client.close()
                 cls._async_client = None
-                cls._sync_client = None
                 cls._async_db = None
-                cls._sync_db = None
                 raise DatabaseConnectionError(str(e)) from e
 
     @classmethod
     async def disconnect(cls) -> None:
-        """Close both async and sync MongoDB connections."""
+        """Close the async client and the sync client, if one was created."""
         if cls._async_client:
             cls._async_client.close()
             cls._async_client = None
             cls._async_db = None
 
-        if cls._sync_client:
-            cls._sync_client.close()
-            cls._sync_client = None
-            cls._sync_db = None
+        with cls._sync_lock:
+            if cls._sync_client:
+                cls._sync_client.close()
+                cls._sync_client = None
+                cls._sync_db = None
 
         logger.info("Disconnected from MongoDB.")
 
     # ──────────────────────────────────────────
     # Async Accessors
     # ──────────────────────────────────────────
+    @classmethod
+    async def get_async_client(cls) -> AsyncIOMotorClient:
+        """
+        Return the async client, auto-connecting if needed.
+        """
+        if cls._async_client is None:
+            await cls.connect()
+        if cls._async_client is None:
+            raise DatabaseConnectionError("Async database client not connected.")
+        return cls._async_client
+
     @classmethod
     async def get_async_database(cls) -> AsyncIOMotorDatabase:
         """
@@ -117,18 +311,40 @@ class Database:
         db = await cls.get_async_database()
         return db[name]
 
+    @classmethod
+    async def get_catalog_collection(cls, name: str):
+        """
+        Get an async collection for catalog reads, routed with the catalog
+        read preference and read concern. Use get_async_collection for
+        writes and anything that must read its own writes.
+        """
+        db = await cls.get_async_database()
+        return db.get_collection(name, **catalog_read_options())
+
     # ──────────────────────────────────────────
-    # Sync Accessors
+    # Sync Accessors (tooling only — they block the event loop)
     # ──────────────────────────────────────────
     @classmethod
     def get_sync_database(cls) -> SyncDatabase:
         """
-        Return the sync database object.
-        Raises DatabaseConnectionError if not connected.
+        Return the sync database object, creating a small sync pool on
+        first use. Do not call from request handlers.
         """
-        if cls._sync_db is None:
-            raise DatabaseConnectionError("Synchronous database client not connected.")
-        return cls._sync_db
+        with cls._sync_lock:
+            if cls._sync_db is None:
+                try:
+                    cls._sync_client = MongoClient(
+                        settings.mongo_uri,
+                        **client_options(
+                            maxPoolSize=settings.mongo_sync_max_pool_size,
+                            minPoolSize=0,
+                        ),
+                    )
+                    cls._sync_db = cls._sync_client[settings.database_name]
+                except Exception as e:
+                    cls._sync_client = None
+                    raise DatabaseConnectionError(str(e)) from e
+            return cls._sync_db
 
     @classmethod
     def get_sync_collection(cls, name: str) -> Collection:
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+
+from starlette.requests import Request
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's time budget runs out."""
+
+
+class ClientDisconnected(Exception):
+    """Raised when the HTTP client went away before the work finished."""
+
+
+class Deadline:
+    """
+    Absolute time budget for one request, split across the work it does.
+    Uses the monotonic clock so wall-clock adjustments cannot extend it.
+    """
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def budget(self, cap: float, reserve: float = 0.0) -> float:
+        """
+        Time a stage may spend: at most ``cap`` seconds, while leaving
+        ``reserve`` seconds of the overall budget for the stages after it.
+        """
+        return max(min(cap, self.remaining() - reserve), 0.0)
+
+
+# The deadline of the request being served. Graph nodes read it from here
+# because values in the LangGraph config end up in checkpoint metadata.
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar(
+    "current_deadline", default=None
+)
+
+
+async def with_timeout(awaitable: Awaitable[T], timeout: Optional[float]) -> T:
+    """await ``awaitable``, raising DeadlineExceeded (and cancelling it) on timeout."""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        return await asyncio.wait_for(awaitable, timeout=timeout)
+    except asyncio.TimeoutError as e:
+        # A timeout raised inside the awaited call (e.g. an upstream HTTP
+        # timeout) before our budget ran out is the provider's error.
+        if timeout is None or loop.time() - started < timeout:
+            raise
+        raise DeadlineExceeded(f"Timed out after {timeout:.2f}s") from e
+
+
+async def cancel_on_disconnect(
+    request: Request, awaitable: Awaitable[T], poll_interval: float = 0.25
+) -> T:
+    """
+    Run ``awaitable`` as a task and cancel it if the client disconnects,
+    so abandoned requests stop consuming LLM calls and worker time.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise ClientDisconnected("Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
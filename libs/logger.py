@@ -1,10 +1,49 @@
+"""
+Process-wide logging setup.
+
+Every logger returned by ``get_logger`` shares one ``QueueHandler``: the
+calling thread (usually the event loop) only filters, merges ``%`` args and
+enqueues the record, and a single ``QueueListener`` thread formats it and
+does the I/O. Configured from the environment so it is ready before
+settings are loaded:
+
+    LOG_LEVEL            INFO (default), DEBUG, WARNING, ...
+    LOG_FORMAT           "color" (default, for terminals) or "json"
+    LOG_MAX_CHARS        truncate messages longer than this (default 2000);
+                         tracebacks are never truncated
+    LOG_SAMPLE           per-logger keep rates for records below WARNING,
+                         e.g. "agents.chat_agent=0.1,libs.mongo_monitoring=0.5"
+
+Use lazy formatting in hot paths (``logger.info("x=%s", x)``) so disabled
+or sampled-out records are never formatted.
+"""
+
+import atexit
+import copy
 import logging
 import os
+import queue
+import random
+import sys
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+import orjson
+
+# Id of the request being served, set by libs.tracing.RequestIdMiddleware and
+# stamped on every record as ``request_id``.
+current_request_id: ContextVar[Optional[str]] = ContextVar(
+    "current_request_id", default=None
+)
 
 
 class ColoredFormatter(logging.Formatter):
     """
     A custom formatter that adds color to log messages based on their level.
+    Only the queue listener thread formats, so ``last_levelname`` is not shared.
     """
 
     COLORS = {
@@ -16,8 +55,8 @@ class ColoredFormatter(logging.Formatter):
         "RESET": "\033[0m",  # Reset color
     }
 
-    def __init__(self, fmt=None, datefmt=None, style='%'):
-        super().__init__(fmt=fmt, datefmt=datefmt) # Removed style=style as it's default and causing Pylance error
+    def __init__(self, fmt=None, datefmt=None):
+        super().__init__(fmt=fmt, datefmt=datefmt)
         self.last_levelname = None
 
     def format(self, record):
@@ -30,6 +69,136 @@ class ColoredFormatter(logging.Formatter):
         return f"{newline_prefix}{self.COLORS.get(record.levelname, self.COLORS['RESET'])}{log_message}{self.COLORS['RESET']}"
 
 
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra` fields listed in EXTRA_FIELDS are kept."""
+
+    EXTRA_FIELDS = ("request_id", "thread_id")
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in self.EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        return orjson.dumps(entry, default=str).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of sub-WARNING records per logger (longest matching
+    name prefix wins). Warnings and errors are never sampled out.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: dict[str, float] = {}
+
+    @staticmethod
+    def parse(spec: str) -> dict[str, float]:
+        rates = {}
+        for item in spec.split(","):
+            name, _, rate = item.strip().partition("=")
+            if name and rate:
+                rates[name] = float(rate)
+        return rates
+
+    def rate(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            matches = [
+                prefix
+                for prefix in self.rates
+                if name == prefix or name.startswith(prefix + ".")
+            ]
+            rate = self.rates[max(matches, key=len)] if matches else 1.0
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the current request id; runs in the caller's context, before enqueueing."""
+
+    def filter(self, record):
+        if getattr(record, "request_id", None) is None:
+            record.request_id = current_request_id.get()
+        return True
+
+
+class TruncatingQueueHandler(QueueHandler):
+    """
+    Enqueues records with the message merged and capped at ``max_chars``.
+    Only the message is capped; tracebacks are appended whole.
+    """
+
+    def __init__(self, log_queue, max_chars: int):
+        super().__init__(log_queue)
+        self.max_chars = max_chars
+
+    def prepare(self, record):
+        message = record.getMessage()
+        if self.max_chars and len(message) > self.max_chars:
+            extra = len(message) - self.max_chars
+            message = f"{message[: self.max_chars]}… [+{extra} chars]"
+        # The base class appends exc_info/stack_info to the merged message.
+        record = copy.copy(record)
+        record.msg, record.args = message, None
+        return super().prepare(record)
+
+
+_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+
+def _shared_handler() -> QueueHandler:
+    """Create the queue handler and start its listener thread (once)."""
+    global _handler, _listener
+    with _lock:
+        if _handler is None:
+            if os.environ.get("LOG_FORMAT", "color").lower() == "json":
+                formatter: logging.Formatter = JsonFormatter()
+            else:
+                formatter = ColoredFormatter(
+                    "%(levelname)s - %(name)s - %(message)s -----> %(asctime)s"
+                )
+            stream = logging.StreamHandler(sys.stderr)
+            stream.setFormatter(formatter)
+
+            log_queue: queue.SimpleQueue = queue.SimpleQueue()
+            _handler = TruncatingQueueHandler(
+                log_queue, int(os.environ.get("LOG_MAX_CHARS", "2000"))
+            )
+            rates = SamplingFilter.parse(os.environ.get("LOG_SAMPLE", ""))
+            if rates:
+                _handler.addFilter(SamplingFilter(rates))
+            _handler.addFilter(RequestIdFilter())
+            _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+            _listener.start()
+            atexit.register(flush_logs)
+        return _handler
+
+
+def flush_logs() -> None:
+    """Drain the queue and stop the listener thread (called at exit)."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
 def get_logger(name: str) -> logging.Logger:
     """
     Configures and returns a logger instance.
@@ -45,20 +214,6 @@ def get_logger(name: str) -> logging.Logger:
 
     # Ensure handlers are not duplicated if get_logger is called multiple times
     if not logger.handlers:
-        # Use the custom colored formatter
-        formatter = ColoredFormatter(
-            "%(levelname)s - %(name)s - %(message)s -----> %(asctime)s"
-        )
-
-        # Console handler
-        ch = logging.StreamHandler()
-        ch.setFormatter(formatter)
-        logger.addHandler(ch)
-
-        # Optional: File handler (uncomment to enable file logging)
-        # log_file = "app.log"
-        # fh = logging.FileHandler(log_file)
-        # fh.setFormatter(formatter)
-        # logger.addHandler(fh)
+        logger.addHandler(_shared_handler())
 
     return logger
@@ -0,0 +1,161 @@
+import bisect
+import threading
+from typing import ClassVar, Optional
+
+# Default latency buckets in seconds.
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+class Counter:
+    """Monotonically increasing value."""
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self) -> dict:
+        return {"type": "counter", "value": self.value}
+
+
+class Gauge:
+    """Value that can go up and down."""
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def snapshot(self) -> dict:
+        return {"type": "gauge", "value": self.value}
+
+
+class Histogram:
+    """Fixed-bucket histogram with count/sum and approximate quantiles."""
+
+    def __init__(
+        self,
+        name: str,
+        description: str = "",
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket containing the q-th quantile."""
+        if self.count == 0:
+            return None
+        target = q * self.count
+        running = 0
+        for index, bucket_count in enumerate(self.counts):
+            running += bucket_count
+            if running >= target:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "type": "histogram",
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": {
+                **{str(b): c for b, c in zip(self.buckets, self.counts)},
+                "+Inf": self.counts[-1],
+            },
+        }
+
+
+class MetricsRegistry:
+    """
+    Process-wide registry of named metrics.
+    Metrics are created on first use so modules can register them lazily.
+    """
+
+    _metrics: ClassVar[dict[str, Counter | Gauge | Histogram]] = {}
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def _get_or_create(cls, kind: type, name: str, **kwargs):
+        with cls._lock:
+            metric = cls._metrics.get(name)
+            if metric is None:
+                metric = kind(name, **kwargs)
+                cls._metrics[name] = metric
+            elif not isinstance(metric, kind):
+                raise TypeError(f"Metric {name} already registered as {type(metric).__name__}")
+            return metric
+
+    @classmethod
+    def counter(cls, name: str, description: str = "") -> Counter:
+        return cls._get_or_create(Counter, name, description=description)
+
+    @classmethod
+    def gauge(cls, name: str, description: str = "") -> Gauge:
+        return cls._get_or_create(Gauge, name, description=description)
+
+    @classmethod
+    def histogram(
+        cls,
+        name: str,
+        description: str = "",
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return cls._get_or_create(
+            Histogram, name, description=description, buckets=buckets
+        )
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        with cls._lock:
+            metrics = dict(cls._metrics)
+        return {name: metric.snapshot() for name, metric in sorted(metrics.items())}
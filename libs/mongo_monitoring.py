@@ -0,0 +1,327 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, ClassVar, Optional
+
+from pymongo import monitoring
+
+from libs.logger import get_logger
+from libs.metrics import MetricsRegistry
+
+logger = get_logger(__name__)
+
+# Mongo round trips are often sub-millisecond; finer low buckets than default.
+COMMAND_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+# Handshake/auth/session bookkeeping; not useful as latency samples.
+IGNORED_COMMANDS = {
+    "hello",
+    "ismaster",
+    "isMaster",
+    "ping",
+    "saslStart",
+    "saslContinue",
+    "endSessions",
+    "explain",
+}
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct"}
+# Command fields that belong to the session/transport, not the query.
+TRANSPORT_FIELDS = {
+    "lsid",
+    "$db",
+    "$clusterTime",
+    "$readPreference",
+    "txnNumber",
+    "signature",
+}
+
+pool_connections = MetricsRegistry.gauge(
+    "mongo_pool_connections", "Open MongoDB connections across all pools"
+)
+pool_in_use = MetricsRegistry.gauge(
+    "mongo_pool_connections_in_use", "MongoDB connections currently checked out"
+)
+pool_checkout_wait = MetricsRegistry.histogram(
+    "mongo_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    buckets=COMMAND_BUCKETS,
+)
+pool_checkout_failed = MetricsRegistry.counter(
+    "mongo_pool_checkout_failed_total",
+    "Checkouts that failed (timeout waiting for a connection, pool closed, ...)",
+)
+pool_cleared = MetricsRegistry.counter(
+    "mongo_pool_cleared_total", "Pools cleared after a network or server error"
+)
+command_seconds = MetricsRegistry.histogram(
+    "mongo_command_seconds", "Latency of all MongoDB commands", buckets=COMMAND_BUCKETS
+)
+command_failed = MetricsRegistry.counter(
+    "mongo_command_failed_total", "MongoDB commands that returned an error"
+)
+slow_commands = MetricsRegistry.counter(
+    "mongo_slow_commands_total", "MongoDB commands slower than the slow threshold"
+)
+
+
+def query_shape(value: Any) -> Any:
+    """
+    ``value`` with every literal replaced by a placeholder, keeping field
+    names and operators, so {"name": {"$regex": "sofa"}} -> {"name":
+    {"$regex": "?"}}. Safe to log and groups queries that differ only in values.
+    """
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = [query_shape(item) for item in value]
+        # Collapse lists of literals ($in: [...]) to one placeholder.
+        return shapes if any(shape != "?" for shape in shapes) else ["?"]
+    return "?"
+
+
+def command_collection(command_name: str, command: dict) -> str:
+    target = command.get(command_name)
+    if isinstance(target, str):
+        return target
+    # getMore carries the cursor id first and the collection separately.
+    return str(command.get("collection", "-"))
+
+
+def command_filter(command_name: str, command: dict) -> Any:
+    """The part of ``command`` that selects documents, for logging."""
+    if command_name == "aggregate":
+        return command.get("pipeline", [])[:4]
+    if command_name in ("update", "delete"):
+        statements = command.get(f"{command_name}s") or [{}]
+        return statements[0].get("q")
+    return command.get("filter", command.get("query"))
+
+
+def plan_summary(explain: dict) -> str:
+    """Compact winning-plan chain, e.g. "LIMIT <- FETCH <- IXSCAN(name_1)"."""
+    planner = explain.get("queryPlanner")
+    if planner is None:
+        for stage in explain.get("stages", []):
+            planner = stage.get("$cursor", {}).get("queryPlanner")
+            if planner:
+                break
+    plan = (planner or {}).get("winningPlan", {})
+    plan = plan.get("queryPlan", plan)
+    stages = []
+    while plan:
+        stage = plan.get("stage", "?")
+        if plan.get("indexName"):
+            stage += f"({plan['indexName']})"
+        stages.append(stage)
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return " <- ".join(stages) or "unknown"
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Per-command latency histograms by collection and operation, plus a
+    warning log (and optional explain) for commands over the slow threshold.
+    """
+
+    def __init__(self, monitor: type["MongoMonitor"]):
+        self.monitor = monitor
+        self._started: dict[tuple, tuple[str, str, dict]] = {}
+
+    @staticmethod
+    def _key(event) -> tuple:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection = command_collection(event.command_name, event.command)
+        self._started[self._key(event)] = (
+            collection,
+            event.database_name,
+            event.command,
+        )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        started = self._started.pop(self._key(event), None)
+        if started is not None:
+            self.monitor.record(event.command_name, *started, event.duration_micros)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        started = self._started.pop(self._key(event), None)
+        if started is not None:
+            command_failed.inc()
+            self.monitor.record(event.command_name, *started, event.duration_micros)
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Pool size, in-use connections and checkout wait time."""
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pool_cleared.inc()
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        pool_connections.inc()
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        pool_connections.dec()
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event) -> None:
+        pool_checkout_failed.inc()
+        if event.duration is not None:
+            pool_checkout_wait.observe(event.duration)
+
+    def connection_checked_out(self, event) -> None:
+        pool_in_use.inc()
+        if event.duration is not None:
+            pool_checkout_wait.observe(event.duration)
+
+    def connection_checked_in(self, event) -> None:
+        pool_in_use.dec()
+
+
+class MongoMonitor:
+    """
+    Process-wide MongoDB instrumentation shared by every client.
+    Listener callbacks run on pymongo's (motor's executor) threads, so any
+    explain is handed back to the event loop recorded by ``attach``.
+    """
+
+    slow_threshold_ms: ClassVar[float] = 100.0
+    explain_slow: ClassVar[bool] = False
+    explain_interval_seconds: ClassVar[float] = 300.0
+    recent_slow: ClassVar[deque] = deque(maxlen=50)
+    _loop: ClassVar[Optional[asyncio.AbstractEventLoop]] = None
+    _explained: ClassVar[dict[str, float]] = {}
+    _listeners: ClassVar[Optional[list]] = None
+
+    @classmethod
+    def listeners(cls) -> list:
+        if cls._listeners is None:
+            cls._listeners = [CommandMetrics(cls), PoolMetrics()]
+        return cls._listeners
+
+    @classmethod
+    def configure(cls, slow_threshold_ms: float, explain_slow: bool = False) -> None:
+        cls.slow_threshold_ms = slow_threshold_ms
+        cls.explain_slow = explain_slow
+
+    @classmethod
+    def attach(cls, loop: asyncio.AbstractEventLoop) -> None:
+        cls._loop = loop
+
+    @classmethod
+    def record(
+        cls,
+        command_name: str,
+        collection: str,
+        database: str,
+        command: dict,
+        duration_micros: int,
+    ) -> None:
+        seconds = duration_micros / 1_000_000
+        command_seconds.observe(seconds)
+        MetricsRegistry.histogram(
+            f"mongo_command_{collection}_{command_name}_seconds",
+            f"Latency of {command_name} on {collection}",
+            buckets=COMMAND_BUCKETS,
+        ).observe(seconds)
+        if seconds * 1000 < cls.slow_threshold_ms:
+            return
+
+        slow_commands.inc()
+        shape = repr(query_shape(command_filter(command_name, command)))
+        cls.recent_slow.append(
+            {
+                "at": time.time(),
+                "command": command_name,
+                "collection": collection,
+                "duration_ms": round(seconds * 1000, 2),
+                "filter": shape,
+            }
+        )
+        logger.warning(
+            "Slow MongoDB %s on %s.%s: %.1fms filter=%s",
+            command_name,
+            database,
+            collection,
+            seconds * 1000,
+            shape,
+        )
+        if cls.explain_slow and command_name in EXPLAINABLE_COMMANDS:
+            cls._schedule_explain(command_name, collection, database, command, shape)
+
+    @classmethod
+    def _schedule_explain(
+        cls,
+        command_name: str,
+        collection: str,
+        database: str,
+        command: dict,
+        shape: str,
+    ) -> None:
+        # One explain per query shape per interval; explain is not free.
+        key = f"{database}.{collection}:{command_name}:{shape}"
+        now = time.monotonic()
+        if now - cls._explained.get(key, -cls.explain_interval_seconds) < (
+            cls.explain_interval_seconds
+        ):
+            return
+        loop = cls._loop
+        if loop is None or loop.is_closed():
+            return
+        cls._explained[key] = now
+        body = {k: v for k, v in command.items() if k not in TRANSPORT_FIELDS}
+        asyncio.run_coroutine_threadsafe(
+            cls._explain(command_name, collection, database, body), loop
+        )
+
+    @classmethod
+    async def _explain(
+        cls, command_name: str, collection: str, database: str, body: dict
+    ) -> None:
+        from libs.database import Database
+
+        try:
+            client = await Database.get_async_client()
+            explain = await client[database].command(
+                {"explain": body, "verbosity": "queryPlanner"}
+            )
+            logger.warning(
+                "Slow MongoDB %s on %s.%s plan: %s",
+                command_name,
+                database,
+                collection,
+                plan_summary(explain),
+            )
+        except Exception as e:
+            logger.info(
+                "Could not explain slow %s on %s: %s", command_name, collection, e
+            )
@@ -0,0 +1,239 @@
+"""
+On-demand CPU profiling for a running worker, in collapsed-stack format
+(``frame;frame;frame count`` per line) for flamegraph.pl / speedscope.
+
+Two modes, both admin-only and only when ``profiling_enabled`` is set
+(otherwise the middleware is not installed and nothing runs):
+
+* One request: send ``X-Profile: 1`` with a valid ``X-Admin-Token``. The
+  request runs under ``cProfile``; the response carries ``X-Profile-Id`` and
+  the result is kept for ``GET /admin/profile/requests/{id}``. Counts are
+  microseconds. cProfile follows the event-loop thread, so other requests
+  interleaved on the loop while this one awaits are included.
+* The whole worker: ``GET /admin/profile/sample?seconds=N`` samples thread
+  stacks with ``sys._current_frames`` from a helper thread every
+  ``interval_ms``. Counts are samples. A sampling thread is used instead of
+  a ``SIGPROF`` handler because signals only reach the main thread and
+  interrupt the server's blocking I/O.
+"""
+
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+from types import FrameType
+from typing import ClassVar, Optional
+
+from libs.auth import is_admin_token
+from libs.database import settings
+from libs.logger import current_request_id, get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+ADMIN_TOKEN_HEADER = b"x-admin-token"
+MAX_DEPTH = 128
+# Call-graph paths contributing less than this (seconds) are dropped.
+MIN_PATH_SECONDS = 1e-5
+PACKAGES = os.sep + "site-packages" + os.sep
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..")) + os.sep
+
+
+class ProfilerBusy(Exception):
+    """Raised when another profiling session of the same kind is running."""
+
+
+def short_path(filename: str) -> str:
+    if PACKAGES in filename:
+        return filename.rsplit(PACKAGES, 1)[1]
+    if filename.startswith(ROOT):
+        return filename[len(ROOT) :]
+    return filename
+
+
+def frame_label(filename: str, name: str, line: int) -> str:
+    return f"{short_path(filename)}:{name}:{line}".replace(";", ",")
+
+
+def stats_label(func: tuple[str, int, str]) -> str:
+    filename, line, name = func
+    return frame_label(filename, name, line)
+
+
+def collapse(stacks: Counter) -> str:
+    """Render ``{stack: count}`` as collapsed-stack text, heaviest first."""
+    return "".join(
+        f"{stack} {count}\n" for stack, count in stacks.most_common() if count > 0
+    )
+
+
+def frame_stack(frame: Optional[FrameType]) -> str:
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        code = frame.f_code
+        labels.append(
+            frame_label(code.co_filename, code.co_qualname, code.co_firstlineno)
+        )
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def sample_stacks(
+    seconds: float, interval: float, thread_ids: Optional[set[int]] = None
+) -> Counter:
+    """Sample the stacks of ``thread_ids`` (all other threads if None)."""
+    own = threading.get_ident()
+    stacks: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own or (thread_ids and thread_id not in thread_ids):
+                continue
+            stacks[frame_stack(frame)] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def profile_stacks(stats: pstats.Stats) -> Counter:
+    """
+    Approximate collapsed stacks (microseconds) from cProfile's call graph:
+    each function's time is split across its callers in proportion to the
+    time spent under each one.
+    """
+    entries = stats.stats  # type: ignore[attr-defined]
+    children: dict[tuple, list[tuple[tuple, float]]] = defaultdict(list)
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            children[caller].append((func, edge[3]))
+    stacks: Counter = Counter()
+
+    def walk(func: tuple, path: tuple[str, ...], share: float) -> None:
+        _, _, own_time, _, _ = entries[func]
+        path = (*path, stats_label(func))
+        if (micros := int(own_time * share * 1e6)) > 0:
+            stacks[";".join(path)] += micros
+        if len(path) >= MAX_DEPTH:
+            return
+        for child, edge_time in children.get(func, ()):
+            child_time = entries[child][3]
+            if not child_time or stats_label(child) in path:
+                continue
+            if edge_time * share >= MIN_PATH_SECONDS:
+                walk(child, path, share * edge_time / child_time)
+
+    for func, (_, _, _, _, callers) in entries.items():
+        if not callers:
+            walk(func, (), 1.0)
+    return stacks
+
+
+class Profiler:
+    """Profiling sessions and the results of profiled requests."""
+
+    results: ClassVar["OrderedDict[str, dict]"] = OrderedDict()
+    _request_active: ClassVar[bool] = False
+    _sampling: ClassVar[bool] = False
+
+    @classmethod
+    async def sample(
+        cls, seconds: float, interval: float, thread_ids: Optional[set[int]] = None
+    ) -> Counter:
+        """Sample stacks for ``seconds`` without blocking the event loop."""
+        if cls._sampling:
+            raise ProfilerBusy("A sampling session is already running")
+        cls._sampling = True
+        try:
+            logger.info("Sampling worker stacks for %.1fs", seconds)
+            return await asyncio.to_thread(sample_stacks, seconds, interval, thread_ids)
+        finally:
+            cls._sampling = False
+
+    @classmethod
+    def begin_request(cls) -> Optional[cProfile.Profile]:
+        # cProfile hooks the whole thread: one profiled request at a time.
+        if cls._request_active:
+            return None
+        cls._request_active = True
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    @classmethod
+    def end_request(
+        cls, profile: cProfile.Profile, profile_id: str, method: str, path: str
+    ) -> None:
+        profile.disable()
+        cls._request_active = False
+        cls.results[profile_id] = {
+            "method": method,
+            "path": path,
+            "created_at": time.time(),
+            "stats": pstats.Stats(profile),
+        }
+        while len(cls.results) > settings.profiling_keep_results:
+            cls.results.popitem(last=False)
+
+    @classmethod
+    def request_result(cls, profile_id: str, fmt: str = "collapsed") -> Optional[str]:
+        result = cls.results.get(profile_id)
+        if result is None:
+            return None
+        if fmt == "collapsed":
+            return collapse(profile_stacks(result["stats"]))
+        out = io.StringIO()
+        stats = pstats.Stats(stream=out)
+        stats.add(result["stats"])
+        stats.sort_stats("cumulative").print_stats(50)
+        return out.getvalue()
+
+
+def header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers") or []:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class ProfileMiddleware:
+    """
+    Runs admin requests sent with ``X-Profile: 1`` under cProfile. Installed
+    inside RequestIdMiddleware (the profile id is the request id) and only
+    when ``profiling_enabled`` is set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or header(scope, PROFILE_HEADER) not in ("1", "true")
+            or not is_admin_token(header(scope, ADMIN_TOKEN_HEADER))
+        ):
+            await self.app(scope, receive, send)
+            return
+        profile = Profiler.begin_request()
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+        profile_id = current_request_id.get() or uuid.uuid4().hex
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (PROFILE_ID_HEADER, profile_id.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            Profiler.end_request(profile, profile_id, scope["method"], scope["path"])
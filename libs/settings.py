@@ -1,9 +0,0 @@
-from pydantic_settings import BaseSettings
-
-
-class Settings(BaseSettings):
-    mongo_uri: str = "mongodb://localhost:27017"
-    database_name: str = "tryLuxor"
-
-
-settings = Settings()
@@ -0,0 +1,9 @@
+import re
+
+
+def generate_slug(text: str) -> str:
+    """Generate a URL-friendly slug from text."""
+    slug = text.lower()
+    slug = re.sub(r'[^\w\s-]', '', slug)
+    slug = re.sub(r'[-\s]+', '-', slug)
+    return slug.strip('-')
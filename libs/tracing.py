@@ -0,0 +1,248 @@
+"""
+Lightweight in-process tracing.
+
+``RequestIdMiddleware`` gives every HTTP request and WebSocket connection a
+request id (the incoming ``X-Request-ID`` header when it is sane, otherwise
+a fresh one), echoes it on the response and puts it in log records. Code
+wraps a stage in ``span(...)`` (or decorates it with ``traced(...)``);
+spans nest through a context variable, so concurrent lookups started with
+``asyncio.gather`` each get the calling node as their parent.
+
+Every finished span is observed in a ``span_<name>_seconds`` histogram
+(served by ``/metrics``). With ``tracing_exporter`` set to ``stdout`` or
+``file`` the span is also written as one JSON line, off the event loop:
+
+    {"request_id": ..., "span_id": ..., "parent_id": ..., "name": "node.call_llm",
+     "start": 1760000000.123, "duration_ms": 812.4, "attrs": {...}, "error": null}
+"""
+
+import functools
+import inspect
+import logging
+import os
+import queue
+import re
+import secrets
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, ClassVar, Iterator, Optional, TypeVar
+
+import orjson
+
+from libs.database import settings
+from libs.logger import current_request_id
+from libs.metrics import Histogram, MetricsRegistry
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+REQUEST_ID_HEADER = "x-request-id"
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed stage of a request."""
+
+    __slots__ = (
+        "name",
+        "request_id",
+        "span_id",
+        "parent_id",
+        "attributes",
+        "error",
+        "start",
+        "_started",
+        "duration",
+    )
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: dict):
+        self.name = name
+        self.request_id = current_request_id.get()
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration = 0.0
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self._started
+        Tracer.record(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "request_id": self.request_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attrs": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Feeds span histograms and the optional stdout/file exporter."""
+
+    _histograms: ClassVar[dict[str, Histogram]] = {}
+    _exporter: ClassVar[Optional[logging.Logger]] = None
+    _listener: ClassVar[Optional[QueueListener]] = None
+    _configured: ClassVar[bool] = False
+
+    @classmethod
+    def configure(cls) -> None:
+        """Start the exporter selected by ``tracing_exporter`` (once)."""
+        cls._configured = True
+        if settings.tracing_exporter == "none" or cls._listener is not None:
+            return
+        if settings.tracing_exporter == "file":
+            directory = os.path.dirname(os.path.abspath(settings.tracing_file))
+            os.makedirs(directory, exist_ok=True)
+            output: logging.Handler = logging.FileHandler(
+                settings.tracing_file, encoding="utf-8"
+            )
+        else:
+            output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(logging.Formatter("%(message)s"))
+        span_queue: queue.SimpleQueue = queue.SimpleQueue()
+        exporter = logging.getLogger("tracing.spans")
+        exporter.setLevel(logging.INFO)
+        exporter.propagate = False
+        exporter.addHandler(QueueHandler(span_queue))
+        cls._listener = QueueListener(span_queue, output)
+        cls._listener.start()
+        cls._exporter = exporter
+
+    @classmethod
+    def shutdown(cls) -> None:
+        if cls._listener is not None:
+            cls._listener.stop()
+            cls._listener = None
+        if cls._exporter is not None:
+            cls._exporter.handlers.clear()
+            cls._exporter = None
+        cls._configured = False
+
+    @classmethod
+    def histogram(cls, name: str) -> Histogram:
+        histogram = cls._histograms.get(name)
+        if histogram is None:
+            metric = "span_" + re.sub(r"[^A-Za-z0-9]+", "_", name) + "_seconds"
+            histogram = MetricsRegistry.histogram(metric, f"Duration of {name} spans")
+            cls._histograms[name] = histogram
+        return histogram
+
+    @classmethod
+    def record(cls, span: Span) -> None:
+        cls.histogram(span.name).observe(span.duration)
+        if not cls._configured:
+            cls.configure()
+        if cls._exporter is not None:
+            cls._exporter.info(orjson.dumps(span.to_dict(), default=str).decode())
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Time the enclosed block as a child of the current span."""
+    if not settings.tracing_enabled:
+        yield NOOP_SPAN
+        return
+    current = Span(name, current_span.get(), attributes)
+    token = current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current_span.reset(token)
+        current.finish()
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorator form of ``span`` for sync and async functions."""
+
+    def decorate(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+def request_id_from(headers: list[tuple[bytes, bytes]]) -> str:
+    for key, value in headers:
+        if key == REQUEST_ID_HEADER.encode():
+            candidate = value.decode("latin-1")
+            if REQUEST_ID_PATTERN.match(candidate):
+                return candidate
+            break
+    return uuid.uuid4().hex
+
+
+class RequestIdMiddleware:
+    """
+    Pure ASGI middleware (no response buffering, safe for streaming): sets
+    the request id for the request or WebSocket connection, returns it in
+    ``X-Request-ID`` and times HTTP requests as ``http.request`` spans.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        request_id = request_id_from(scope.get("headers") or [])
+        token = current_request_id.set(request_id)
+        try:
+            if scope["type"] == "websocket":
+                await self.app(scope, receive, send)
+                return
+            with span(
+                "http.request", method=scope["method"], path=scope["path"]
+            ) as request_span:
+
+                async def send_with_request_id(message):
+                    if message["type"] == "http.response.start":
+                        message["headers"] = [
+                            *message.get("headers", []),
+                            (REQUEST_ID_HEADER.encode(), request_id.encode()),
+                        ]
+                        request_span.set(status=message["status"])
+                    await send(message)
+
+                await self.app(scope, receive, send_with_request_id)
+        finally:
+            current_request_id.reset(token)
@@ -0,0 +1,159 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, ClassVar, Literal, Optional
+
+from libs.catalog_snapshot import SnapshotStore
+from libs.database import Database, settings
+from libs.logger import get_logger
+from libs.metrics import MetricsRegistry
+
+logger = get_logger(__name__)
+
+WarmupStatus = Literal["pending", "running", "ready", "failed"]
+
+warmup_seconds = MetricsRegistry.gauge(
+    "worker_warmup_seconds", "Duration of this worker's warmup phase"
+)
+
+
+async def open_pool_connections() -> dict:
+    """Check out ``warmup_pool_connections`` connections at once so they open now."""
+    db = await Database.get_async_database()
+    count = settings.warmup_pool_connections
+    await asyncio.gather(*(db.command("ping") for _ in range(count)))
+    return {"connections": count}
+
+
+async def prime_embeddings() -> dict:
+    """One throwaway embedding call: imports the client and opens its channel."""
+    from agents.llm import get_embeddings
+
+    embeddings = get_embeddings()
+    vector = await embeddings.aembed_query("warmup")
+    return {"provider": settings.embedding_provider, "dims": len(vector)}
+
+
+async def compile_agent_graph() -> dict:
+    """Import the agent stack and compile the graph chat_agent() will reuse."""
+    from agents.chat_agent import memory_graph, mongo_graph
+
+    if settings.chat_checkpointer == "memory":
+        memory_graph()
+    else:
+        await Database.get_async_client()
+        mongo_graph()
+    return {"checkpointer": settings.chat_checkpointer}
+
+
+async def preload_catalog() -> dict:
+    """
+    Map the shared catalog snapshot, if one is published, and run the hot
+    catalog reads once so their pages and indexes are cached.
+    """
+    snapshot = SnapshotStore.current()
+    collection = await Database.get_catalog_collection("products")
+    first_page = await collection.find().to_list(100)
+    newest = await collection.find().sort("created_at", -1).limit(20).to_list()
+    return {
+        "documents": len(first_page) + len(newest),
+        "snapshot": snapshot.version if snapshot else None,
+    }
+
+
+class Warmup:
+    """
+    Per-worker warmup run from the app lifespan. Steps are independent;
+    a failed step is recorded and logged, and only a failure to open the
+    database pool marks the worker as failed (not ready).
+    """
+
+    status: ClassVar[WarmupStatus] = "pending"
+    steps: ClassVar[dict[str, dict[str, Any]]] = {}
+    started_at: ClassVar[Optional[float]] = None
+    duration: ClassVar[Optional[float]] = None
+    _task: ClassVar[Optional[asyncio.Task]] = None
+
+    @classmethod
+    def plan(cls) -> list[tuple[str, Callable[[], Awaitable[dict]], bool]]:
+        """(name, step, required) for the steps enabled in settings."""
+        steps: list[tuple[str, Callable[[], Awaitable[dict]], bool]] = []
+        if settings.warmup_pool_connections > 0:
+            steps.append(("mongo_pool", open_pool_connections, True))
+        if settings.warmup_embeddings:
+            steps.append(("embeddings", prime_embeddings, False))
+        if settings.warmup_agent_graph:
+            steps.append(("agent_graph", compile_agent_graph, False))
+        if settings.warmup_catalog:
+            steps.append(("catalog", preload_catalog, False))
+        return steps
+
+    @classmethod
+    async def run(cls) -> WarmupStatus:
+        cls.status = "running"
+        cls.steps = {}
+        cls.started_at = time.time()
+        started = time.perf_counter()
+        failed = False
+        for name, step, required in cls.plan():
+            step_started = time.perf_counter()
+            try:
+                detail = await asyncio.wait_for(
+                    step(), timeout=settings.warmup_step_timeout_seconds
+                )
+                cls.steps[name] = {"status": "ok", **detail}
+            except Exception as e:
+                failed = failed or required
+                cls.steps[name] = {"status": "failed", "error": repr(e)}
+                logger.warning("Warmup step %s failed: %r", name, e)
+            cls.steps[name]["seconds"] = round(time.perf_counter() - step_started, 3)
+        cls.duration = time.perf_counter() - started
+        warmup_seconds.set(cls.duration)
+        cls.status = "failed" if failed else "ready"
+        logger.info("Warmup %s in %.2fs: %s", cls.status, cls.duration, cls.steps)
+        return cls.status
+
+    @classmethod
+    async def start(cls) -> None:
+        """
+        Run warmup from the lifespan. By default the worker does not start
+        serving until warm, for at most `warmup_timeout_seconds`; after that
+        (or with `warmup_blocking` off) warmup continues in the background.
+        """
+        if not settings.warmup_enabled:
+            cls.status = "ready"
+            return
+        cls._task = asyncio.create_task(cls.run())
+        if not settings.warmup_blocking:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(cls._task), timeout=settings.warmup_timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Warmup still running after %.0fs; serving while it finishes",
+                settings.warmup_timeout_seconds,
+            )
+
+    @classmethod
+    async def stop(cls) -> None:
+        if cls._task is not None and not cls._task.done():
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+        cls._task = None
+
+    @classmethod
+    def ready(cls) -> bool:
+        return cls.status == "ready"
+
+    @classmethod
+    def report(cls) -> dict:
+        return {
+            "status": cls.status,
+            "started_at": cls.started_at,
+            "seconds": round(cls.duration, 3) if cls.duration is not None else None,
+            "steps": cls.steps,
+        }
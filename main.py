@@ -1,16 +1,28 @@
+import time
+
+# Measured before the imports below; see benchmarks/startup.py for a breakdown.
+IMPORT_STARTED = time.perf_counter()
+
 from contextlib import asynccontextmanager
 from typing import AsyncIterator
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI
 from starlette.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from routes import chat
 from routes import admin
-from libs.database import Database
+from libs.database import Database, settings
 from libs.logger import get_logger
+from libs.metrics import MetricsRegistry
+from libs.mongo_monitoring import MongoMonitor
+from libs.checkpoint_retention import CheckpointCompactor
+from libs.warmup import Warmup
+from libs.tracing import RequestIdMiddleware, Tracer
+from libs.profiling import ProfileMiddleware
 from routes.product import router as product_router
 
 logger = get_logger(__name__)
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
 
 
 @asynccontextmanager
@@ -18,7 +30,17 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     logger.info("Connecting to database...")
     await Database.connect()
     logger.info("Database connected.")
+    await CheckpointCompactor.start()
+    await Warmup.start()
+    logger.info(
+        "Worker started in %.2fs (imports %.2fs)",
+        time.perf_counter() - IMPORT_STARTED,
+        IMPORT_SECONDS,
+    )
     yield
+    await Warmup.stop()
+    await CheckpointCompactor.stop()
+    Tracer.shutdown()
     logger.info("Disconnecting from database...")
     await Database.disconnect()
     logger.info("Database disconnected.")
@@ -35,7 +57,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-Profile-Id"],
 )
+# Not installed at all unless enabled, so profiling costs nothing by default.
+if settings.profiling_enabled:
+    app.add_middleware(ProfileMiddleware)
+# Outermost, so the request id covers every other middleware and handler.
+app.add_middleware(RequestIdMiddleware)
 
 
 @app.get("/")
@@ -44,17 +72,22 @@ async def read_root():
     return JSONResponse(content={"message": "Server is running"})
 
 
-@app.get("/seed-database")
-async def seed_db():
-    try:
-        from seeds.seed_database import seed_database
+@app.get("/ready")
+async def read_ready():
+    """Readiness probe: 503 until this worker has finished warming up."""
+    return JSONResponse(
+        status_code=200 if Warmup.ready() else 503, content=Warmup.report()
+    )
+
+
+@app.get("/metrics")
+async def read_metrics():
+    return JSONResponse(content=MetricsRegistry.snapshot())
+
 
-        await seed_database()
-        logger.info("Database seeded successfully.")
-        return JSONResponse(content={"message": "Database seeded successfully"})
-    except Exception as e:
-        logger.error(f"Error seeding database: {e}", exc_info=True)
-        return HTTPException(status_code=500, detail=str(e))
+@app.get("/metrics/mongo/slow")
+async def read_slow_mongo_commands():
+    return JSONResponse(content=list(MongoMonitor.recent_slow))
 
 
 app.include_router(chat.router, prefix="/chat", tags=["chat"])
@@ -72,6 +72,18 @@ class Product(BaseModel):
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+class ChatProduct(BaseModel):
+    """Compact product entry returned alongside an assistant reply."""
+
+    id: str
+    slug: str
+    name: str
+    price: float | None = None
+    currency: str = "USD"
+    image: str | None = None
+    score: float | None = None
+
+
 class ProductsList(RootModel[List[Product]]):
     """A list wrapper for multiple products."""
 
@@ -1,13 +1,13 @@
-from fastapi import APIRouter, HTTPException
-from starlette.responses import JSONResponse
-from libs.database import Database
+import threading
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse, PlainTextResponse
+from libs.database import Database, settings
 from models.products_model import Product
-from seeds.seed_database import create_product_summary
-from langchain_core.documents import Document
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, GoogleGenerativeAI
-from langchain_mongodb import MongoDBAtlasVectorSearch
-import os
-from pydantic import SecretStr
+from libs.auth import require_admin
+from libs.profiling import Profiler, ProfilerBusy, collapse
+from seeds.seed_database import SeedJobs, SeedRequest, product_document
 from bson import ObjectId
 from libs.logger import get_logger
 
@@ -15,26 +15,12 @@ logger = get_logger(__name__)
 
 router = APIRouter()
 
-api_key = SecretStr(str(os.getenv("GOOGLE_API_KEY")))
-embeddings = GoogleGenerativeAIEmbeddings(
-    model="text-embedding-004", google_api_key=api_key
-)
-llm = GoogleGenerativeAI(model="gemini-2.5-pro", google_api_key=api_key)
-
 
 @router.post("/products")
 async def create_product(product: Product):
     try:
-        product_summary = await create_product_summary(product)
-
-        document = Document(page_content=product_summary, metadata=product.model_dump())
-
-        sync_collection = Database.get_sync_collection("products")
-        vector_store = MongoDBAtlasVectorSearch(
-            collection=sync_collection, embedding=embeddings, index_name="vector_index"
-        )
-
-        vector_store.add_documents([document])
+        collection = await Database.get_async_collection("products")
+        await collection.insert_one(await product_document(product))
 
         return JSONResponse(
             content={
@@ -46,24 +32,82 @@ async def create_product(product: Product):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/seed", status_code=202, dependencies=[Depends(require_admin)])
+async def start_seed(request: SeedRequest):
+    """Start (or resume) a seeding job in the background."""
+    job_id, started = await SeedJobs.start(request)
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job_id,
+            "started": started,
+            "status_url": f"/admin/seed/{job_id}",
+        },
+    )
+
+
+@router.get("/seed/{job_id}", dependencies=[Depends(require_admin)])
+async def seed_progress(job_id: str):
+    progress = await SeedJobs.progress(job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Seed job not found")
+    return JSONResponse(content=jsonable_encoder(progress))
+
+
+def require_profiling() -> None:
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+
+
+@router.get(
+    "/profile/sample",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(require_admin), Depends(require_profiling)],
+)
+async def profile_sample(
+    seconds: float = Query(default=10.0, gt=0),
+    interval_ms: float = Query(default=5.0, ge=1),
+    all_threads: bool = False,
+):
+    """Sample this worker's stacks (event-loop thread by default); collapsed stacks."""
+    if seconds > settings.profiling_max_seconds:
+        raise HTTPException(
+            status_code=422,
+            detail=f"seconds must be at most {settings.profiling_max_seconds}",
+        )
+    thread_ids = None if all_threads else {threading.get_ident()}
+    try:
+        stacks = await Profiler.sample(seconds, interval_ms / 1000, thread_ids)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(collapse(stacks))
+
+
+@router.get(
+    "/profile/requests/{profile_id}",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(require_admin), Depends(require_profiling)],
+)
+async def profile_request(
+    profile_id: str, format: Literal["collapsed", "stats"] = "collapsed"
+):
+    """Result of a request sent with `X-Profile: 1` (see libs/profiling.py)."""
+    result = Profiler.request_result(profile_id, format)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(result)
+
+
 @router.put("/products/{product_id}")
 async def update_product(product_id: str, product: Product):
     try:
-        sync_collection = Database.get_sync_collection("products")
-        # Find the document's _id to delete it
-        doc_to_delete = sync_collection.find_one({"_id": ObjectId(product_id)})
-        if not doc_to_delete:
-            raise HTTPException(status_code=404, detail="Product not found")
-        # Delete the old document
-        sync_collection.delete_one({"_id": ObjectId(doc_to_delete["_id"])})
-        # Now, create and add the new document
-        product_summary = await create_product_summary(product)
-        document = Document(page_content=product_summary, metadata=product.model_dump())
-        vector_store = MongoDBAtlasVectorSearch(
-            collection=sync_collection, embedding=embeddings, index_name="vector_index"
+        collection = await Database.get_async_collection("products")
+        # Replace in place so the document keeps its _id
+        result = await collection.replace_one(
+            {"_id": ObjectId(product_id)}, await product_document(product)
         )
-
-        vector_store.add_documents([document])
+        if result.matched_count == 0:
+            raise HTTPException(status_code=404, detail="Product not found")
 
         return JSONResponse(
             content={
@@ -71,6 +115,8 @@ async def update_product(product_id: str, product: Product):
                 "product_id": str(product.id),
             }
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
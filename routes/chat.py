@@ -1,10 +1,34 @@
-from pydantic import BaseModel
-from fastapi import APIRouter, HTTPException
-from starlette.responses import JSONResponse
-from agents.chat_agent import chat_agent
+import asyncio
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+import orjson
+from pydantic import BaseModel, Field, ValidationError
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import ORJSONResponse
+from starlette.responses import Response, StreamingResponse
+from agents.batch_eval import BatchItem, run_batch
+from libs.concurrency import QueueFullError
+from libs.admission import chat_admission, AdmissionRejected
+from libs.deadline import ClientDisconnected, DeadlineExceeded, cancel_on_disconnect
+from libs.database import settings
+from libs.auth import require_admin
 import uuid
 from libs.logger import get_logger
 
+if TYPE_CHECKING:
+    from agents.chat_session import ChatSession
+
+# The agent stack (langchain/langgraph/Gemini clients) is imported on first
+# use inside the handlers, so workers serving only catalog routes never pay
+# for it and startup stays fast.
 router = APIRouter()
 logger = get_logger(__name__)
 
@@ -13,27 +37,292 @@ class ChatRequest(BaseModel):
     message: str
 
 
-@router.post("", tags=["chat"])
-async def chat_endpoint(chat: ChatRequest):
+async def admit_chat(
+    x_priority: Optional[str] = Header(default=None),
+) -> AsyncIterator[None]:
+    """
+    Shed chat load early with 429 + Retry-After when the agent is saturated.
+    Requests sent with a priority header (e.g. `X-Priority: checkout`) bypass the limit.
+    """
+    priority = (x_priority or "").strip().lower() in settings.chat_priority_values
+    try:
+        async with chat_admission.admit(priority=priority):
+            yield
+    except AdmissionRejected as e:
+        logger.warning(e)
+        raise HTTPException(
+            status_code=429,
+            detail="Assistant is busy, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+@router.post("", tags=["chat"], dependencies=[Depends(admit_chat)])
+async def chat_endpoint(
+    chat: ChatRequest,
+    request: Request,
+    include_products: bool = Query(
+        default=True, description="Return the matched products with the reply"
+    ),
+):
+    from agents.chat_agent import chat_agent
+
     try:
         thread_id = str(uuid.uuid4())
-        result = await chat_agent(thread_id=thread_id, message=chat.message)
-        return JSONResponse(content={"message": result, "thread_id": thread_id})
+        result = await cancel_on_disconnect(
+            request,
+            chat_agent(
+                thread_id=thread_id,
+                message=chat.message,
+                include_products=include_products,
+            ),
+        )
+        return ORJSONResponse(content={"message": result, "thread_id": thread_id})
+    except QueueFullError as e:
+        logger.warning(e)
+        raise HTTPException(
+            status_code=429,
+            detail="Assistant is busy, please retry shortly",
+            headers={"Retry-After": str(chat_admission.retry_after())},
+        )
+    except DeadlineExceeded as e:
+        logger.warning(e)
+        raise HTTPException(status_code=504, detail="Assistant took too long to answer")
+    except ClientDisconnected:
+        logger.info("Client disconnected, chat turn cancelled")
+        return Response(status_code=499)
     except Exception as e:
         logger.error(e)
         raise HTTPException(status_code=500, detail=str("Internal Server Error"))
 
 
-@router.post("/{thread_id}", tags=["chat"])
-async def chat_with_thread_id(thread_id: str, chat: ChatRequest):
+class BatchChatRequest(BaseModel):
+    items: list[BatchItem]
+    concurrency: int = Field(default=4, ge=1)
+    deadline_seconds: Optional[float] = Field(default=None, gt=0)
+    include_products: bool = False
+
+
+# Declared before /{thread_id} so "batch" is not taken for a thread id.
+@router.post("/batch", tags=["chat"], dependencies=[Depends(require_admin)])
+async def chat_batch(
+    batch: BatchChatRequest,
+    x_priority: Optional[str] = Header(default=None),
+):
+    """
+    Replay many prompts or threads through the agent, streaming one NDJSON
+    record per item (in completion order) with per-turn latency and
+    estimated token counts. Admin only. Concurrency is capped by
+    `batch_max_concurrency`. The batch holds a chat admission slot while it
+    streams, and every item goes through admission too, so items shed under
+    load are reported as `rejected`.
+    """
+    if len(batch.items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.batch_max_items} items per batch",
+        )
+    concurrency = min(batch.concurrency, settings.batch_max_concurrency)
+    priority = (x_priority or "").strip().lower() in settings.chat_priority_values
+    try:
+        chat_admission.check(priority=priority)
+    except AdmissionRejected as e:
+        logger.warning(e)
+        raise HTTPException(
+            status_code=429,
+            detail="Assistant is busy, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    # The slot is taken inside the body: admit_chat, a yield dependency, would
+    # release it as soon as the StreamingResponse is returned.
+    async def ndjson() -> AsyncIterator[bytes]:
+        try:
+            async with chat_admission.admit(priority=priority):
+                async for record in run_batch(
+                    batch.items,
+                    concurrency,
+                    batch.deadline_seconds,
+                    batch.include_products,
+                    admission=chat_admission,
+                ):
+                    yield orjson.dumps(record) + b"\n"
+        except AdmissionRejected as e:
+            # The last slot went between the check above and the first read.
+            logger.warning(e)
+            rejected = {
+                "status": "rejected",
+                "error": str(e),
+                "retry_after": e.retry_after,
+            }
+            yield orjson.dumps(rejected) + b"\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.post("/{thread_id}", tags=["chat"], dependencies=[Depends(admit_chat)])
+async def chat_with_thread_id(
+    thread_id: str,
+    chat: ChatRequest,
+    request: Request,
+    include_products: bool = Query(
+        default=True, description="Return the matched products with the reply"
+    ),
+):
+    from agents.chat_agent import chat_agent
+
     try:
-        result = await chat_agent(thread_id=thread_id, message=chat.message)
-        return JSONResponse(
+        result = await cancel_on_disconnect(
+            request,
+            chat_agent(
+                thread_id=thread_id,
+                message=chat.message,
+                include_products=include_products,
+            ),
+        )
+        return ORJSONResponse(
             content={
                 "message": result,
                 "thread_id": thread_id,
             }
         )
+    except QueueFullError as e:
+        logger.warning(e)
+        raise HTTPException(
+            status_code=429,
+            detail="Assistant is busy, please retry shortly",
+            headers={"Retry-After": str(chat_admission.retry_after())},
+        )
+    except DeadlineExceeded as e:
+        logger.warning(e)
+        raise HTTPException(status_code=504, detail="Assistant took too long to answer")
+    except ClientDisconnected:
+        logger.info("Client disconnected, chat turn cancelled")
+        return Response(status_code=499)
     except Exception as e:
         logger.error(e)
         raise HTTPException(status_code=500, detail=str("Internal Server Error"))
+
+
+async def send_frame(websocket: WebSocket, frame: dict) -> None:
+    await websocket.send_text(orjson.dumps(frame).decode())
+
+
+async def run_ws_turn(
+    websocket: WebSocket,
+    session: "ChatSession",
+    message: str,
+    include_products: bool,
+    priority: bool,
+) -> None:
+    """Run one turn, streaming reply tokens as they arrive, then the full reply."""
+    try:
+        async with chat_admission.admit(priority=priority):
+            tokens: asyncio.Queue = asyncio.Queue()
+            turn = asyncio.create_task(
+                session.send(message, include_products=include_products, tokens=tokens)
+            )
+            try:
+                while not turn.done():
+                    next_token = asyncio.create_task(tokens.get())
+                    await asyncio.wait(
+                        {turn, next_token}, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if next_token.done():
+                        await send_frame(
+                            websocket, {"type": "token", "content": next_token.result()}
+                        )
+                    else:
+                        next_token.cancel()
+                while not tokens.empty():
+                    await send_frame(
+                        websocket, {"type": "token", "content": tokens.get_nowait()}
+                    )
+                result = turn.result()
+            finally:
+                # A failed send means the client is gone; stop the turn with it.
+                turn.cancel()
+        await send_frame(
+            websocket,
+            {"type": "message", "message": result, "thread_id": session.thread_id},
+        )
+    except (AdmissionRejected, QueueFullError) as e:
+        logger.warning(e)
+        retry_after = getattr(e, "retry_after", None) or chat_admission.retry_after()
+        await send_frame(
+            websocket,
+            {
+                "type": "error",
+                "status": 429,
+                "detail": "Assistant is busy, please retry shortly",
+                "retry_after": retry_after,
+            },
+        )
+    except DeadlineExceeded as e:
+        logger.warning(e)
+        await send_frame(
+            websocket,
+            {
+                "type": "error",
+                "status": 504,
+                "detail": "Assistant took too long to answer",
+            },
+        )
+
+
+@router.websocket("/ws")
+async def chat_websocket(
+    websocket: WebSocket,
+    thread_id: Optional[str] = None,
+    include_products: bool = True,
+):
+    """
+    Multi-turn chat over one connection, with thread state kept in memory.
+
+    Client frames: `{"message": "..."}`. Server frames: `session` (once, with
+    the thread_id), `token` (reply text as it streams), `message` (the full
+    reply and products, authoritative) and `error` (status + detail).
+    """
+    from agents.chat_session import ChatSession
+
+    await websocket.accept()
+    thread_id = thread_id or str(uuid.uuid4())
+    priority = (
+        websocket.headers.get("x-priority") or ""
+    ).strip().lower() in settings.chat_priority_values
+    session = ChatSession(thread_id)
+    try:
+        await session.open()
+    except Exception as e:
+        logger.error("chat_websocket: Could not open session %s: %s", thread_id, e)
+        await websocket.close(code=1011)
+        return
+
+    try:
+        await send_frame(websocket, {"type": "session", "thread_id": thread_id})
+        while True:
+            try:
+                chat = ChatRequest.model_validate(
+                    orjson.loads(await websocket.receive_text())
+                )
+            except (ValidationError, orjson.JSONDecodeError) as e:
+                await send_frame(
+                    websocket, {"type": "error", "status": 422, "detail": str(e)}
+                )
+                continue
+            try:
+                await run_ws_turn(
+                    websocket, session, chat.message, include_products, priority
+                )
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                logger.error(e)
+                await send_frame(
+                    websocket,
+                    {"type": "error", "status": 500, "detail": "Internal Server Error"},
+                )
+    except WebSocketDisconnect:
+        logger.info("chat_websocket: Client left thread %s", thread_id)
+    finally:
+        await session.close()
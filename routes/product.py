@@ -2,24 +2,18 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from starlette.responses import JSONResponse
 from libs.database import Database
 from models.products_model import ProductsList, Product
+from libs.slug import generate_slug
 from typing import Optional
-import re
+from bson import ObjectId
+from libs.catalog_snapshot import SnapshotStore
 
 router = APIRouter()
 
 
-def generate_slug(text: str) -> str:
-    """Generate a URL-friendly slug from text."""
-    slug = text.lower()
-    slug = re.sub(r'[^\w\s-]', '', slug)
-    slug = re.sub(r'[-\s]+', '-', slug)
-    return slug.strip('-')
-
-
 @router.get("")
 async def get_products():
     try:
-        collection = await Database.get_async_collection("products")
+        collection = await Database.get_catalog_collection("products")
         raw_products = await collection.find().to_list(100)
 
         products_data = []
@@ -53,7 +47,7 @@ async def search_products(
     Example: /products/search?category=Furniture&limit=10&min_price=100&max_price=500&in_stock=true
     """
     try:
-        collection = await Database.get_async_collection("products")
+        collection = await Database.get_catalog_collection("products")
 
         # Build filter query
         filter_query = {}
@@ -124,9 +118,23 @@ async def get_product_by_slug(slug: str):
     Example: /products/modern-leather-sofa
     """
     try:
-        collection = await Database.get_async_collection("products")
+        collection = await Database.get_catalog_collection("products")
+
+        # Resolve the slug through the shared catalog snapshot when there is one
+        snapshot = SnapshotStore.current()
+        row = snapshot.find_slug(slug) if snapshot else None
+        if row is not None:
+            product_id = snapshot.product_id(row)
+            product_dict = await collection.find_one(
+                {"_id": ObjectId(product_id) if ObjectId.is_valid(product_id) else product_id}
+            )
+            if product_dict:
+                product_dict["id"] = str(product_dict["_id"])
+                del product_dict["_id"]
+                product = Product(**product_dict)
+                return JSONResponse(content={"product": product.model_dump(mode='json')})
 
-        # Find all products and match by generated slug
+        # Not in the snapshot (or newer than it): match by generated slug
         raw_products = await collection.find().to_list(1000)
 
         for product_dict in raw_products:
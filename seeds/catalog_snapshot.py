@@ -0,0 +1,156 @@
+"""
+Build the shared catalog snapshot (see libs/catalog_snapshot.py).
+
+Streams the products collection (or a catalog file written by
+seeds/synthetic_catalog.py) into a new snapshot version and atomically
+publishes it; workers pick it up on their next check. With --watch the
+builder keeps running and rebuilds whenever the catalog changes.
+
+    python -m seeds.catalog_snapshot
+    python -m seeds.catalog_snapshot --watch 60
+    python -m seeds.catalog_snapshot --from-file catalog.ndjson.gz --dims 768
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterable, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents.product_cards import product_card
+from libs.catalog_snapshot import SnapshotWriter, publish
+from libs.database import Database, settings
+from libs.logger import get_logger
+from libs.slug import generate_slug
+
+logger = get_logger(__name__)
+
+# Everything product_card/chat_product read, minus full reviews and variants.
+PROJECTION = {
+    "name": 1,
+    "sku": 1,
+    "category": 1,
+    "brand": 1,
+    "price": 1,
+    "in_stock": 1,
+    "stock_quantity": 1,
+    "rating": 1,
+    "reviews.comment": 1,
+    "variants.name": 1,
+    "tags": 1,
+    "images": {"$slice": 1},
+    "embedding": 1,
+}
+
+
+def snapshot_record(product: dict) -> dict:
+    """Compact record stored per row: the agent's product card plus one image."""
+    record = product_card(product, review_chars=settings.product_card_review_chars)
+    record["images"] = (product.get("images") or [])[:1]
+    return record
+
+
+def add_product(writer: SnapshotWriter, product: dict) -> None:
+    writer.add(
+        str(product.get("_id") or product.get("id") or ""),
+        generate_slug(product.get("name") or ""),
+        snapshot_record(product),
+        product.get("embedding"),
+    )
+
+
+def new_writer(directory: str, dims: int) -> SnapshotWriter:
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    return SnapshotWriter(os.path.join(directory, f"catalog-{version}.snap"), dims)
+
+
+def finish(writer: SnapshotWriter, directory: str, keep: int) -> dict:
+    header = writer.finish()
+    publish(directory, writer.path, keep)
+    logger.info(
+        "Published catalog snapshot %s: %d products, %.1f MB",
+        header["version"],
+        header["rows"],
+        os.path.getsize(writer.path) / 1e6,
+    )
+    return header
+
+
+def build_from_products(
+    products: Iterable[dict], directory: str, dims: int, keep: int = 2
+) -> dict:
+    writer = new_writer(directory, dims)
+    for product in products:
+        add_product(writer, product)
+    return finish(writer, directory, keep)
+
+
+async def mongo_products(batch_size: int = 2000) -> AsyncIterator[dict]:
+    collection = await Database.get_catalog_collection("products")
+    async for product in collection.find({}, PROJECTION, batch_size=batch_size):
+        yield product
+
+
+async def build_from_mongo(directory: str, dims: int, keep: int = 2) -> dict:
+    writer = new_writer(directory, dims)
+    async for product in mongo_products():
+        add_product(writer, product)
+    return finish(writer, directory, keep)
+
+
+async def catalog_fingerprint() -> tuple:
+    """Cheap change detector: product count and newest `updated_at`."""
+    collection = await Database.get_catalog_collection("products")
+    newest = await collection.find_one({}, {"updated_at": 1}, sort=[("updated_at", -1)])
+    return (
+        await collection.estimated_document_count(),
+        (newest or {}).get("updated_at"),
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--output-dir", default=settings.catalog_snapshot_dir)
+    parser.add_argument("--dims", type=int, default=768, help="0 to omit vectors")
+    parser.add_argument("--keep", type=int, default=settings.catalog_snapshot_keep)
+    parser.add_argument("--from-file", default=None)
+    parser.add_argument(
+        "--watch", type=float, default=None, help="poll interval in seconds"
+    )
+    args = parser.parse_args()
+
+    if args.from_file:
+        from seeds.synthetic_catalog import read_catalog
+
+        started = time.perf_counter()
+        build_from_products(
+            read_catalog(args.from_file), args.output_dir, args.dims, args.keep
+        )
+        logger.info("Snapshot built in %.1fs", time.perf_counter() - started)
+        return
+
+    await Database.connect()
+    try:
+        built: Optional[tuple] = None
+        while True:
+            fingerprint = await catalog_fingerprint()
+            if fingerprint != built:
+                started = time.perf_counter()
+                await build_from_mongo(args.output_dir, args.dims, args.keep)
+                logger.info("Snapshot built in %.1fs", time.perf_counter() - started)
+                built = fingerprint
+            if args.watch is None:
+                break
+            await asyncio.sleep(args.watch)
+    finally:
+        await Database.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
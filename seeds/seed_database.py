@@ -1,83 +1,120 @@
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from libs.database import Database
-from models.products_model import Product, ProductsList
-import os
-from langchain_core.documents import Document
-from pydantic import SecretStr
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, ClassVar, Literal, Optional
+
+from pydantic import BaseModel, Field
+from pymongo import ReturnDocument, UpdateOne
 from pymongo.operations import SearchIndexModel
-from langchain_mongodb import MongoDBAtlasVectorSearch
+
+from libs.database import Database, settings
 from libs.logger import get_logger
+from models.products_model import Product, ProductsList
+from seeds.synthetic_catalog import generate_products
+
+if TYPE_CHECKING:
+    from langchain_core.embeddings import Embeddings
+    from langchain_core.output_parsers import PydanticOutputParser
+    from langchain_google_genai import ChatGoogleGenerativeAI
 
 logger = get_logger(__name__)
 
-api_key = SecretStr(str(os.getenv("GOOGLE_API_KEY")))
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0.7,
-    google_api_key=api_key,
-)
+PRODUCTS_COLLECTION = "products"
+SEED_JOBS_COLLECTION = "seed_jobs"
+VECTOR_INDEX_NAME = "vector_index"
+VECTOR_INDEX_DEFINITION = {
+    "fields": [
+        {
+            "type": "vector",
+            "path": "embedding",
+            "numDimensions": 768,
+            "similarity": "cosine",
+        }
+    ]
+}
+
+
+# The Gemini/langchain stack is imported on first use: routes/admin.py imports
+# this module, and it should not slow down app startup.
+@lru_cache(maxsize=1)
+def get_seed_llm() -> "ChatGoogleGenerativeAI":
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    from agents.llm import gemini_api_key
+
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash",
+        temperature=0.7,
+        google_api_key=gemini_api_key(),
+    )
 
-embeddings = GoogleGenerativeAIEmbeddings(
-    model="text-embedding-004", google_api_key=api_key
-)
 
+async def create_search_index() -> str:
+    """
+    Ensure the Atlas vector search index exists with the current definition.
 
-async def create_search_index():
-    logger.info("Creating search index...")
+    Never drops the index: an existing one with the same definition is left
+    alone, and a changed definition is updated in place, so chat
+    `$vectorSearch` keeps serving while Atlas rebuilds. Returns what was
+    done: "unchanged", "updated" or "created".
+    """
     try:
-        db = Database.get_database()
+        db = await Database.get_async_database()
         # Check if the collection exists before creating it
-        if "products" not in await db.list_collection_names():
-            await db.create_collection("products")
+        if PRODUCTS_COLLECTION not in await db.list_collection_names():
+            await db.create_collection(PRODUCTS_COLLECTION)
 
-        collection = Database.get_collection("products")
-        try:
-            print("Dropping existing search index...")
-            await collection.drop_search_index("vector_index")
-        except Exception as e:
-            print(f"Could not drop index 'vector_index' (it may not exist): {e}")
-
-        search_index_model = SearchIndexModel(
-            name="vector_index",
-            type="vectorSearch",
-            definition={
-                "fields": [
-                    {
-                        "type": "vector",
-                        "path": "embedding",
-                        "numDimensions": 768,
-                        "similarity": "cosine",
-                    }
-                ]
-            },
-        )
-        collection = Database.get_sync_collection("products")
-        vector_store = MongoDBAtlasVectorSearch(
-            collection=collection,
-            embedding=GoogleGenerativeAIEmbeddings(
-                model="text-embedding-004", google_api_key=api_key
-            ),
-            type="vectorSearch",
-            index_name="vector_index",
-            relevance_score_fn="cosine",
+        collection = db[PRODUCTS_COLLECTION]
+        existing = await collection.list_search_indexes(VECTOR_INDEX_NAME).to_list(
+            length=None
         )
+        if existing:
+            definition = existing[0].get("latestDefinition") or existing[0].get(
+                "definition"
+            )
+            if definition == VECTOR_INDEX_DEFINITION:
+                return "unchanged"
+            logger.info("Updating search index %s", VECTOR_INDEX_NAME)
+            await collection.update_search_index(
+                VECTOR_INDEX_NAME, VECTOR_INDEX_DEFINITION
+            )
+            return "updated"
 
-        logger.info("Successfully created search index")
-        vector_store.create_vector_search_index(dimensions=768)
+        logger.info("Creating search index %s", VECTOR_INDEX_NAME)
+        await collection.create_search_index(
+            SearchIndexModel(
+                name=VECTOR_INDEX_NAME,
+                type="vectorSearch",
+                definition=VECTOR_INDEX_DEFINITION,
+            )
+        )
+        return "created"
     except Exception as e:
-        logger.error(f"Error creating search index: {e}")
+        logger.error("Error creating search index: %s", e)
         raise e
 
 
-parser = PydanticOutputParser(pydantic_object=ProductsList)
+@lru_cache(maxsize=1)
+def get_parser() -> "PydanticOutputParser":
+    from langchain_core.output_parsers import PydanticOutputParser
 
+    return PydanticOutputParser(pydantic_object=ProductsList)
 
-async def generate_synthetic_data() -> list[Product]:
-    logger.info("Generating synthetic data...")
+
+def get_embeddings() -> "Embeddings":
+    from agents.llm import get_embeddings
+
+    return get_embeddings()
+
+
+async def generate_synthetic_data(count: int = 20) -> list[Product]:
+    logger.info("Generating %d products with the LLM...", count)
+    parser = get_parser()
     prompt = f"""
     You are a helpful assistant that generates synthetic data for a furniture store.
-    You are to generate 20 products with the following fields:
+    You are to generate {count} products with the following fields:
 
     id: int
     sku: str (unique product code, like "SKU12345")
@@ -125,8 +162,7 @@ async def generate_synthetic_data() -> list[Product]:
 
     Return the data as a list of JSON objects.
     """
-    print("Generating synthetic data...")
-    response = llm.invoke(prompt)
+    response = await get_seed_llm().ainvoke(prompt)
     raw_output = response.content
     if isinstance(raw_output, list):
         raw_output = " ".join([str(part) for part in raw_output])
@@ -137,7 +173,7 @@ async def generate_synthetic_data() -> list[Product]:
 
 
 async def create_product_summary(product: Product) -> str:
-    logger.info(f"creating product summary: {product.name}")
+    logger.info("creating product summary: %s", product.name)
     manufacturer_details = (
         f"Made in {product.manufacturer.country}"
         if product.manufacturer and product.manufacturer.country
@@ -176,44 +212,269 @@ async def create_product_summary(product: Product) -> str:
     return summary
 
 
-async def seed_database():
-    logger.info(f"Seeding database...")
-    try:
-        collection = Database.get_collection("products")
-        await create_search_index()
-        synthetic_data: list[Product] = await generate_synthetic_data()
-
-        records_with_summary = [
-            Document(
-                page_content=await create_product_summary(product),
-                metadata=product.model_dump(),
-            )
-            for product in synthetic_data
-        ]
-
-        collection = Database.get_sync_collection("products")
-        vector_store = MongoDBAtlasVectorSearch(
-            collection=collection,
-            embedding=GoogleGenerativeAIEmbeddings(
-                model="text-embedding-004", google_api_key=api_key
-            ),
-            type="vectorSearch",
-            index_name="vector_index",
-            relevance_score_fn="cosine",
+async def product_document(product: Product) -> dict:
+    """Stored shape of a product: its fields plus summary `text` and `embedding`."""
+    text = await create_product_summary(product)
+    return {
+        **product.model_dump(),
+        "text": text,
+        "embedding": await get_embeddings().aembed_query(text),
+    }
+
+
+SeedSource = Literal["synthetic", "llm"]
+
+
+class SeedRequest(BaseModel):
+    source: SeedSource = "synthetic"
+    count: int = Field(default=1000, ge=1, le=2_000_000)
+    chunk_size: int = Field(default_factory=lambda: settings.seed_chunk_size, ge=1)
+    concurrency: int = Field(default_factory=lambda: settings.seed_concurrency, ge=1)
+    llm_batch_size: int = Field(
+        default_factory=lambda: settings.seed_llm_batch_size, ge=1, le=50
+    )
+    seed: int = 42
+    resume: bool = True
+
+    @property
+    def total_chunks(self) -> int:
+        return -(-self.count // self.chunk_size)
+
+    @property
+    def job_id(self) -> str:
+        """Same parameters -> same job, so a repeated request resumes it."""
+        key = f"{self.source}:{self.count}:{self.chunk_size}:{self.seed}"
+        return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def generate_chunk(request: SeedRequest, chunk: int) -> list[dict]:
+    """Product documents (without embeddings) for one chunk of the catalog."""
+    start = chunk * request.chunk_size
+    size = min(request.chunk_size, request.count - start)
+    if request.source == "synthetic":
+        # Generation is CPU-bound (~0.6s per 500 products); keep it off the
+        # event loop so a running seed does not stall chat traffic. The
+        # generator is lazy, so list() does the work in the thread.
+        return await asyncio.to_thread(
+            list, generate_products(size, request.seed, start, embedding_dims=None)
         )
 
-        vector_store.add_documents(records_with_summary)
+    # One structured-output call cannot reliably return a whole chunk, so the
+    # LLM is asked for llm_batch_size products at a time.
+    products: list[Product] = []
+    while len(products) < size:
+        batch = await generate_synthetic_data(
+            min(request.llm_batch_size, size - len(products))
+        )
+        if not batch:
+            raise ValueError(f"LLM returned no products for chunk {chunk}")
+        products += batch
+    docs = []
+    for offset, product in enumerate(products[:size]):
+        # The LLM invents ids and SKUs; pin them to the chunk slot so a
+        # re-run overwrites the same documents instead of adding new ones.
+        product.sku = f"GEN-{request.seed}-{start + offset:07d}"
+        product.id = str(start + offset)
+        doc = product.model_dump()
+        doc["text"] = await create_product_summary(product)
+        docs.append(doc)
+    return docs
+
+
+async def embed_documents(docs: list[dict]) -> None:
+    """Attach `embedding` vectors to ``docs`` in provider-sized batches."""
+    embeddings = get_embeddings()
+    batch_size = settings.seed_embedding_batch_size
+    for offset in range(0, len(docs), batch_size):
+        batch = docs[offset : offset + batch_size]
+        vectors = await embeddings.aembed_documents([doc["text"] for doc in batch])
+        for doc, vector in zip(batch, vectors):
+            doc["embedding"] = vector
+
+
+async def upsert_products(docs: list[dict]) -> int:
+    """Upsert ``docs`` keyed on `sku`; returns the number of documents written."""
+    if not docs:
+        return 0
+    collection = await Database.get_async_collection(PRODUCTS_COLLECTION)
+    operations = []
+    for doc in docs:
+        fields = {key: value for key, value in doc.items() if key != "_id"}
+        update: dict[str, Any] = {"$set": fields}
+        if "_id" in doc:
+            update["$setOnInsert"] = {"_id": doc["_id"]}
+        operations.append(UpdateOne({"sku": doc["sku"]}, update, upsert=True))
+    result = await collection.bulk_write(operations, ordered=False)
+    return result.upserted_count + result.matched_count
+
+
+async def seed_chunk(request: SeedRequest, chunk: int) -> int:
+    docs = await generate_chunk(request, chunk)
+    await embed_documents(docs)
+    written = await upsert_products(docs)
+    jobs = await Database.get_async_collection(SEED_JOBS_COLLECTION)
+    await jobs.update_one(
+        {"_id": request.job_id},
+        {
+            "$addToSet": {"completed_chunks": chunk},
+            "$inc": {"products_written": written},
+            "$set": {"updated_at": _now()},
+        },
+    )
+    return written
+
 
-        # documents_to_insert = []
-        # for record in records_with_summary:
-        #     product_data = record.metadata.copy()  # Start with product's dict
-        #     product_data["embedding_text"] = record.page_content
-        #     product_data["embedding"] = embeddings.embed_query(record.page_content)
-        #     documents_to_insert.append(product_data)
+async def seed_database(request: Optional[SeedRequest] = None) -> dict:
+    """
+    Seed the products collection in concurrent chunks.
+
+    Progress is recorded per chunk in the `seed_jobs` collection; running the
+    same request again skips finished chunks, and because writes are upserts
+    on `sku` a full re-run (``resume=False``) never duplicates products.
+    """
+    request = request or SeedRequest()
+    job_id = request.job_id
+    jobs = await Database.get_async_collection(SEED_JOBS_COLLECTION)
 
-        # await collection.insert_many(documents_to_insert)
+    progress = {"completed_chunks": [], "products_written": 0}
+    update: dict[str, Any] = {
+        "$set": {
+            "status": "running",
+            "request": request.model_dump(),
+            "total_chunks": request.total_chunks,
+            "started_at": _now(),
+            "updated_at": _now(),
+            "error": None,
+        }
+    }
+    if request.resume:
+        update["$setOnInsert"] = progress
+    else:
+        update["$set"].update(progress)
+    # Written before anything that can fail, so every failure below is
+    # reported through the job document.
+    job = await jobs.find_one_and_update(
+        {"_id": job_id}, update, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    semaphore = asyncio.Semaphore(request.concurrency)
+    index_task: Optional[asyncio.Task] = None
+    tasks: list[asyncio.Task] = []
 
-        # return JSONResponse(content={"data": [item.dict() for item in data]})
+    async def run(chunk: int) -> int:
+        async with semaphore:
+            return await seed_chunk(request, chunk)
+
+    started = time.perf_counter()
+    try:
+        collection = await Database.get_async_collection(PRODUCTS_COLLECTION)
+        await collection.create_index("sku", unique=True)
+        completed = set(job.get("completed_chunks", []))
+        pending = [c for c in range(request.total_chunks) if c not in completed]
+        logger.info(
+            "Seeding job %s: %d/%d chunks pending (%s, concurrency %d)",
+            job_id,
+            len(pending),
+            request.total_chunks,
+            request.source,
+            request.concurrency,
+        )
+        # The index build is slow on Atlas and independent of the writes.
+        index_task = asyncio.create_task(create_search_index())
+        tasks = [asyncio.create_task(run(chunk)) for chunk in pending]
+        await asyncio.gather(*tasks)
+    except BaseException as e:
+        # Stop the remaining chunks so nothing is written after the job
+        # is marked failed; a resume picks them up.
+        for task in [index_task, *tasks]:
+            if task:
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await jobs.update_one(
+            {"_id": job_id},
+            {"$set": {"status": "failed", "error": repr(e), "updated_at": _now()}},
+        )
+        raise
+    try:
+        index_status = await index_task
+        logger.info("Seeding job %s: search index %s", job_id, index_status)
     except Exception as e:
-        logger.error(f"Error seeding database: {e}")
-        raise e
+        logger.warning("Seeding job %s: search index not created: %s", job_id, e)
+
+    job = await jobs.find_one_and_update(
+        {"_id": job_id},
+        {"$set": {"status": "completed", "updated_at": _now()}},
+        return_document=ReturnDocument.AFTER,
+    )
+    logger.info(
+        "Seeding job %s completed in %.1fs", job_id, time.perf_counter() - started
+    )
+    return job_progress(job)
+
+
+def job_progress(job: dict) -> dict:
+    total = job.get("total_chunks") or 0
+    completed = len(job.get("completed_chunks", []))
+    return {
+        "job_id": job["_id"],
+        "status": job.get("status"),
+        "request": job.get("request"),
+        "total_chunks": total,
+        "completed_chunks": completed,
+        "progress": round(completed / total, 4) if total else 0.0,
+        "products_written": job.get("products_written", 0),
+        "started_at": job.get("started_at"),
+        "updated_at": job.get("updated_at"),
+        "error": job.get("error"),
+    }
+
+
+class SeedJobs:
+    """Runs seed jobs as background tasks in this process."""
+
+    _tasks: ClassVar[dict[str, asyncio.Task]] = {}
+
+    @classmethod
+    async def start(cls, request: SeedRequest) -> tuple[str, bool]:
+        """
+        Start (or resume) the job for ``request``; returns (job_id, started).
+
+        A job already running here is not started twice. A job marked
+        `running` by another process is only taken over once its heartbeat
+        is older than `seed_job_stale_seconds`.
+        """
+        job_id = request.job_id
+        task = cls._tasks.get(job_id)
+        if task and not task.done():
+            return job_id, False
+
+        jobs = await Database.get_async_collection(SEED_JOBS_COLLECTION)
+        job = await jobs.find_one({"_id": job_id})
+        if job and job.get("status") == "running":
+            updated_at = job["updated_at"]
+            if updated_at.tzinfo is None:
+                updated_at = updated_at.replace(tzinfo=timezone.utc)
+            age = (_now() - updated_at).total_seconds()
+            if age < settings.seed_job_stale_seconds:
+                return job_id, False
+
+        cls._tasks[job_id] = asyncio.create_task(cls._run(request))
+        return job_id, True
+
+    @classmethod
+    async def _run(cls, request: SeedRequest) -> None:
+        try:
+            await seed_database(request)
+        except Exception:
+            logger.exception("Seeding job %s failed", request.job_id)
+        finally:
+            cls._tasks.pop(request.job_id, None)
+
+    @classmethod
+    async def progress(cls, job_id: str) -> Optional[dict]:
+        jobs = await Database.get_async_collection(SEED_JOBS_COLLECTION)
+        job = await jobs.find_one({"_id": job_id})
+        return job_progress(job) if job else None
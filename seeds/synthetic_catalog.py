@@ -0,0 +1,461 @@
+"""
+Deterministic, offline synthetic product catalog.
+
+Produces documents shaped like the seeded `products` collection (Product
+fields plus the `text` summary and `embedding` vector used by vector search)
+at any scale. Product ``i`` depends only on (seed, i), so runs are
+reproducible and ranges can be generated independently.
+
+    python -m seeds.synthetic_catalog --scale 100k --output catalog.ndjson.gz
+    python -m seeds.synthetic_catalog --scale 10k --mongo --batch-size 2000
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import IO, Iterator, Optional
+
+import orjson
+from bson import ObjectId, json_util
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from libs.database import Database
+from libs.logger import get_logger
+from libs.slug import generate_slug
+
+logger = get_logger(__name__)
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# weight, median price (USD), nouns, variant attribute and options
+CATEGORIES: dict[str, dict] = {
+    "Furniture": {
+        "weight": 30,
+        "price": 450,
+        "nouns": [
+            "Sofa",
+            "Armchair",
+            "Coffee Table",
+            "Bookshelf",
+            "Bed Frame",
+            "Dining Chair",
+            "Sideboard",
+            "Desk",
+            "Ottoman",
+            "Nightstand",
+        ],
+        "variants": ("color", ["Oak", "Walnut", "Charcoal", "Ivory", "Sage", "Blush"]),
+    },
+    "Lighting": {
+        "weight": 14,
+        "price": 120,
+        "nouns": [
+            "Floor Lamp",
+            "Pendant Light",
+            "Table Lamp",
+            "Wall Sconce",
+            "String Lights",
+            "Chandelier",
+        ],
+        "variants": ("finish", ["Brass", "Matte Black", "Chrome", "Opal Glass"]),
+    },
+    "Decor": {
+        "weight": 18,
+        "price": 45,
+        "nouns": [
+            "Vase",
+            "Wall Mirror",
+            "Throw Pillow",
+            "Candle Set",
+            "Rug",
+            "Wall Art",
+            "Planter",
+            "Throw Blanket",
+        ],
+        "variants": ("color", ["Terracotta", "Cream", "Forest", "Dusty Pink", "Navy"]),
+    },
+    "Bags": {
+        "weight": 16,
+        "price": 160,
+        "nouns": [
+            "Tote Bag",
+            "Crossbody Bag",
+            "Backpack",
+            "Clutch",
+            "Weekender",
+            "Shoulder Bag",
+        ],
+        "variants": ("color", ["Black", "Tan", "Cherry", "Olive", "Cream"]),
+    },
+    "Kitchen": {
+        "weight": 12,
+        "price": 60,
+        "nouns": [
+            "Dutch Oven",
+            "Knife Set",
+            "Mug Set",
+            "Serving Board",
+            "Espresso Cups",
+            "Mixing Bowls",
+        ],
+        "variants": ("size", ["Small", "Medium", "Large"]),
+    },
+    "Electronics": {
+        "weight": 10,
+        "price": 220,
+        "nouns": [
+            "Smart Speaker",
+            "Record Player",
+            "Desk Fan",
+            "Air Purifier",
+            "Headphones",
+            "Alarm Clock",
+        ],
+        "variants": ("color", ["Black", "White", "Sand"]),
+    },
+}
+ADJECTIVES = [
+    "Velvet",
+    "Minimal",
+    "Cozy",
+    "Retro",
+    "Boucle",
+    "Rattan",
+    "Marble",
+    "Linen",
+    "Sculpted",
+    "Modular",
+    "Scandi",
+    "Vintage",
+    "Cloud",
+    "Arched",
+    "Woven",
+    "Leather",
+    "Ceramic",
+    "Aesthetic",
+]
+BRAND_PREFIXES = [
+    "Luxor",
+    "Nord",
+    "Casa",
+    "Atelier",
+    "Maison",
+    "Kasa",
+    "Hygge",
+    "Oslo",
+    "Terra",
+    "Lumen",
+    "Juniper",
+    "Willow",
+    "Ember",
+    "Sol",
+]
+BRAND_SUFFIXES = ["Home", "Studio", "Co", "Living", "Goods", "Works", "House"]
+COUNTRIES = [
+    "Italy",
+    "Denmark",
+    "Portugal",
+    "Vietnam",
+    "India",
+    "USA",
+    "Mexico",
+    "Turkey",
+    "China",
+    "Poland",
+]
+COMMENTS = [
+    "Obsessed, looks even better in person",
+    "Good quality for the price",
+    "Shipping took a while but worth it",
+    "Colour is slightly different from the photos",
+    "Super comfy and so aesthetic",
+    "Assembly was easy, took 20 minutes",
+    "Feels premium, would buy again",
+    "Smaller than expected",
+    "Everyone asks where I got it",
+    "Not my vibe, returned it",
+]
+BRANDS = [f"{p} {s}" for p in BRAND_PREFIXES for s in BRAND_SUFFIXES]
+CATEGORY_NAMES = list(CATEGORIES)
+CATEGORY_WEIGHTS = [CATEGORIES[name]["weight"] for name in CATEGORY_NAMES]
+# Zipf-like brand popularity: a few big brands, a long tail.
+BRAND_WEIGHTS = [1 / (rank + 1) ** 1.1 for rank in range(len(BRANDS))]
+
+
+def product_object_id(seed: int, index: int) -> ObjectId:
+    return ObjectId(hashlib.sha256(f"{seed}:{index}".encode()).digest()[:12])
+
+
+def product_sku(seed: int, index: int) -> str:
+    """Unique per (seed, index); hashed prefixes collide at catalog scale."""
+    return f"SKU-{seed}-{index:07d}"
+
+
+def product_text(doc: dict) -> str:
+    """Summary indexed for vector search; same layout as create_product_summary."""
+    price = doc["price"]
+    if price.get("discounted_amount"):
+        discount = (
+            f"Discounted: {price['discounted_amount']} {price['currency']} "
+            f"({price['discount_percentage']}% off)"
+        )
+    else:
+        discount = "No discounts available"
+    reviews = (
+        " ".join(
+            f"Rated {r['rating']} on {r['created_at']}: {r['comment']}"
+            for r in doc["reviews"][:3]
+        )
+        or "No reviews yet"
+    )
+    return (
+        f"{doc['name']} ({doc['category']}) by {doc['brand']}. "
+        f"Made in {doc['manufacturer']['country']}. "
+        f"Categories: {', '.join(doc['tags'])}. Reviews: {reviews}. "
+        f"Price: {price['amount']} {price['currency']}. {discount}.."
+    )
+
+
+def generate_product(seed: int, index: int) -> dict:
+    """Build product ``index`` of the catalog for ``seed``."""
+    rng = random.Random(f"{seed}:{index}")
+    category = rng.choices(CATEGORY_NAMES, CATEGORY_WEIGHTS)[0]
+    profile = CATEGORIES[category]
+    brand = rng.choices(BRANDS, BRAND_WEIGHTS)[0]
+    noun = rng.choice(profile["nouns"])
+    adjective = rng.choice(ADJECTIVES)
+    name = f"{adjective} {noun} {index:07d}"
+    _id = product_object_id(seed, index)
+
+    # Log-normal prices around the category median, rounded to .99
+    amount = max(4.99, math.floor(profile["price"] * rng.lognormvariate(0, 0.6)) + 0.99)
+    price: dict = {"amount": amount, "currency": "USD"}
+    if rng.random() < 0.25:
+        pct = rng.choice([10, 15, 20, 25, 30, 40])
+        price["discount_percentage"] = float(pct)
+        price["discounted_amount"] = round(amount * (100 - pct) / 100, 2)
+
+    # Long-tailed review counts; ratings skew positive.
+    review_count = min(int(rng.paretovariate(1.3)) - 1, 50)
+    created_at = EPOCH + timedelta(minutes=rng.randrange(0, 600 * 24 * 60))
+    reviews = []
+    for review in range(review_count):
+        rating = float(min(5, max(1, round(rng.gauss(4.2, 0.9)))))
+        reviews.append(
+            {
+                "user_id": rng.randrange(1, 500_000),
+                "rating": rating,
+                "comment": rng.choice(COMMENTS),
+                "created_at": created_at + timedelta(days=rng.randrange(1, 300)),
+                "updated_at": created_at + timedelta(days=rng.randrange(1, 300)),
+            }
+        )
+    rating = (
+        round(sum(r["rating"] for r in reviews) / len(reviews), 1) if reviews else None
+    )
+
+    attribute, options = profile["variants"]
+    sku = product_sku(seed, index)
+    variants = [
+        {
+            "sku": f"{sku}-{option[:3].upper()}",
+            "name": option,
+            "additional_price": float(rng.choice([0, 0, 10, 25])),
+            "attributes": {attribute: option},
+        }
+        for option in rng.sample(options, rng.randint(0, min(4, len(options))))
+    ]
+
+    stock_quantity = 0 if rng.random() < 0.08 else rng.randint(1, 250)
+    slug = generate_slug(name)
+    doc = {
+        "_id": _id,
+        "id": str(_id),
+        "sku": sku,
+        "name": name,
+        "description": (
+            f"{adjective} {noun.lower()} from {brand}, designed for everyday "
+            f"{category.lower()} moments."
+        ),
+        "category": category,
+        "brand": brand,
+        "price": price,
+        "stock_quantity": stock_quantity,
+        "in_stock": stock_quantity > 0,
+        "images": [
+            f"https://images.tryluxor.example/{slug}-{n}.jpg"
+            for n in range(1, rng.randint(2, 5))
+        ],
+        "tags": sorted(
+            {
+                category.lower(),
+                noun.lower(),
+                adjective.lower(),
+                rng.choice(ADJECTIVES).lower(),
+            }
+        ),
+        "metadata": {"synthetic": True, "seed": seed, "index": index},
+        "rating": rating,
+        "reviews": reviews,
+        "variants": variants,
+        "manufacturer": {
+            "name": brand,
+            "country": rng.choice(COUNTRIES),
+            "website": f"https://{generate_slug(brand)}.example",
+        },
+        "weight": round(rng.lognormvariate(1, 0.8), 2),
+        "dimensions": {
+            "length": round(rng.uniform(10, 220), 1),
+            "width": round(rng.uniform(10, 120), 1),
+            "height": round(rng.uniform(5, 200), 1),
+        },
+        "created_at": created_at,
+        "updated_at": created_at + timedelta(days=rng.randrange(0, 120)),
+    }
+    doc["text"] = product_text(doc)
+    return doc
+
+
+def generate_products(
+    count: int,
+    seed: int = 42,
+    start: int = 0,
+    embedding_dims: Optional[int] = 768,
+) -> Iterator[dict]:
+    """
+    Stream products ``start`` .. ``start + count - 1``. Embeddings are
+    deterministic pseudo-embeddings of the summary text (TokenHashEmbeddings),
+    so the fake embedding provider's query vectors land near matching products.
+    Pass ``embedding_dims=None`` to omit them.
+    """
+    from agents.llm import TokenHashEmbeddings
+
+    embeddings = TokenHashEmbeddings(size=embedding_dims) if embedding_dims else None
+    for index in range(start, start + count):
+        doc = generate_product(seed, index)
+        if embeddings is not None:
+            doc["embedding"] = embeddings.embed(doc["text"])
+        yield doc
+
+
+def batched(docs: Iterator[dict], size: int) -> Iterator[list[dict]]:
+    batch: list[dict] = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def insert_catalog(
+    docs: Iterator[dict], collection_name: str = "products", batch_size: int = 1000
+) -> int:
+    """Stream ``docs`` into Mongo with unordered ``insert_many`` batches."""
+    collection = await Database.get_async_collection(collection_name)
+    inserted = 0
+    for batch in batched(docs, batch_size):
+        result = await collection.insert_many(batch, ordered=False)
+        inserted += len(result.inserted_ids)
+        logger.info("insert_catalog: %d products inserted", inserted)
+    return inserted
+
+
+def _extended_json(value: object) -> dict:
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Cannot serialise {type(value).__name__}")
+
+
+def write_catalog(docs: Iterator[dict], path: str) -> int:
+    """Write ``docs`` as Extended JSON lines (gzip when the path ends in .gz)."""
+    output: IO[str] = (
+        gzip.open(path, "wt", encoding="utf-8", compresslevel=1)
+        if path.endswith(".gz")
+        else open(path, "w", encoding="utf-8")
+    )
+    written = 0
+    with output:
+        for doc in docs:
+            # orjson with Extended JSON hooks; json_util.dumps is ~50x slower
+            # on embedding arrays.
+            output.write(
+                orjson.dumps(
+                    doc,
+                    default=_extended_json,
+                    option=orjson.OPT_PASSTHROUGH_DATETIME,
+                ).decode()
+                + "\n"
+            )
+            written += 1
+    return written
+
+
+def read_catalog(path: str) -> Iterator[dict]:
+    """Read a fixture written by write_catalog back into BSON-ready dicts."""
+    source: IO[str] = (
+        gzip.open(path, "rt", encoding="utf-8")
+        if path.endswith(".gz")
+        else open(path, encoding="utf-8")
+    )
+    with source:
+        for line in source:
+            yield json_util.loads(line)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    size = parser.add_mutually_exclusive_group(required=True)
+    size.add_argument("--scale", choices=sorted(SCALES))
+    size.add_argument("--count", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--embedding-dims", type=int, default=768)
+    parser.add_argument("--no-embeddings", action="store_true")
+    parser.add_argument("--output", help="write an NDJSON(.gz) fixture")
+    parser.add_argument("--mongo", action="store_true", help="insert into Mongo")
+    parser.add_argument("--collection", default="products")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    if not args.output and not args.mongo:
+        parser.error("choose --output and/or --mongo")
+
+    count = SCALES[args.scale] if args.scale else args.count
+    dims = None if args.no_embeddings else args.embedding_dims
+    started = time.perf_counter()
+    if args.output:
+        written = write_catalog(
+            generate_products(count, args.seed, args.start, dims), args.output
+        )
+        logger.info("Wrote %d products to %s", written, args.output)
+    if args.mongo:
+        await Database.connect()
+        try:
+            docs = (
+                read_catalog(args.output)
+                if args.output
+                else generate_products(count, args.seed, args.start, dims)
+            )
+            inserted = await insert_catalog(docs, args.collection, args.batch_size)
+            logger.info("Inserted %d products into %s", inserted, args.collection)
+        finally:
+            await Database.disconnect()
+    logger.info("Done in %.1fs", time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from libs.admission import AdmissionController
+from routes import chat
+
+
+def test_limit_shrinks_when_llm_latency_rises():
+    admission = AdmissionController(
+        "test_adaptive", max_in_flight=16, min_in_flight=2, target_latency=3.0
+    )
+    assert admission.limit() == 16
+
+    for _ in range(20):
+        admission.record_latency(6.0)
+    assert admission.limit() == 8
+    assert admission.retry_after() == 6
+
+    for _ in range(50):
+        admission.record_latency(100.0)
+    assert admission.limit() == 2  # never below min_in_flight
+
+    for _ in range(50):
+        admission.record_latency(1.0)
+    assert admission.limit() == 16
+
+
+def make_client(monkeypatch) -> tuple[TestClient, AdmissionController]:
+    admission = AdmissionController(
+        "test_chat", max_in_flight=1, min_in_flight=1, target_latency=3.0
+    )
+    monkeypatch.setattr(chat, "chat_admission", admission)
+    app = FastAPI()
+
+    @app.post("/turn", dependencies=[Depends(chat.admit_chat)])
+    async def turn(fail: bool = False):
+        if fail:
+            raise RuntimeError("agent failed")
+        return {"in_flight": admission.in_flight}
+
+    return TestClient(app, raise_server_exceptions=False), admission
+
+
+def test_requests_over_the_limit_are_shed_unless_priority(monkeypatch):
+    client, admission = make_client(monkeypatch)
+    assert client.post("/turn").json() == {"in_flight": 1}
+
+    admission.in_flight = 1  # another request holds the only slot
+    shed = client.post("/turn")
+    assert shed.status_code == 429
+    assert shed.headers["Retry-After"] == "3"
+
+    priority = client.post("/turn", headers={"X-Priority": "Checkout"})
+    assert priority.status_code == 200
+    assert priority.json() == {"in_flight": 2}
+    assert admission.in_flight == 1
+
+
+def test_in_flight_drops_back_after_a_failed_request(monkeypatch):
+    client, admission = make_client(monkeypatch)
+
+    assert client.post("/turn", params={"fail": True}).status_code == 500
+    assert admission.in_flight == 0
+    assert client.post("/turn").status_code == 200
@@ -0,0 +1,115 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import SecretStr
+
+import agents.chat_agent as chat_agent
+from agents.batch_eval import BatchItem, run_batch
+from agents.llm import FakeShoppingLLM
+from libs.admission import chat_admission
+from libs.database import settings
+from routes import chat
+
+
+def test_batch_runs_items_offline_with_usage(monkeypatch):
+    monkeypatch.setattr(chat_agent, "llm", FakeShoppingLLM(latency_ms=20))
+    monkeypatch.setattr(settings, "catalog_provider", "fake")
+    monkeypatch.setattr(settings, "chat_checkpointer", "memory")
+    monkeypatch.setattr(settings, "history_summary_enabled", False)
+    items = [
+        BatchItem(id="a", message="black handbags"),
+        BatchItem(id="b", messages=["cozy lamps", "and rugs?"]),
+        BatchItem(id="c", message="hello"),
+    ]
+
+    async def collect() -> list[dict]:
+        return [
+            record
+            async for record in run_batch(items, concurrency=2, include_products=True)
+        ]
+
+    records = {record["id"]: record for record in asyncio.run(collect())}
+
+    assert all(record["status"] == "ok" for record in records.values())
+    assert len(records["b"]["turns"]) == 2
+    handbags = records["a"]["turns"][0]
+    assert handbags["llm_calls"] == 2 and handbags["prompt_tokens"] > 0
+    assert handbags["products"][0]["name"] == "Black Handbags 1"
+    # Greetings are answered from templates without an LLM call.
+    assert records["c"]["turns"][0]["llm_calls"] == 0
+
+
+def test_batch_surfaces_a_dead_worker_instead_of_hanging(monkeypatch):
+    import agents.batch_eval as batch_eval
+
+    async def cancelled_item(*args):
+        raise asyncio.CancelledError()
+
+    monkeypatch.setattr(batch_eval, "run_item", cancelled_item)
+
+    async def collect() -> list[dict]:
+        return [record async for record in run_batch([BatchItem(message="hi")])]
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(asyncio.wait_for(collect(), timeout=2))
+
+
+def test_batch_endpoint_requires_admin_and_admission(monkeypatch):
+    monkeypatch.setattr(chat_agent, "llm", FakeShoppingLLM())
+    monkeypatch.setattr(settings, "catalog_provider", "fake")
+    monkeypatch.setattr(settings, "chat_checkpointer", "memory")
+    monkeypatch.setattr(settings, "history_summary_enabled", False)
+    monkeypatch.setattr(settings, "admin_token", SecretStr("secret"))
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/chat")
+    client = TestClient(app)
+    body = {"items": [{"message": "black handbags"}, {"message": "lamps"}]}
+
+    assert client.post("/chat/batch", json=body).status_code == 401
+
+    monkeypatch.setattr(chat_admission, "in_flight", chat_admission.limit())
+    shed = client.post("/chat/batch", json=body, headers={"X-Admin-Token": "secret"})
+    assert shed.status_code == 429
+
+    monkeypatch.setattr(chat_admission, "in_flight", chat_admission.limit() - 2)
+    response = client.post(
+        "/chat/batch", json=body, headers={"X-Admin-Token": "secret"}
+    )
+    records = [orjson.loads(line) for line in response.text.splitlines()]
+    # The batch holds one of the two free slots while it streams, so one
+    # item runs and the other is shed and reported.
+    assert sorted(record["status"] for record in records) == ["ok", "rejected"]
+    assert chat_admission.in_flight == chat_admission.limit() - 2
+
+
+def test_batch_holds_its_admission_slot_while_streaming(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", SecretStr("secret"))
+    monkeypatch.setattr(chat_admission, "in_flight", 0)
+    seen = []
+
+    async def run_batch(*args, **kwargs):
+        for index in range(2):
+            seen.append(chat_admission.in_flight)
+            yield {"index": index, "status": "ok"}
+
+    monkeypatch.setattr(chat, "run_batch", run_batch)
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/chat")
+    response = TestClient(app).post(
+        "/chat/batch",
+        json={"items": [{"message": "lamps"}]},
+        headers={"X-Admin-Token": "secret"},
+    )
+
+    assert response.status_code == 200
+    assert seen == [1, 1]
+    assert chat_admission.in_flight == 0
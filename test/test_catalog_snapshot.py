@@ -0,0 +1,62 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import subprocess
+
+import numpy as np
+
+from libs.catalog_snapshot import CatalogSnapshot, SnapshotStore
+from libs.database import settings
+from libs.slug import generate_slug
+from seeds.catalog_snapshot import build_from_products
+from seeds.synthetic_catalog import generate_products
+
+
+def test_snapshot_roundtrip_and_swap(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    monkeypatch.setattr(settings, "catalog_snapshot_dir", directory)
+    monkeypatch.setattr(settings, "catalog_snapshot_check_seconds", 0.0)
+    SnapshotStore.reset()
+    products = list(generate_products(300, seed=5, embedding_dims=32))
+
+    build_from_products(products, directory, dims=32)
+    snapshot = SnapshotStore.current()
+    assert snapshot is not None and len(snapshot) == 300
+    # Zero-copy: the matrix is a read-only view into the map.
+    assert not snapshot.embeddings.flags.writeable
+    assert np.allclose(np.linalg.norm(snapshot.embeddings, axis=1), 1.0, atol=1e-5)
+
+    target = products[123]
+    row = snapshot.find_slug(generate_slug(target["name"]))
+    assert row is not None
+    assert snapshot.product_id(row) == str(target["_id"])
+    assert snapshot.record(row)["sku"] == target["sku"]
+    assert snapshot.find_slug("no-such-product") is None
+    best_row, score = snapshot.search(target["embedding"], k=3)[0]
+    assert snapshot.record(best_row)["sku"] == target["sku"]
+    assert score > 0.99
+
+    build_from_products(products[:10], directory, dims=32, keep=1)
+    swapped = SnapshotStore.current()
+    assert swapped is not snapshot and len(swapped) == 10
+    # The old mapping stays readable after its file was pruned.
+    assert snapshot.record(row)["sku"] == target["sku"]
+    assert len([name for name in os.listdir(directory) if name.endswith(".snap")]) == 1
+    assert isinstance(CatalogSnapshot(swapped.path).version, str)
+    SnapshotStore.reset()
+
+
+def test_importing_the_app_does_not_import_numpy():
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, main; print('numpy' in sys.modules)"],
+        cwd=root,
+        env=dict(os.environ, GOOGLE_API_KEY=os.environ.get("GOOGLE_API_KEY", "x")),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,136 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langgraph.checkpoint.memory import InMemorySaver
+
+import agents.chat_agent as chat_agent
+import agents.chat_session as chat_session
+from agents.llm import FakeShoppingLLM
+from libs.database import Database
+from routes import chat
+
+
+def make_client(monkeypatch, durable: InMemorySaver) -> TestClient:
+    async def connect():
+        return None
+
+    async def lookup_products(query):
+        return "1. Velvet Sofa | 899 USD", [{"id": "s1", "name": "Velvet Sofa"}]
+
+    monkeypatch.setattr(chat_agent, "llm", FakeShoppingLLM())
+    monkeypatch.setattr(chat_agent, "lookup_products", lookup_products)
+    monkeypatch.setattr(Database, "connect", connect)
+    monkeypatch.setattr(chat_session, "create_checkpointer", lambda: durable)
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/chat")
+    return TestClient(app)
+
+
+def receive_reply(websocket) -> tuple[str, dict]:
+    streamed = ""
+    while True:
+        frame = websocket.receive_json()
+        if frame["type"] == "token":
+            streamed += frame["content"]
+        else:
+            return streamed, frame
+
+
+def test_websocket_streams_reply_and_writes_behind(monkeypatch):
+    durable = InMemorySaver()
+    client = make_client(monkeypatch, durable)
+
+    with client.websocket_connect("/chat/ws?thread_id=t1") as websocket:
+        assert websocket.receive_json() == {"type": "session", "thread_id": "t1"}
+        websocket.send_json({"message": "velvet sofa"})
+        streamed, frame = receive_reply(websocket)
+
+    assert frame["type"] == "message"
+    assert streamed == frame["message"]["AI"]
+    assert frame["message"]["products"][0]["slug"] == "velvet-sofa"
+
+    # The session flushed its hot state to the durable checkpointer on close.
+    saved = durable.get_tuple({"configurable": {"thread_id": "t1"}})
+    assert saved is not None
+    assert len(saved.checkpoint["channel_values"]["messages"]) == 4
+
+
+def test_websocket_resumes_thread_from_durable_state(monkeypatch):
+    durable = InMemorySaver()
+    client = make_client(monkeypatch, durable)
+
+    with client.websocket_connect("/chat/ws?thread_id=t2") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"message": "lamps"})
+        receive_reply(websocket)
+    with client.websocket_connect("/chat/ws?thread_id=t2") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"message": "rugs"})
+        receive_reply(websocket)
+
+    saved = durable.get_tuple({"configurable": {"thread_id": "t2"}})
+    assert len(saved.checkpoint["channel_values"]["messages"]) == 8
+
+
+def test_http_turns_on_an_open_session_are_not_lost(monkeypatch):
+    durable = InMemorySaver()
+    client = make_client(monkeypatch, durable)
+
+    with client:
+        with client.websocket_connect("/chat/ws?thread_id=t3") as websocket:
+            websocket.receive_json()
+            websocket.send_json({"message": "lamps"})
+            receive_reply(websocket)
+            reply = client.post("/chat/t3", json={"message": "rugs"})
+            assert reply.status_code == 200
+            assert chat_session.ChatSession.live["t3"].thread_id == "t3"
+            websocket.send_json({"message": "sofas"})
+            receive_reply(websocket)
+
+    assert "t3" not in chat_session.ChatSession.live
+    saved = durable.get_tuple({"configurable": {"thread_id": "t3"}})
+    questions = [
+        message.content
+        for message in saved.checkpoint["channel_values"]["messages"]
+        if message.type == "human"
+    ]
+    assert questions == ["lamps", "rugs", "sofas"]
+
+
+def test_sessions_share_one_compiled_graph():
+    first, second = chat_session.ChatSession("a"), chat_session.ChatSession("b")
+
+    assert first.graph.nodes["call_llm"] is second.graph.nodes["call_llm"]
+    assert first.graph.checkpointer is first.memory
+    assert second.graph.checkpointer is second.memory
+
+
+def test_flush_keeps_only_the_latest_checkpoint_in_memory(monkeypatch):
+    make_client(monkeypatch, InMemorySaver())
+    session = chat_session.ChatSession("t4", durable=InMemorySaver())
+
+    async def run():
+        await session.open()
+        await session.send("lamps")
+        await session.send("rugs")
+        before = list(session.memory.list(session.config))
+        await session.flush()
+        after = list(session.memory.list(session.config))
+        await session.send("sofas")
+        latest = await session.memory.aget_tuple(session.config)
+        await session.close()
+        return len(before), after, latest
+
+    before, after, latest = asyncio.run(run())
+
+    assert before > 1
+    assert len(after) == 1
+    assert len(after[0].checkpoint["channel_values"]["messages"]) == 8
+    assert len(latest.checkpoint["channel_values"]["messages"]) == 12
@@ -0,0 +1,122 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+from types import SimpleNamespace
+
+import bson
+
+from benchmarks.memory_mongo import MemoryCollection, MemoryCursor, matches
+from libs.checkpoint_retention import (
+    CHECKPOINT_COLLECTION,
+    WRITES_COLLECTION,
+    CheckpointCompactor,
+)
+from libs.database import Database, settings
+
+
+class IterableCursor(MemoryCursor):
+    def __aiter__(self):
+        async def iterate():
+            for doc in await self.to_list():
+                yield doc
+
+        return iterate()
+
+
+class CheckpointCollection(MemoryCollection):
+    """MemoryCollection plus the aggregate/delete calls the compactor issues."""
+
+    def find(self, query=None, projection=None):
+        return IterableCursor([doc for doc in self.docs if matches(doc, query or {})])
+
+    def aggregate(self, pipeline, **kwargs):
+        stages = {key: value for stage in pipeline for key, value in stage.items()}
+        docs = [doc for doc in self.docs if matches(doc, stages.get("$match", {}))]
+        if "bytes" in stages["$group"]:
+            rows = [{"bytes": sum(len(bson.encode(doc)) for doc in docs)}]
+        else:
+            counts: dict = {}
+            for doc in self.docs:
+                key = (doc["thread_id"], doc["checkpoint_ns"])
+                counts[key] = counts.get(key, 0) + 1
+            rows = [
+                {"_id": {"thread_id": thread, "checkpoint_ns": ns}, "count": count}
+                for (thread, ns), count in counts.items()
+                if count > stages["$match"]["count"]["$gt"]
+            ]
+        return IterableCursor(rows)
+
+    async def delete_many(self, query):
+        kept = [doc for doc in self.docs if not matches(doc, query)]
+        deleted = len(self.docs) - len(kept)
+        self.docs = kept
+        return SimpleNamespace(deleted_count=deleted)
+
+
+def thread_docs(thread_id: str, checkpoints: int) -> tuple[list, list]:
+    saved, writes = [], []
+    for index in range(checkpoints):
+        checkpoint_id = f"{index:04d}"
+        scope = {"thread_id": thread_id, "checkpoint_ns": ""}
+        saved.append({**scope, "checkpoint_id": checkpoint_id, "blob": "x" * 100})
+        writes.append({**scope, "checkpoint_id": checkpoint_id, "task_id": "t"})
+    return saved, writes
+
+
+def use_collections(monkeypatch, threads: dict[str, int]) -> dict:
+    saved, writes = [], []
+    for thread_id, count in threads.items():
+        thread_saved, thread_writes = thread_docs(thread_id, count)
+        saved += thread_saved
+        writes += thread_writes
+    db = {
+        CHECKPOINT_COLLECTION: CheckpointCollection(saved),
+        WRITES_COLLECTION: CheckpointCollection(writes),
+    }
+
+    async def get_async_database():
+        return db
+
+    monkeypatch.setattr(Database, "get_async_database", get_async_database)
+    monkeypatch.setattr(CheckpointCompactor, "_dirty", set())
+    return db
+
+
+def checkpoint_ids(collection, thread_id: str) -> list[str]:
+    return sorted(
+        doc["checkpoint_id"] for doc in collection.docs if doc["thread_id"] == thread_id
+    )
+
+
+def test_prune_keeps_latest_checkpoints_and_their_writes(monkeypatch):
+    db = use_collections(monkeypatch, {"t1": 5, "t2": 3})
+
+    reclaimed = asyncio.run(CheckpointCompactor.prune_thread("t1", keep_last=2))
+
+    assert reclaimed > 0
+    assert checkpoint_ids(db[CHECKPOINT_COLLECTION], "t1") == ["0003", "0004"]
+    assert checkpoint_ids(db[WRITES_COLLECTION], "t1") == ["0003", "0004"]
+    assert len(checkpoint_ids(db[CHECKPOINT_COLLECTION], "t2")) == 3
+    assert asyncio.run(CheckpointCompactor.prune_thread("t1", keep_last=2)) == 0
+
+
+def test_dirty_threads_and_sweep_are_compacted(monkeypatch):
+    monkeypatch.setattr(settings, "checkpoint_keep_last", 1)
+    db = use_collections(monkeypatch, {"t1": 4, "t2": 3, "t3": 1})
+
+    CheckpointCompactor.mark_dirty("t1")
+    asyncio.run(CheckpointCompactor.compact_dirty())
+
+    assert checkpoint_ids(db[CHECKPOINT_COLLECTION], "t1") == ["0003"]
+    assert len(checkpoint_ids(db[CHECKPOINT_COLLECTION], "t2")) == 3
+    assert CheckpointCompactor._dirty == set()
+
+    asyncio.run(CheckpointCompactor.sweep())
+
+    assert checkpoint_ids(db[CHECKPOINT_COLLECTION], "t2") == ["0002"]
+    assert checkpoint_ids(db[WRITES_COLLECTION], "t2") == ["0002"]
+    assert checkpoint_ids(db[CHECKPOINT_COLLECTION], "t3") == ["0000"]
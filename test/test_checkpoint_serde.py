@@ -0,0 +1,41 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from libs.checkpoint_serde import ZstdMsgpackSerializer
+
+
+def make_state() -> dict:
+    return {
+        "messages": [
+            HumanMessage(content="show me sofas", id="1"),
+            ToolMessage(content="1. Sofa | 899 USD " * 200, tool_call_id="t", id="2"),
+            AIMessage(content="Here you go!", id="3"),
+        ],
+        "product_info": [{"name": "Sofa", "price": {"amount": 899.0}}] * 20,
+    }
+
+
+def test_round_trip_compresses_large_payloads():
+    serde = ZstdMsgpackSerializer()
+    state = make_state()
+
+    type_, data = serde.dumps_typed(state)
+    default_type, default_data = JsonPlusSerializer().dumps_typed(state)
+
+    assert type_ == default_type + "+zstd"
+    assert len(data) < len(default_data) / 3
+    assert serde.loads_typed((type_, data)) == state
+
+
+def test_small_payloads_and_default_blobs_still_load():
+    serde = ZstdMsgpackSerializer(min_size=1024)
+
+    assert serde.dumps_typed({"a": 1})[0] == "msgpack"
+    legacy = JsonPlusSerializer().dumps_typed(make_state())
+    assert serde.loads_typed(legacy) == make_state()
@@ -0,0 +1,67 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+
+import pytest
+
+from libs.concurrency import ConcurrencyLimiter, KeyedLocks, QueueFullError
+from libs.metrics import MetricsRegistry
+
+
+def test_same_thread_turns_run_in_order_and_other_threads_do_not_wait():
+    locks = KeyedLocks("test_thread")
+    events: list[str] = []
+
+    async def turn(key: str, name: str, seconds: float) -> None:
+        async with locks.hold(key):
+            events.append(f"start {name}")
+            await asyncio.sleep(seconds)
+            events.append(f"end {name}")
+
+    async def run() -> None:
+        await asyncio.gather(
+            turn("a", "a1", 0.05), turn("a", "a2", 0.0), turn("b", "b1", 0.0)
+        )
+
+    asyncio.run(run())
+
+    assert events.index("end a1") < events.index("start a2")
+    # b1 started and finished while a1 still held thread a's lock.
+    assert events.index("end b1") < events.index("end a1")
+    assert locks._locks == {}
+    metrics = MetricsRegistry.snapshot()
+    assert metrics["test_thread_lock_wait_seconds"]["count"] == 3
+    assert metrics["test_thread_locks_active"]["value"] == 0
+
+
+def test_limiter_rejects_when_the_queue_is_full_and_records_metrics():
+    limiter = ConcurrencyLimiter("test_llm", max_concurrency=1, max_queue=1)
+    depths: list[float] = []
+
+    async def call(seconds: float) -> None:
+        async with limiter.acquire():
+            depths.append(MetricsRegistry.snapshot()["test_llm_queue_depth"]["value"])
+            await asyncio.sleep(seconds)
+
+    async def run() -> None:
+        first = asyncio.create_task(call(0.05))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(call(0.0))
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 1
+        with pytest.raises(QueueFullError):
+            await call(0.0)
+        await asyncio.gather(first, queued)
+
+    asyncio.run(run())
+
+    metrics = MetricsRegistry.snapshot()
+    assert depths == [0, 0]
+    assert metrics["test_llm_rejected_total"]["value"] == 1
+    assert metrics["test_llm_queue_wait_seconds"]["count"] == 2
+    assert metrics["test_llm_queue_wait_seconds"]["max"] >= 0.04
+    assert metrics["test_llm_in_flight"]["value"] == 0
@@ -0,0 +1,82 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+
+import pytest
+from pymongo import MongoClient
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+from libs.database import Database, catalog_read_options, client_options, settings
+
+REPLICA_SET_URI = os.getenv("MONGO_REPLICA_SET_URI")
+
+
+def test_pool_options_come_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, "mongo_max_pool_size", 7)
+    monkeypatch.setattr(settings, "mongo_socket_timeout_ms", None)
+
+    options = client_options(minPoolSize=0)
+    assert options["maxPoolSize"] == 7
+    assert options["minPoolSize"] == 0
+    assert "socketTimeoutMS" not in options
+
+    client = MongoClient(settings.mongo_uri, connect=False, **options)
+    assert client.options.pool_options.max_pool_size == 7
+    client.close()
+
+
+def test_sync_client_is_created_on_demand():
+    assert Database._sync_client is None
+    Database.get_sync_collection("products")
+    assert Database._sync_client is not None
+    Database._sync_client.close()
+    Database._sync_client = Database._sync_db = None
+
+
+def test_catalog_reads_use_catalog_read_preference(monkeypatch):
+    monkeypatch.setattr(settings, "catalog_read_preference", "secondaryPreferred")
+    monkeypatch.setattr(settings, "catalog_max_staleness_seconds", 120)
+
+    options = catalog_read_options()
+    assert options["read_preference"] == SecondaryPreferred(max_staleness=120)
+    assert options["read_concern"].level == "local"
+
+    monkeypatch.setattr(settings, "catalog_read_preference", "primary")
+    assert catalog_read_options()["read_preference"] == Primary()
+
+
+@pytest.mark.skipif(
+    not REPLICA_SET_URI, reason="set MONGO_REPLICA_SET_URI to a replica set"
+)
+def test_catalog_routing_against_replica_set(monkeypatch):
+    """
+    Start a local single-node replica set with e.g.
+    `mongod --replSet rs0 --dbpath /tmp/rs0 && mongosh --eval "rs.initiate()"`
+    and run with MONGO_REPLICA_SET_URI=mongodb://localhost:27017/?replicaSet=rs0.
+    """
+    monkeypatch.setattr(settings, "mongo_uri", REPLICA_SET_URI)
+    monkeypatch.setattr(settings, "database_name", "tryLuxor_test")
+    monkeypatch.setattr(settings, "catalog_read_preference", "secondaryPreferred")
+    monkeypatch.setattr(settings, "catalog_max_staleness_seconds", 90)
+
+    async def scenario():
+        await Database.connect()
+        try:
+            writes = await Database.get_async_collection("read_routing")
+            reads = await Database.get_catalog_collection("read_routing")
+            assert writes.read_preference == Primary()
+            assert reads.read_preference == SecondaryPreferred(max_staleness=90)
+
+            await writes.delete_many({})
+            await writes.insert_one({"sku": "RS-1"})
+            # With no secondaries, secondaryPreferred falls back to the primary.
+            assert await reads.find_one({"sku": "RS-1"}) is not None
+            await writes.drop()
+        finally:
+            await Database.disconnect()
+
+    asyncio.run(scenario())
@@ -0,0 +1,73 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+import agents.chat_agent as chat_agent
+from agents.llm import FakeShoppingLLM
+from libs.database import settings
+from libs.deadline import Deadline, DeadlineExceeded, current_deadline, with_timeout
+
+
+async def with_deadline(seconds: float, coro):
+    token = current_deadline.set(Deadline(seconds))
+    try:
+        return await coro
+    finally:
+        current_deadline.reset(token)
+
+
+def test_slow_lookup_degrades_without_products(monkeypatch):
+    async def slow_lookup(query):
+        await asyncio.sleep(0.5)
+        return "1. Lamp", [{"name": "Lamp"}]
+
+    monkeypatch.setattr(chat_agent, "lookup_products", slow_lookup)
+    monkeypatch.setattr(settings, "lookup_deadline_seconds", 0.05)
+    monkeypatch.setattr(settings, "llm_deadline_reserve_seconds", 0.0)
+
+    async def timed_lookup():
+        started = time.perf_counter()
+        result = await chat_agent.product_lookup({"queries": ["lamp"]})
+        return result, time.perf_counter() - started
+
+    result, elapsed = asyncio.run(with_deadline(5, timed_lookup()))
+
+    assert elapsed < 0.4
+    assert result["product_info"] == []
+    assert "unavailable" in result["messages"][0].content
+
+
+def test_llm_call_is_cancelled_when_budget_expires(monkeypatch):
+    monkeypatch.setattr(chat_agent, "llm", FakeShoppingLLM(latency_ms=1000))
+
+    started = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(
+            with_deadline(
+                0.05,
+                chat_agent.call_llm({"messages": [HumanMessage(content="lamps")]}),
+            )
+        )
+    assert time.perf_counter() - started < 0.5
+
+
+def test_upstream_timeouts_are_not_reported_as_deadline_failures():
+    async def provider_call():
+        raise asyncio.TimeoutError("upstream read timeout")
+
+    async def slow_call():
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError) as upstream:
+        asyncio.run(with_timeout(provider_call(), 5))
+    assert not isinstance(upstream.value, DeadlineExceeded)
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(with_timeout(slow_call(), 0.05))
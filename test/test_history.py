@@ -0,0 +1,90 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+import agents.chat_agent as chat_agent
+from agents.history import evicted_messages, select_history
+from agents.llm import FakeShoppingLLM
+from libs.database import settings
+
+
+def conversation(turns: int) -> list:
+    messages = []
+    for turn in range(turns):
+        messages += [
+            HumanMessage(content=f"question {turn}", id=f"h{turn}"),
+            AIMessage(content=f"lookup {turn}", id=f"a{turn}"),
+            ToolMessage(content="x" * 500, tool_call_id=f"t{turn}", id=f"t{turn}"),
+            AIMessage(content=f"answer {turn}", id=f"r{turn}"),
+        ]
+    return messages
+
+
+def test_select_history_keeps_last_turns_and_compacts_old_tool_output():
+    messages = conversation(5)
+
+    window = select_history(
+        messages, summary="likes oak", max_turns=2, tool_message_chars=50
+    )
+
+    assert isinstance(window[0], SystemMessage) and "likes oak" in window[0].content
+    assert [m.id for m in window[1:]] == [m.id for m in messages[-8:]]
+    earlier_tool, current_tool = window[3], window[7]
+    assert len(earlier_tool.content) < 100
+    assert earlier_tool.content.endswith("[earlier results truncated]")
+    assert current_tool.content == "x" * 500
+
+
+def test_evicted_messages_are_exactly_what_the_window_drops():
+    messages = conversation(5)
+
+    evicted = evicted_messages(messages, max_turns=2)
+    window = select_history(messages, max_turns=2)
+
+    assert [m.id for m in evicted] == [m.id for m in messages[:12]]
+    assert [m.id for m in evicted + window] == [m.id for m in messages]
+    assert evicted_messages(messages[:8], max_turns=2) == []
+
+
+def test_summary_update_runs_after_the_turn_returns(monkeypatch):
+    monkeypatch.setattr(chat_agent, "llm", FakeShoppingLLM())
+    monkeypatch.setattr(settings, "catalog_provider", "fake")
+    monkeypatch.setattr(settings, "history_summary_enabled", True)
+    monkeypatch.setattr(settings, "history_max_turns", 1)
+    summarize = chat_agent.summarize_messages
+
+    async def run() -> tuple[dict, list, dict]:
+        release = asyncio.Event()
+
+        async def gated_summarize(*args, **kwargs):
+            await release.wait()
+            return await summarize(*args, **kwargs)
+
+        monkeypatch.setattr(chat_agent, "summarize_messages", gated_summarize)
+        graph = chat_agent.builder.compile(checkpointer=InMemorySaver())
+        config = chat_agent.thread_config("history-thread")
+        await chat_agent.run_agent_turn(graph, "history-thread", "black handbags")
+        # The second turn returns while its summary is still blocked.
+        reply = await chat_agent.run_agent_turn(graph, "history-thread", "lamps")
+        pending = list(chat_agent._background_tasks)
+        before = (await graph.aget_state(config)).values
+        release.set()
+        await asyncio.gather(*pending)
+        after = (await graph.aget_state(config)).values
+        return reply, pending, {"before": before, "after": after}
+
+    reply, pending, state = asyncio.run(run())
+
+    assert reply["AI"] and pending
+    assert state["before"].get("summary") is None
+    assert state["after"]["summary"]
+    remaining = state["after"]["messages"]
+    assert isinstance(remaining[0], HumanMessage)
+    assert remaining[0].content == "lamps"
@@ -0,0 +1,39 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from agents.intents import INTENT_REPLIES, classify_intent, intent_reply
+
+
+@pytest.mark.parametrize(
+    "text, intent",
+    [
+        ("hi", "greeting"),
+        ("Heyyy 👋", "greeting"),
+        ("good morning Sofia!", "greeting"),
+        ("who are you?", "identity"),
+        ("How do I order?", "how_to_order"),
+        ("thank you so much 🫶", "thanks"),
+        ("ok thanks", "thanks"),
+    ],
+)
+def test_canned_intents_are_detected(text, intent):
+    assert classify_intent(text) == intent
+    assert intent_reply(intent) in INTENT_REPLIES[intent]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "hi, do you have any velvet sofas?",
+        "show me cute bags",
+        "how do I order the blue lamp you showed me in size M",
+        "",
+    ],
+)
+def test_product_questions_go_to_the_llm(text):
+    assert classify_intent(text) is None
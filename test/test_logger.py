@@ -0,0 +1,65 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import logging
+import queue
+
+import orjson
+
+from libs.logger import JsonFormatter, SamplingFilter, TruncatingQueueHandler
+
+
+def make_record(name="agents.chat_agent", level=logging.INFO, msg="%s", *args):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_queue_handler_merges_args_and_truncates():
+    log_queue = queue.SimpleQueue()
+    handler = TruncatingQueueHandler(log_queue, max_chars=10)
+
+    handler.handle(make_record("x", logging.INFO, "value=%s", "a" * 50))
+
+    record = log_queue.get_nowait()
+    assert record.args is None
+    assert record.msg.startswith("value=aaaa")
+    assert record.msg.endswith("[+46 chars]")
+
+
+def test_truncation_keeps_the_whole_traceback():
+    log_queue = queue.SimpleQueue()
+    handler = TruncatingQueueHandler(log_queue, max_chars=10)
+    try:
+        raise ValueError("x" * 100)
+    except ValueError:
+        record = make_record("x", logging.ERROR, "failed for %s", "a" * 50)
+        record.exc_info = sys.exc_info()
+
+    handler.handle(record)
+
+    message = log_queue.get_nowait().msg
+    assert message.startswith("failed for… [+51 chars]\nTraceback")
+    assert message.endswith("ValueError: " + "x" * 100)
+
+
+def test_sampling_keeps_warnings_and_uses_longest_prefix():
+    sampler = SamplingFilter(SamplingFilter.parse("agents=1.0, agents.chat_agent=0"))
+
+    assert sampler.rate("agents.chat_agent") == 0
+    assert sampler.rate("agents.chat_session") == 1.0
+    assert sampler.rate("routes.chat") == 1.0
+    assert not sampler.filter(make_record("agents.chat_agent", logging.INFO))
+    assert sampler.filter(make_record("agents.chat_agent", logging.WARNING))
+
+
+def test_json_formatter_keeps_extra_fields():
+    record = make_record("routes.chat", logging.INFO, "turn for %s", "t-1")
+    record.request_id = "req-1"
+
+    entry = orjson.loads(JsonFormatter().format(record))
+
+    assert entry["msg"] == "turn for t-1"
+    assert entry["request_id"] == "req-1"
+    assert "thread_id" not in entry
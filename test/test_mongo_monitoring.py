@@ -0,0 +1,40 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from libs.metrics import MetricsRegistry
+from libs.mongo_monitoring import MongoMonitor, plan_summary, query_shape
+
+
+def test_slow_commands_are_recorded_with_filter_shape(monkeypatch):
+    monkeypatch.setattr(MongoMonitor, "slow_threshold_ms", 50.0)
+    command = {
+        "find": "products",
+        "filter": {"$or": [{"name": {"$regex": "sofa", "$options": "i"}}]},
+        "lsid": {"id": "session"},
+    }
+
+    MongoMonitor.record("find", "products", "tryLuxor", command, 10_000)
+    MongoMonitor.record("find", "products", "tryLuxor", command, 250_000)
+
+    histogram = MetricsRegistry.histogram("mongo_command_products_find_seconds")
+    assert histogram.count >= 2
+    slow = MongoMonitor.recent_slow[-1]
+    assert slow["duration_ms"] == 250.0
+    assert "sofa" not in slow["filter"]
+    assert slow["filter"] == repr({"$or": [{"name": {"$regex": "?", "$options": "?"}}]})
+
+
+def test_query_shape_and_plan_summary():
+    assert query_shape({"sku": {"$in": ["a", "b"]}}) == {"sku": {"$in": ["?"]}}
+    explain = {
+        "queryPlanner": {
+            "winningPlan": {
+                "stage": "FETCH",
+                "inputStage": {"stage": "IXSCAN", "indexName": "sku_1"},
+            }
+        }
+    }
+    assert plan_summary(explain) == "FETCH <- IXSCAN(sku_1)"
@@ -0,0 +1,72 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import agents.chat_agent as chat_agent
+from libs.database import settings
+
+
+def tool_calls(*queries: str) -> AIMessage:
+    return AIMessage(
+        content="\n".join(
+            f'TOOL_CALL: product_lookup(query="{query}")' for query in queries
+        )
+    )
+
+
+def test_every_tool_call_is_extracted_deduplicated_and_capped(monkeypatch):
+    monkeypatch.setattr(settings, "max_parallel_lookups", 3)
+    state = {
+        "messages": [
+            HumanMessage(content="a room makeover"),
+            tool_calls("sofa", "rug", "sofa", "lamp", "desk"),
+        ],
+        "query": None,
+        "llm_response": None,
+        "product_info": None,
+    }
+
+    updated = chat_agent.extract_query_from_llm_response(state)
+
+    assert updated["queries"] == ["sofa", "rug", "lamp"]
+    assert updated["query"] == "sofa"
+
+
+def test_lookups_run_concurrently_and_merge(monkeypatch):
+    async def lookup_products(query):
+        await asyncio.sleep(0.1)
+        products = [
+            {"_id": f"{query}-1", "sku": f"{query}-1", "name": f"{query} one"},
+            {"_id": "shared", "sku": "shared", "name": "Shared pick"},
+        ]
+        return f"cards for {query}", products
+
+    monkeypatch.setattr(chat_agent, "lookup_products", lookup_products)
+    state = {"messages": [], "queries": ["sofa", "rug", "lamp"]}
+
+    started = time.perf_counter()
+    result = asyncio.run(chat_agent.product_lookup(state))
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.25  # three 0.1s lookups, not 0.3s in sequence
+    messages = result["messages"]
+    assert all(isinstance(message, ToolMessage) for message in messages)
+    assert [message.tool_call_id for message in messages] == [
+        "product_lookup_call",
+        "product_lookup_call_1",
+        "product_lookup_call_2",
+    ]
+    assert messages[1].content == 'Results for "rug":\ncards for rug'
+    assert [product["id"] for product in result["product_info"]] == [
+        "sofa-1",
+        "shared",
+        "rug-1",
+        "lamp-1",
+    ]
@@ -0,0 +1,107 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_core.documents import Document
+
+from agents.product_cards import (
+    build_product_cards,
+    build_product_payload,
+    estimate_tokens,
+    render_product_cards,
+)
+
+
+def make_product(sku: str, name: str, reviews: int = 3) -> dict:
+    return {
+        "_id": f"oid-{sku}",
+        "id": sku,
+        "sku": sku,
+        "name": name,
+        "category": "Furniture",
+        "brand": "Luxor",
+        "description": "A very long description " * 50,
+        "price": {"amount": 899.0, "currency": "USD", "discounted_amount": 799.0},
+        "in_stock": True,
+        "stock_quantity": 12,
+        "rating": 4.5,
+        "reviews": [
+            {"user_id": i, "rating": 5, "comment": "Really comfy and stylish " * 20}
+            for i in range(reviews)
+        ],
+        "variants": [{"sku": f"{sku}-{c}", "name": c} for c in ["Blue", "Grey", "Blue"]],
+        "manufacturer": {"name": "Acme", "address": "1 Long Street"},
+        "dimensions": {"length": 1, "width": 2, "height": 3},
+    }
+
+
+def test_cards_drop_bulky_fields_and_dedupe():
+    doc = Document(page_content="summary", metadata=make_product("SKU1", "Velvet Sofa"))
+    cards = build_product_cards([(doc, 0.91), (doc, 0.90)])
+
+    assert len(cards) == 1
+    card = cards[0]
+    assert card["score"] == 0.91
+    assert card["variants"] == ["Blue", "Grey"]
+    assert "description" not in card and "manufacturer" not in card
+    assert len(card["top_review"]) <= 120
+
+
+def test_render_respects_token_budget():
+    products = [make_product(f"SKU{i}", f"Sofa {i}") for i in range(20)]
+    full_repr = str(products)
+
+    rendered = render_product_cards(products, token_budget=150)
+
+    assert estimate_tokens(rendered) <= 170
+    assert rendered.startswith("1. Sofa 0")
+    assert "more matching products not shown" in rendered
+    assert len(rendered) * 10 < len(full_repr)
+
+
+def test_render_empty_results():
+    assert render_product_cards([]) == "No products found."
+
+
+def test_product_payload_is_compact_and_deduplicated():
+    sofa = make_product("S1", "Velvet Sofa!")
+    sofa["images"] = ["https://cdn.example/sofa.jpg", "https://cdn.example/2.jpg"]
+    results = [
+        (Document(page_content="sofa", metadata=sofa), 0.91234),
+        (Document(page_content="sofa", metadata=sofa), 0.8),
+    ]
+
+    payload = build_product_payload(results)
+
+    assert payload == [
+        {
+            "id": "oid-S1",
+            "slug": "velvet-sofa",
+            "name": "Velvet Sofa!",
+            "price": 799.0,
+            "currency": "USD",
+            "image": "https://cdn.example/sofa.jpg",
+            "score": 0.912,
+        }
+    ]
+
+
+def test_product_ids_prefer_mongo_id_over_catalog_id():
+    stored = make_product("S1", "Velvet Sofa")
+    fake = make_product("S2", "Oak Desk")
+    del fake["_id"]
+
+    payload = build_product_payload([stored, fake])
+    cards = build_product_cards([stored, fake])
+
+    assert [product["id"] for product in payload] == ["oid-S1", "S2"]
+    assert [card["id"] for card in cards] == ["oid-S1", "S2"]
+
+
+def test_records_without_identity_are_not_collapsed():
+    anonymous = [{"category": "Lighting", "price": {"amount": 10.0}} for _ in range(3)]
+
+    assert len(build_product_cards(anonymous)) == 3
+    assert len(build_product_payload(anonymous)) == 3
@@ -0,0 +1,83 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import SecretStr
+
+from libs.database import settings
+from libs.profiling import ProfileMiddleware, Profiler
+from libs.tracing import RequestIdMiddleware
+from routes import admin
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+def busy(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+def make_client(monkeypatch) -> TestClient:
+    monkeypatch.setattr(settings, "admin_token", SecretStr("secret"))
+    monkeypatch.setattr(settings, "profiling_enabled", True)
+    app = FastAPI()
+    app.add_middleware(ProfileMiddleware)
+    app.add_middleware(RequestIdMiddleware)
+    app.include_router(admin.router, prefix="/admin")
+
+    @app.get("/work")
+    async def work():
+        return {"total": busy(20000)}
+
+    return TestClient(app)
+
+
+def test_profiled_request_returns_collapsed_stacks(monkeypatch):
+    client = make_client(monkeypatch)
+
+    plain = client.get("/work", headers={"X-Profile": "1"})
+    assert "x-profile-id" not in plain.headers  # no admin token, not profiled
+
+    response = client.get("/work", headers={"X-Profile": "1", **ADMIN})
+    profile_id = response.headers["x-profile-id"]
+    assert profile_id == response.headers["x-request-id"]
+
+    stacks = client.get(f"/admin/profile/requests/{profile_id}", headers=ADMIN)
+    assert stacks.status_code == 200
+    lines = stacks.text.splitlines()
+    assert any("test/test_profiling.py:busy:" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    stats = client.get(
+        f"/admin/profile/requests/{profile_id}",
+        params={"format": "stats"},
+        headers=ADMIN,
+    )
+    assert "cumulative" in stats.text
+
+
+def test_sampling_endpoint_is_guarded_and_bounded(monkeypatch):
+    client = make_client(monkeypatch)
+
+    assert client.get("/admin/profile/sample").status_code == 401
+    too_long = client.get(
+        "/admin/profile/sample",
+        params={"seconds": settings.profiling_max_seconds + 1},
+        headers=ADMIN,
+    )
+    assert too_long.status_code == 422
+
+    response = client.get(
+        "/admin/profile/sample",
+        params={"seconds": 0.2, "interval_ms": 5, "all_threads": True},
+        headers=ADMIN,
+    )
+    assert response.status_code == 200
+    assert response.text.strip()
+
+    monkeypatch.setattr(settings, "profiling_enabled", False)
+    assert client.get("/admin/profile/sample", headers=ADMIN).status_code == 404
+    assert not Profiler._sampling
@@ -0,0 +1,60 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+
+from langchain_core.messages import HumanMessage, ToolMessage
+
+import agents.chat_agent as chat_agent
+from agents.instructions import GENZ_AGENT_INSTRUCTIONS
+from agents.llm import FakeShoppingLLM, GeminiInstructionCache
+
+
+def run_call_llm(messages) -> dict:
+    return asyncio.run(chat_agent.call_llm({"messages": messages}))
+
+
+def test_system_prefix_is_stable_between_turns(monkeypatch):
+    fake = FakeShoppingLLM()
+    monkeypatch.setattr(chat_agent, "llm", fake)
+
+    first = run_call_llm([HumanMessage(content="black handbags")])
+    first_prompt = fake.last_prompt
+    run_call_llm([HumanMessage(content="cozy room decor")])
+    second_prompt = fake.last_prompt
+
+    prefix = "System: " + GENZ_AGENT_INSTRUCTIONS
+    assert first_prompt.startswith(prefix) and second_prompt.startswith(prefix)
+    assert "{time}" not in first_prompt
+    assert first["llm_response"] == 'TOOL_CALL: product_lookup(query="black handbags")'
+
+
+def test_fake_llm_answers_tool_results(monkeypatch):
+    monkeypatch.setattr(chat_agent, "llm", FakeShoppingLLM())
+
+    result = run_call_llm(
+        [
+            HumanMessage(content="sofa"),
+            ToolMessage(content="1. Velvet Sofa | 899 USD", tool_call_id="t"),
+        ]
+    )
+
+    assert "TOOL_CALL" not in result["llm_response"]
+
+
+def test_cached_instructions_are_not_resent(monkeypatch):
+    fake = FakeShoppingLLM()
+
+    async def cache_name():
+        return "cachedContents/instructions"
+
+    monkeypatch.setattr(GeminiInstructionCache, "get_name", cache_name)
+    monkeypatch.setattr(chat_agent, "get_cached_content_llm", lambda name: fake)
+
+    run_call_llm([HumanMessage(content="lamps")])
+
+    assert GENZ_AGENT_INSTRUCTIONS not in fake.last_prompt
+    assert "Current time:" in fake.last_prompt
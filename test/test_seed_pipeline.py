@@ -0,0 +1,295 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from pydantic import SecretStr
+from pymongo.errors import OperationFailure
+
+from benchmarks.memory_mongo import MemoryCollection, matches
+from libs.auth import require_admin
+from libs.database import Database, settings
+from models.products_model import Price, Product
+from seeds import seed_database
+from seeds.seed_database import SeedJobs, SeedRequest, generate_chunk
+
+
+def test_seed_chunks_are_stable_slots():
+    request = SeedRequest(count=250, chunk_size=100, seed=3)
+    assert request.total_chunks == 3
+    assert request.job_id == SeedRequest(count=250, chunk_size=100, seed=3).job_id
+    assert request.job_id != SeedRequest(count=250, chunk_size=50, seed=3).job_id
+
+    last = asyncio.run(generate_chunk(request, 2))
+    again = asyncio.run(generate_chunk(request, 2))
+    assert len(last) == 50
+    assert [doc["sku"] for doc in last] == [doc["sku"] for doc in again]
+
+
+def test_synthetic_chunks_do_not_block_the_event_loop():
+    request = SeedRequest(count=1500, chunk_size=1500)
+    ticks = 0
+
+    async def ticker(done: asyncio.Event):
+        nonlocal ticks
+        while not done.is_set():
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    async def run():
+        done = asyncio.Event()
+        ticking = asyncio.create_task(ticker(done))
+        docs = await generate_chunk(request, 0)
+        done.set()
+        await ticking
+        return docs
+
+    assert len(asyncio.run(run())) == 1500
+    assert ticks > 5
+
+
+def test_require_admin(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", None)
+    with pytest.raises(HTTPException) as disabled:
+        asyncio.run(require_admin("anything"))
+    assert disabled.value.status_code == 403
+
+    monkeypatch.setattr(settings, "admin_token", SecretStr("s3cret"))
+    with pytest.raises(HTTPException) as wrong:
+        asyncio.run(require_admin("nope"))
+    assert wrong.value.status_code == 401
+    assert asyncio.run(require_admin("s3cret")) is None
+
+
+class SearchIndexCollection:
+    def __init__(self, indexes):
+        self.indexes = indexes
+        self.calls = []
+
+    def list_search_indexes(self, name):
+        matching = [index for index in self.indexes if index["name"] == name]
+
+        class Cursor:
+            async def to_list(self, length=None):
+                return matching
+
+        return Cursor()
+
+    async def create_search_index(self, model):
+        self.calls.append("create")
+
+    async def update_search_index(self, name, definition):
+        self.calls.append("update")
+
+    async def drop_search_index(self, name):
+        self.calls.append("drop")
+
+
+class SearchIndexDatabase:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def list_collection_names(self):
+        return [seed_database.PRODUCTS_COLLECTION]
+
+    def __getitem__(self, name):
+        return self.collection
+
+
+@pytest.mark.parametrize(
+    "indexes, expected",
+    [
+        ([], ["create"]),
+        (
+            [
+                {
+                    "name": "vector_index",
+                    "latestDefinition": seed_database.VECTOR_INDEX_DEFINITION,
+                }
+            ],
+            [],
+        ),
+        ([{"name": "vector_index", "latestDefinition": {"fields": []}}], ["update"]),
+    ],
+)
+def test_search_index_is_never_dropped(monkeypatch, indexes, expected):
+    collection = SearchIndexCollection(indexes)
+
+    async def get_async_database():
+        return SearchIndexDatabase(collection)
+
+    monkeypatch.setattr(Database, "get_async_database", get_async_database)
+    asyncio.run(seed_database.create_search_index())
+
+    assert collection.calls == expected
+
+
+class SeedCollection(MemoryCollection):
+    """MemoryCollection plus the writes the seed pipeline issues."""
+
+    def __init__(self, docs=None, index_error=None):
+        super().__init__(docs)
+        self.index_error = index_error
+
+    async def create_index(self, key, unique=False):
+        if self.index_error:
+            raise self.index_error
+
+    def _apply(self, query, update, upsert):
+        doc = next((doc for doc in self.docs if matches(doc, query)), None)
+        inserted = doc is None
+        if inserted:
+            if not upsert:
+                return None, False
+            doc = dict(query)
+            self.docs.append(doc)
+            doc.update(update.get("$setOnInsert", {}))
+        doc.update(update.get("$set", {}))
+        for key, value in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + value
+        for key, value in update.get("$addToSet", {}).items():
+            values = doc.setdefault(key, [])
+            if value not in values:
+                values.append(value)
+        return doc, inserted
+
+    async def find_one_and_update(self, query, update, upsert=False, **kwargs):
+        doc, _ = self._apply(query, update, upsert)
+        return dict(doc) if doc else None
+
+    async def update_one(self, query, update, upsert=False):
+        self._apply(query, update, upsert)
+
+    async def bulk_write(self, operations, ordered=True):
+        inserted = [
+            self._apply(op._filter, op._doc, op._upsert)[1] for op in operations
+        ]
+        return SimpleNamespace(
+            upserted_count=sum(inserted), matched_count=inserted.count(False)
+        )
+
+
+def use_seed_collections(monkeypatch, index_error=None) -> dict:
+    collections = {
+        seed_database.PRODUCTS_COLLECTION: SeedCollection(index_error=index_error),
+        seed_database.SEED_JOBS_COLLECTION: SeedCollection(),
+    }
+
+    async def get_async_collection(name):
+        return collections[name]
+
+    async def create_search_index():
+        return "unchanged"
+
+    async def embed_documents(docs):
+        for doc in docs:
+            doc["embedding"] = [0.0]
+
+    monkeypatch.setattr(Database, "get_async_collection", get_async_collection)
+    monkeypatch.setattr(seed_database, "create_search_index", create_search_index)
+    monkeypatch.setattr(seed_database, "embed_documents", embed_documents)
+    return collections
+
+
+def test_failed_index_creation_is_recorded_on_the_job(monkeypatch):
+    use_seed_collections(monkeypatch, index_error=OperationFailure("E11000 dup key"))
+    request = SeedRequest(count=10, chunk_size=5)
+
+    async def run():
+        job_id, started = await SeedJobs.start(request)
+        await SeedJobs._tasks[job_id]
+        return started, await SeedJobs.progress(job_id)
+
+    started, progress = asyncio.run(run())
+
+    assert started
+    assert progress["status"] == "failed"
+    assert "E11000" in progress["error"]
+    assert progress["completed_chunks"] == 0
+
+
+def test_llm_chunks_are_requested_in_small_batches(monkeypatch):
+    requested = []
+
+    async def generate_synthetic_data(count):
+        requested.append(count)
+        # The model may return fewer products than asked for.
+        return [
+            Product(
+                id="x",
+                sku="x",
+                name=f"Lamp {i}",
+                category="Lighting",
+                price=Price(amount=10),
+            )
+            for i in range(min(count, 15))
+        ]
+
+    monkeypatch.setattr(
+        seed_database, "generate_synthetic_data", generate_synthetic_data
+    )
+    request = SeedRequest(source="llm", count=100, chunk_size=50, llm_batch_size=20)
+
+    docs = asyncio.run(generate_chunk(request, 1))
+
+    assert requested == [20, 20, 20, 5]
+    assert [doc["sku"] for doc in docs] == [f"GEN-42-{i:07d}" for i in range(50, 100)]
+
+
+def test_rerunning_a_chunk_upserts_without_duplicates(monkeypatch):
+    collections = use_seed_collections(monkeypatch)
+    products = collections[seed_database.PRODUCTS_COLLECTION]
+    request = SeedRequest(count=20, chunk_size=10)
+
+    async def run():
+        await seed_database.seed_database(request)
+        await seed_database.seed_chunk(request, 1)
+        return await seed_database.seed_database(
+            request.model_copy(update={"resume": False})
+        )
+
+    progress = asyncio.run(run())
+
+    assert progress["status"] == "completed"
+    assert progress["completed_chunks"] == 2
+    assert len(products.docs) == 20
+    assert len({doc["sku"] for doc in products.docs}) == 20
+
+
+def test_resume_only_runs_the_chunks_a_failed_job_missed(monkeypatch):
+    collections = use_seed_collections(monkeypatch)
+    products = collections[seed_database.PRODUCTS_COLLECTION]
+    request = SeedRequest(count=40, chunk_size=10, concurrency=1)
+    generate = seed_database.generate_chunk
+    generated = []
+    failures = [2]
+
+    async def flaky_generate_chunk(request, chunk):
+        generated.append(chunk)
+        if chunk in failures:
+            failures.remove(chunk)
+            raise OperationFailure("embedding quota exceeded")
+        return await generate(request, chunk)
+
+    monkeypatch.setattr(seed_database, "generate_chunk", flaky_generate_chunk)
+
+    with pytest.raises(OperationFailure):
+        asyncio.run(seed_database.seed_database(request))
+    failed = asyncio.run(SeedJobs.progress(request.job_id))
+    assert failed["status"] == "failed"
+    assert failed["completed_chunks"] == 2
+
+    generated.clear()
+    progress = asyncio.run(seed_database.seed_database(request))
+
+    assert generated == [2, 3]
+    assert progress["status"] == "completed"
+    assert progress["completed_chunks"] == 4
+    assert progress["error"] is None
+    assert len(products.docs) == 40
@@ -0,0 +1,35 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.products_model import Product
+from seeds.synthetic_catalog import (
+    generate_products,
+    product_sku,
+    read_catalog,
+    write_catalog,
+)
+
+
+def test_catalog_is_deterministic_and_valid(tmp_path):
+    first = list(generate_products(200, seed=7, embedding_dims=16))
+    again = list(generate_products(5, seed=7, start=100, embedding_dims=16))
+
+    assert again == first[100:105]
+    assert len({product["sku"] for product in first}) == 200
+    assert all(Product(**product) for product in first)
+    assert len(first[0]["embedding"]) == 16
+
+    path = str(tmp_path / "catalog.ndjson.gz")
+    assert write_catalog(iter(first), path) == 200
+    restored = list(read_catalog(path))
+    assert restored[3]["_id"] == first[3]["_id"]
+    assert restored[3]["embedding"] == first[3]["embedding"]
+
+
+def test_skus_stay_unique_at_a_million_products():
+    skus = {product_sku(42, index) for index in range(1_000_000)}
+
+    assert len(skus) == 1_000_000
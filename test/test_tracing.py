@@ -0,0 +1,94 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import agents.chat_agent as chat_agent
+from agents.llm import FakeShoppingLLM
+from libs.database import settings
+from libs.logger import RequestIdFilter, current_request_id
+from libs.metrics import MetricsRegistry
+from libs.tracing import RequestIdMiddleware, Span, Tracer
+
+
+def make_client(monkeypatch) -> tuple[TestClient, list[Span]]:
+    monkeypatch.setattr(chat_agent, "llm", FakeShoppingLLM())
+    monkeypatch.setattr(settings, "catalog_provider", "fake")
+    monkeypatch.setattr(settings, "chat_checkpointer", "memory")
+    monkeypatch.setattr(settings, "history_summary_enabled", False)
+    spans: list[Span] = []
+    record = Tracer.record.__func__
+
+    def collect(cls, span):
+        spans.append(span)
+        record(cls, span)
+
+    monkeypatch.setattr(Tracer, "record", classmethod(collect))
+
+    app = FastAPI()
+    app.add_middleware(RequestIdMiddleware)
+
+    @app.post("/chat")
+    async def chat(message: str):
+        return await chat_agent.chat_agent("trace-thread", message)
+
+    return TestClient(app), spans
+
+
+def test_agent_stages_are_traced_under_the_request(monkeypatch):
+    client, spans = make_client(monkeypatch)
+
+    response = client.post(
+        "/chat", params={"message": "black handbags"}, headers={"X-Request-ID": "r-1"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["x-request-id"] == "r-1"
+    by_id = {span.span_id: span for span in spans}
+    names = [span.name for span in spans]
+    assert names.count("node.call_llm") == 2
+    assert "node.product_lookup" in names and "tool.product_lookup" in names
+    assert names[-1] == "http.request"
+    assert all(span.request_id == "r-1" for span in spans)
+
+    def ancestors(span):
+        while span.parent_id:
+            span = by_id[span.parent_id]
+            yield span.name
+
+    lookup = next(span for span in spans if span.name == "tool.product_lookup")
+    assert list(ancestors(lookup)) == [
+        "node.product_lookup",
+        "agent.turn",
+        "http.request",
+    ]
+    invoke = next(span for span in spans if span.name == "llm.invoke")
+    assert invoke.attributes["prompt_tokens"] > 0
+    assert MetricsRegistry.snapshot()["span_node_call_llm_seconds"]["count"] >= 2
+
+
+def test_unsafe_request_ids_are_replaced(monkeypatch):
+    client, _ = make_client(monkeypatch)
+
+    response = client.post(
+        "/chat", params={"message": "hello"}, headers={"X-Request-ID": "bad id\n"}
+    )
+
+    assert len(response.headers["x-request-id"]) == 32
+
+
+def test_log_records_carry_the_request_id():
+    token = current_request_id.set("r-2")
+    try:
+        record = logging.LogRecord("x", logging.INFO, __file__, 1, "m", None, None)
+        RequestIdFilter().filter(record)
+    finally:
+        current_request_id.reset(token)
+
+    assert record.request_id == "r-2"
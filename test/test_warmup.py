@@ -0,0 +1,119 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from benchmarks.memory_mongo import MemoryCollection
+from libs.database import Database, settings
+from libs.warmup import Warmup
+
+
+class PingDatabase:
+    def __init__(self):
+        self.pings = 0
+
+    async def command(self, name):
+        self.pings += 1
+        return {"ok": 1}
+
+
+def test_warmup_reports_steps_and_readiness(monkeypatch):
+    db = PingDatabase()
+    catalog = MemoryCollection([{"_id": 1, "name": "Lamp", "created_at": 1}])
+
+    async def get_async_database():
+        return db
+
+    async def get_catalog_collection(name):
+        return catalog
+
+    monkeypatch.setattr(Database, "get_async_database", get_async_database)
+    monkeypatch.setattr(Database, "get_catalog_collection", get_catalog_collection)
+    monkeypatch.setattr(settings, "embedding_provider", "fake")
+    monkeypatch.setattr(settings, "chat_checkpointer", "memory")
+    monkeypatch.setattr(settings, "warmup_pool_connections", 3)
+
+    assert asyncio.run(Warmup.run()) == "ready"
+    assert Warmup.ready()
+    assert db.pings == 3
+    assert set(Warmup.steps) == {"mongo_pool", "embeddings", "agent_graph", "catalog"}
+    assert all(step["status"] == "ok" for step in Warmup.steps.values())
+
+    async def broken_database():
+        raise ConnectionError("no mongo")
+
+    monkeypatch.setattr(Database, "get_async_database", broken_database)
+    assert asyncio.run(Warmup.run()) == "failed"
+    assert Warmup.report()["steps"]["mongo_pool"]["status"] == "failed"
+
+
+def test_warmup_compiles_the_graph_chat_agent_reuses(monkeypatch):
+    import agents.chat_agent as chat_agent
+
+    client = object()
+    compiled = []
+
+    async def get_async_client():
+        return client
+
+    def create_checkpointer():
+        compiled.append(client)
+        return InMemorySaver()
+
+    monkeypatch.setattr(Database, "_async_client", client)
+    monkeypatch.setattr(Database, "get_async_client", get_async_client)
+    monkeypatch.setattr(chat_agent, "create_checkpointer", create_checkpointer)
+    monkeypatch.setattr(chat_agent, "_mongo_graph", None)
+    monkeypatch.setattr(settings, "chat_checkpointer", "mongo")
+    monkeypatch.setattr(settings, "warmup_pool_connections", 0)
+    monkeypatch.setattr(settings, "warmup_embeddings", False)
+    monkeypatch.setattr(settings, "warmup_catalog", False)
+
+    assert asyncio.run(Warmup.run()) == "ready"
+    warmed = chat_agent.mongo_graph()
+    assert chat_agent.mongo_graph() is warmed
+    assert len(compiled) == 1
+
+    used = []
+
+    async def run_agent_turn(graph, *args):
+        used.append(graph)
+        return {"AI": "ok"}
+
+    monkeypatch.setattr(chat_agent, "run_agent_turn", run_agent_turn)
+    monkeypatch.setattr(chat_agent.CheckpointCompactor, "mark_dirty", lambda _: None)
+    asyncio.run(chat_agent.chat_agent("t1", "hi"))
+    assert used == [warmed] and len(compiled) == 1
+
+    # A reconnected client gets a freshly compiled graph.
+    monkeypatch.setattr(Database, "_async_client", object())
+    assert chat_agent.mongo_graph() is not warmed
+
+
+def test_start_blocks_until_warm_within_the_timeout(monkeypatch):
+    release = asyncio.Event()
+
+    async def slow_step():
+        await release.wait()
+        return {}
+
+    monkeypatch.setattr(
+        Warmup, "plan", classmethod(lambda cls: [("slow", slow_step, True)])
+    )
+    monkeypatch.setattr(settings, "warmup_timeout_seconds", 0.05)
+
+    async def run():
+        await Warmup.start()
+        timed_out = Warmup.status
+        release.set()
+        await Warmup._task
+        await Warmup.start()  # finishes inside the lifespan this time
+        return timed_out, Warmup.status
+
+    assert settings.warmup_blocking
+    assert asyncio.run(run()) == ("running", "ready")